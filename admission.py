@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Kontrola przyjęć: kubełki tokenów per klient (tworzenie gier/pokoi, akcje)
+# i globalny limit równoległych zapisów pokoi z ograniczoną kolejką.
+# Wszystko w pamięci procesu, O(1) na żądanie.
+
+
+class Counters:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = {}
+
+    def inc(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + n
+
+    def peak(self, name: str, value: int) -> None:
+        with self._lock:
+            if value > self._values.get(name, 0):
+                self._values[name] = value
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+
+class RateLimiter:
+    # kubełek tokenów per klient: `rate` tokenów/s, pojemność `burst`;
+    # najdawniej widziani klienci wypadają po przekroczeniu max_clients (pamięć stała)
+    def __init__(self, rate: float, burst: float, max_clients: int = 100_000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def take(self, client: str, now: Optional[float] = None, cost: float = 1.0) -> float:
+        # 0.0 = wpuszczony, inaczej ile sekund poczekać (Retry-After)
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class WriteGate:
+    # najwyżej `limit` zapisów naraz; kolejne czekają (najwyżej `max_queue`
+    # i najwyżej `timeout` s), reszta dostaje od razu odmowę
+    def __init__(self, limit: int, max_queue: int, timeout: float, counters: Optional[Counters] = None):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.counters = counters or Counters()
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def acquire(self) -> Optional[str]:
+        # None = wpuszczony, inaczej powód odmowy ("queue_full" / "timeout")
+        if not self.enabled:
+            return None
+        with self._cond:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                self.counters.peak("write_active_peak", self._active)
+                self.counters.inc("write_admitted")
+                return None
+            if self._waiting >= self.max_queue:
+                self.counters.inc("write_rejected_queue_full")
+                return "queue_full"
+            self._waiting += 1
+            self.counters.peak("write_queue_peak", self._waiting)
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self._active >= self.limit:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        self.counters.inc("write_rejected_timeout")
+                        return "timeout"
+                    self._cond.wait(left)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self.counters.peak("write_active_peak", self._active)
+            self.counters.inc("write_admitted_after_wait")
+            return None
+
+    def release(self) -> None:
+        if not self.enabled:
+            return
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def state(self) -> Dict[str, int]:
+        with self._cond:
+            return {"active": self._active, "waiting": self._waiting, "limit": self.limit, "max_queue": self.max_queue}
@@ -0,0 +1,182 @@
+import functools
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set
+
+from stats import NullStats
+
+# Spekulacyjne plany AI (tryb ai, wariant double): gdy człowiek myśli (wybór
+# przypisania kości) albo czeka na ruch AI, pula wątków liczy z góry tabelę
+# przypisań kości AI dla wszystkich 36 wyników w każdym stanie, do którego gra
+# może dojść przed rzutem AI. Game.ai_pair_move pyta cache o tabelę dla
+# bieżącego stanu (Game.plans) i liczy w miejscu tylko przy chybieniu.
+#
+# Stany do policzenia (najwyżej `budget` na wyzwolenie):
+#   - tura AI: stan po ewentualnym teleporcie AI (losowanie karty z pola
+#     magicznego daje kilka wariantów — próbujemy kolejne ziarna),
+#   - człowiek wybiera przypisanie kości: oba wybory, a dla każdego jak wyżej.
+# Plan zależy tylko od stanu (Game.ai_pair_key), więc cache jest wspólny dla
+# sesji; właściciel (sid) trzyma tylko swoje zadania w toku. Nowe wyzwolenie
+# anuluje poprzednie zadania sesji, a expire() — zadania wygasłych sesji
+# (anulowane jest to, co jeszcze czeka w kolejce puli; liczone zadanie kończy się samo).
+
+
+class AIPlans:
+    def __init__(self, workers: int = 2, budget: int = 8, max_entries: int = 4096):
+        self.workers = max(1, workers)
+        self.budget = max(1, budget)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._jobs: Dict[str, List[Future]] = {}
+        self._touched: Dict[str, float] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        self.computed = 0
+        self.cancelled = 0
+
+    # ----- cache -----
+    def lookup(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            table = self._plans.get(key)
+            if table is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return table
+
+    def _store(self, key: Hashable, table: bytes) -> None:
+        with self._lock:
+            self._plans[key] = table
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+            self.computed += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._plans
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._plans)
+
+    # ----- spekulacja -----
+    @staticmethod
+    def wants(game: Any) -> bool:
+        # tanio, w wątku żądania: czy w tym stanie jest co liczyć
+        if not (game.mode == "ai" and game.variant == "double") or game.anyone_won():
+            return False
+        pend = game.pending
+        if pend:
+            return pend.get("type") == "dice_choice"
+        return game.current_index() == 2
+
+    def speculate(self, owner: str, snapshot: Dict[str, Any], decode: Callable[[Dict[str, Any]], Any]) -> Future:
+        # snapshot = to_session_dict() w wątku żądania; od razu do JSON-a, bo dzieli
+        # listy (move_path, pending) z żywym obiektem Game z MemorySessionStore,
+        # a klony w puli nie mogą ich ruszać
+        raw = json.dumps(snapshot)
+        pool = self._ensure_pool()
+        with self._lock:
+            old = self._jobs.pop(owner, [])
+        self._cancel(old)
+        fut = pool.submit(self._run, raw, decode)
+        with self._lock:
+            self._jobs.setdefault(owner, []).append(fut)
+            self._touched[owner] = time.time()
+        fut.add_done_callback(functools.partial(self._done, owner))
+        return fut
+
+    def _states(self, raw: str, decode: Callable[[Dict[str, Any]], Any]) -> Iterator[Any]:
+        # stany tuż przed rzutem AI; każdy klon z własnej kopii JSON-a, bez statystyk
+        if json.loads(raw).get("pending"):
+            starts = []
+            for swap in (False, True):
+                g = decode(json.loads(raw))
+                g.stats = NullStats()
+                g.rng = random.Random(swap)
+                g.apply_dice_choice_human(swap)
+                if not g.pending and not g.anyone_won() and g.current_index() == 2:
+                    starts.append(json.dumps(g.to_session_dict()))
+        else:
+            starts = [raw]
+        for start in starts:
+            # bez TELEPORTU drużyny AI stan przed rzutem jest jeden
+            teleport = (json.loads(start).get("team_cards") or {}).get("a") == "TELEPORT_PLUS3"
+            for seed in range(self.budget if teleport else 1):
+                g = decode(json.loads(start))
+                g.stats = NullStats()
+                g.rng = random.Random(seed)
+                g._ai_pair_teleport()
+                if not g.anyone_won():
+                    yield g
+
+    def _run(self, raw: str, decode: Callable[[Dict[str, Any]], Any]) -> int:
+        done = 0
+        seen: Set[Hashable] = set()
+        for g in self._states(raw, decode):
+            if len(seen) >= self.budget:
+                break
+            key = g.ai_pair_key()
+            if key in seen:
+                continue
+            seen.add(key)
+            if key not in self:
+                self._store(key, g.ai_pair_table())
+                done += 1
+        return done
+
+    def _done(self, owner: str, fut: Future) -> None:
+        with self._lock:
+            jobs = self._jobs.get(owner)
+            if jobs and fut in jobs:
+                jobs.remove(fut)
+                if not jobs:
+                    del self._jobs[owner]
+
+    def _cancel(self, futures: List[Future]) -> None:
+        for fut in futures:
+            if fut.cancel():
+                self.cancelled += 1
+
+    def cancel(self, owner: str) -> None:
+        with self._lock:
+            jobs = self._jobs.pop(owner, [])
+            self._touched.pop(owner, None)
+        self._cancel(jobs)
+
+    def expire(self, ttl_seconds: float) -> int:
+        # sesje nieruszane dłużej niż TTL sesji: porzucamy ich zadania w toku
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            dead = [owner for owner, t in self._touched.items() if t < cutoff]
+        for owner in dead:
+            self.cancel(owner)
+        return len(dead)
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        pool = self._pool
+        if pool is not None:
+            return pool
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-plans")
+            return self._pool
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "plans": len(self._plans),
+                "pending_sessions": len(self._jobs),
+                "hits": self.hits,
+                "misses": self.misses,
+                "computed": self.computed,
+                "cancelled": self.cancelled,
+            }
@@ -1,1227 +1,543 @@
-import random
+import functools
 import json
+import os
+import random
+import threading
 import time
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
-
-from flask import Flask, render_template, redirect, request, jsonify, make_response
+from typing import Dict, Any, Optional, Tuple
+
+from flask import Flask, Response, g, render_template, redirect, request, jsonify, make_response, url_for
+
+from admission import Counters, RateLimiter, WriteGate
+from ai_plans import AIPlans
+from assets import COMPRESSIBLE_MIMETYPES, MIN_COMPRESS_BYTES, StaticFingerprints, compress, negotiate_encoding
+from board_render import BoardCache
+from bot_runner import BotRunner
+from engine import (
+    BOARD_END, BOARD_ID, CARD_POOL, MAGIC_TILES_TEMPLATE, POLICY_DEFAULTS, SNAKE_LADDERS, SNAKE_POLICY_STEPS,
+    Game, MagicTiles, Player, replay_frames,
+)
+from presence import RoomPresence
+from room_archive import RoomArchive
+from room_cache import RoomSnapshotCache
+from room_channel import RoomHub
+from room_index import RoomIndex
+from room_store import RoomStore
+from room_table import RoomTable
+from replay import (
+    ACT_CARD, ACT_JOIN, ACT_POLICY_SNAKE, ACT_POLICY_TELEPORT, ACT_ROLL, ACT_SKIP, ACT_SNAKE,
+    append_action, ndjson, new_replay,
+)
+from scheduler import TimerWheel
+from sessions import SessionStore, make_session_store
+from stats import StatsCollector, heatmap
+
+try:
+    from flask_sock import Sock
+except ImportError:  # brak flask-sock -> klienci zostają przy pollingu
+    Sock = None
 
 app = Flask(__name__)
+sock = Sock(app) if Sock else None
 
-BOARD_END = 100
-
-SNAKE_LADDERS = {
-    9: 27, 16: 7, 18: 37, 28: 51, 25: 54, 56: 64, 59: 17, 63: 19,
-    67: 30, 68: 88, 76: 97, 79: 100, 93: 69, 95: 75, 99: 77
-}
-
-MAGIC_TILES_TEMPLATE: Dict[int, Optional[str]] = {
-    6: None, 14: None, 22: None, 35: None, 47: None, 58: None, 73: None, 86: None
-}
-
-CARD_POOL = ["ANTY_WAZ", "TELEPORT_PLUS3"]
-
-
-def is_snake(pos: int) -> bool:
-    return pos in SNAKE_LADDERS and SNAKE_LADDERS[pos] < pos
-
-
-def is_ladder(pos: int) -> bool:
-    return pos in SNAKE_LADDERS and SNAKE_LADDERS[pos] > pos
-
-
-def gen_room_code(n=4) -> str:
-    alphabet = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
-    return "".join(random.choice(alphabet) for _ in range(n))
-
-
-class Player:
-    def __init__(
-        self,
-        pid: Any,
-        name: str,
-        pos: int = 0,
-        color: str = "p-red",
-        card: Optional[str] = None,  # UWAGA: w tej wersji to tylko "display"
-        is_bot: bool = False
-    ):
-        self.id = pid
-        self.name = name
-        self.pos = int(pos)
-        self.color = color
-        self.card = card
-        self.is_bot = bool(is_bot)
-
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "pos": int(self.pos),
-            "color": self.color,
-            "card": self.card,
-            "is_bot": self.is_bot
-        }
-
-    @staticmethod
-    def from_dict(d: Dict[str, Any]) -> "Player":
-        return Player(
-            pid=d.get("id"),
-            name=d.get("name", "Gracz"),
-            pos=int(d.get("pos", 0)),
-            color=d.get("color", "p-red"),
-            card=d.get("card"),
-            is_bot=bool(d.get("is_bot", False))
-        )
-
-
-class MagicTiles:
-    def __init__(self, initial: Optional[Dict[int, Any]] = None):
-        self.tiles: Dict[int, Any] = dict(initial) if initial else MAGIC_TILES_TEMPLATE.copy()
-
-    @staticmethod
-    def from_any(mt: Any) -> "MagicTiles":
-        if not mt:
-            return MagicTiles(MAGIC_TILES_TEMPLATE.copy())
-
-        out: Dict[int, Any] = {}
-        if isinstance(mt, dict):
-            for k, v in mt.items():
-                try:
-                    out[int(k)] = v
-                except Exception:
-                    pass
-        elif isinstance(mt, list):
-            out = {int(x): None for x in mt}
-        return MagicTiles(out)
-
-    def to_json_dict(self) -> Dict[str, Any]:
-        return {str(k): v for k, v in self.tiles.items()}
-
-    def active_list(self) -> List[int]:
-        return [k for k, v in self.tiles.items() if v != "USED"]
-
-
-class Game:
-    def __init__(self, mode: str = "hotseat", variant: str = "classic"):
-        self.mode: str = mode
-        self.variant: str = variant
-
-        self.players: List[Player] = []
-        self.turn: int = 0
-
-        self.last_roll: Optional[int] = None
-        self.last_player: int = 0
-        self.message: str = ""
-        self.history: List[str] = []
-        self.move_count: int = 0
-
-        self.pending: Optional[Dict[str, Any]] = None
-        self.last_move: Optional[Dict[str, Any]] = None
-
-        self.magic: MagicTiles = MagicTiles(MAGIC_TILES_TEMPLATE.copy())
-
-        # KARTY: jedna karta na "gracza/drużynę"
-        # - hotseat: key = str(player.id)
-        # - ai classic: key = "h" / "a"
-        # - ai double: key = "h" / "a"
-        self.team_cards: Dict[str, Optional[str]] = {}
-
-        # Multiplayer
-        self.max_players: int = 2
-        self.winner: Optional[str] = None
-        self.rolls_in_turn: int = 0
-
-        self.updated_at: float = time.time()
-
-    def touch(self) -> None:
-        self.updated_at = time.time()
-
-    def push_history(self, text: str) -> None:
-        self.history.append(text)
-        self.history = self.history[-8:]
-
-    def current_index(self) -> int:
-        return int(self.turn) % max(1, len(self.players))
-
-    # ===== Helpers: team key / card =====
-    def _team_key_for_player(self, p: Player) -> str:
-        # AI modes: human vs ai
-        if self.mode == "ai":
-            pid = str(p.id)
-            if pid.startswith("h") or pid in ("0",):  # "Ty" classic ma pid=0
-                return "h"
-            return "a"
-        # hotseat / mp: każdy gracz osobno
-        return str(p.id)
-
-    def _get_team_card(self, p: Player) -> Optional[str]:
-        key = self._team_key_for_player(p)
-        return self.team_cards.get(key)
-
-    def _set_team_card(self, p: Player, value: Optional[str]) -> None:
-        key = self._team_key_for_player(p)
-        self.team_cards[key] = value
-
-    def _sync_cards_for_display(self) -> None:
-        # żeby UI dalej działał na players[i].card
-        for pl in self.players:
-            pl.card = self._get_team_card(pl)
-
-    def _team_card_exists(self, team_key: str) -> bool:
-        return bool(self.team_cards.get(team_key))
-
-    # ===== AI DOUBLE WIN =====
-    def _team_positions(self, prefix: str) -> List[int]:
-        return [int(p.pos) for p in self.players if str(p.id).startswith(prefix)]
-
-    def team_won(self, prefix: str) -> bool:
-        pos = self._team_positions(prefix)
-        return len(pos) >= 2 and all(x == BOARD_END for x in pos[:2])
-
-    def winner_text(self) -> Optional[str]:
-        if self.mode == "ai" and self.variant == "double":
-            if self.team_won("h"):
-                return "Ty"
-            if self.team_won("a"):
-                return "Komputer"
-        return None
-
-    def anyone_won(self) -> bool:
-        if self.mode == "ai" and self.variant == "double":
-            return self.team_won("h") or self.team_won("a")
-        return any(int(p.pos) == BOARD_END for p in self.players)
-
-    # ===== Rules helpers =====
-    def _mark_magic_tile_used_if_leaving(self, marker: Any, start_pos: int) -> None:
-        # marker = identyfikator "zajęcia" pola (teraz: team_key)
-        if start_pos in self.magic.tiles and self.magic.tiles.get(start_pos) == marker:
-            self.magic.tiles[start_pos] = "USED"
-
-    def _can_team_take_card_on_tile(self, team_key: str, pos: int) -> bool:
-        if pos not in self.magic.tiles:
-            return False
-        state = self.magic.tiles.get(pos)
-        if state == "USED":
-            return False
-        # jeśli pole jest "zarezerwowane" dla innej drużyny, nie da
-        if state is not None and state != team_key:
-            return False
-        # jeśli drużyna już ma kartę, nie może dostać nowej
-        if self.team_cards.get(team_key) is not None:
-            return False
-        return True
-
-    def _give_card_if_magic_tile(self, p: Player) -> Optional[str]:
-        pos = int(p.pos)
-        team_key = self._team_key_for_player(p)
-
-        if not self._can_team_take_card_on_tile(team_key, pos):
-            return None
-
-        card = random.choice(CARD_POOL)
-        self.team_cards[team_key] = card
-        self.magic.tiles[pos] = team_key  # "rezerwacja" żółtego pola dla tej drużyny
-        return f" ✨ Zdobywasz kartę: {card.replace('_', ' ')}"
-
-    def _try_start_snake_pending(self, p: Player, idx: int, resume: Optional[Dict[str, Any]] = None) -> bool:
-        pos = int(p.pos)
-        if not is_snake(pos):
-            return False
-
-        team_key = self._team_key_for_player(p)
-        team_card = self.team_cards.get(team_key)
-
-        # tylko człowiek dostaje okienko decyzji (w AI double też)
-        if team_card == "ANTY_WAZ" and (not p.is_bot):
-            pend = {
-                "type": "snake_choice",
-                "player_id": p.id if p.id is not None else idx,
-                "pawn_idx": idx,
-                "team_key": team_key,
-                "from": pos,
-                "to": SNAKE_LADDERS[pos],
-            }
-            if resume:
-                pend["resume"] = resume
-            self.pending = pend
-            return True
-
-        return False
-
-    def _apply_snake_if_no_pending(self, p: Player) -> Optional[str]:
-        pos = int(p.pos)
-        if is_snake(pos):
-            to = SNAKE_LADDERS[pos]
-            p.pos = to
-            return f" 🐍 Wąż! {pos} -> {to}"
-        return None
-
-    def _raw_move(self, idx: int) -> Tuple[str, int, bool, int, int, int]:
-        roll_value = random.randint(1, 6)
-        return self._move_with_roll(idx, roll_value)
-
-    def _move_with_roll(self, idx: int, roll_value: int) -> Tuple[str, int, bool, int, int, int]:
-        p = self.players[idx]
-        roll_value = int(roll_value)
-
-        start = int(p.pos)
-        tentative = start + roll_value
-
-        if tentative > BOARD_END:
-            msg = f"{p.name}: wyrzucono {roll_value}. Musisz trafić dokładnie!"
-            return msg, roll_value, False, start, start, start
-
-        # schodząc z żółtego pola — oznaczamy USED (teraz marker=team_key)
-        team_key = self._team_key_for_player(p)
-        self._mark_magic_tile_used_if_leaving(team_key, start)
-
-        p.pos = tentative
-        land_pos = tentative
-
-        msg = f"{p.name}: wyrzucono {roll_value}. Ruch: {start} -> {land_pos}"
-
-        if is_ladder(land_pos):
-            after = SNAKE_LADDERS[land_pos]
-            p.pos = after
-            msg = f"{p.name}: wyrzucono {roll_value}. Drabina! {land_pos} -> {after}"
-        elif is_snake(land_pos):
-            after = SNAKE_LADDERS[land_pos]
-            msg = f"{p.name}: wyrzucono {roll_value}. Wąż! {land_pos} -> {after}"
-
-        won = (int(p.pos) == BOARD_END) if not (self.mode == "ai" and self.variant == "double") else False
-        return msg, roll_value, bool(won), start, land_pos, int(p.pos)
-
-    # ===== AI double evaluation helpers =====
-    def _apply_ladder_virtual(self, n: int) -> int:
-        if is_ladder(n):
-            return int(SNAKE_LADDERS[n])
-        return int(n)
-
-    def _is_active_magic_for(self, p: Player, n: int) -> bool:
-        if n > BOARD_END:
-            return False
-        team_key = self._team_key_for_player(p)
-        if n not in self.magic.tiles:
-            return False
-        if self.magic.tiles.get(n) == "USED":
-            return False
-        # jeśli drużyna ma już kartę -> nie opłaca się "polować"
-        if self.team_cards.get(team_key) is not None:
-            return False
-        state = self.magic.tiles.get(n)
-        return (state is None) or (state == team_key)
-
-    def _score_runner_ladder(self, p: Player, die: int) -> int:
-        start = int(p.pos)
-        land = start + int(die)
-        if land > BOARD_END:
-            return -10_000
-        after = self._apply_ladder_virtual(land)
-
-        score = after * 10
-        if is_ladder(land):
-            score += 5000
-        if is_snake(land):
-            score -= 3000
-        score += max(0, after - 90) * 30
-        return score
-
-    def _score_card_collector(self, p: Player, die: int) -> int:
-        start = int(p.pos)
-        land = start + int(die)
-        if land > BOARD_END:
-            return -10_000
-
-        after = self._apply_ladder_virtual(land)
-        score = after * 5
-
-        if self._is_active_magic_for(p, land):
-            score += 6000
-        if is_snake(land):
-            score -= 1500
-        if is_ladder(land):
-            score += 700
-        return score
-
-    # ===== Normal roll (hotseat / ai classic) + AI double dice pending/auto =====
-    def roll(self) -> None:
-        self.touch()
-
-        if not self.players:
-            self.message = "Brak graczy."
-            return
-
-        if self.anyone_won():
-            self.message = "Gra zakończona."
-            return
-
-        if self.pending:
-            self.message = "Najpierw podejmij decyzję (pending)."
-            self.push_history(self.message)
-            self.last_move = None
-            return
-
-        idx = self.current_index()
-
-        # ===== AI DOUBLE: człowiek rzuca 2 kośćmi =====
-        if self.mode == "ai" and self.variant == "double":
-            if idx != 0:
-                self.message = "Teraz ruch komputera…"
-                self.push_history(self.message)
-                return
-
-            d1 = random.randint(1, 6)
-            d2 = random.randint(1, 6)
-
-            h1_done = int(self.players[0].pos) == BOARD_END
-            h2_done = int(self.players[1].pos) == BOARD_END
-
-            # jeśli dokładnie jeden pionek jest na mecie -> rzut tylko 1 kością (bez wyboru)
-            if h1_done ^ h2_done:
-                idx_move = 1 if h1_done else 0
-                d = random.randint(1, 6)
-
-                parts = [f"🎲 Wyrzucono: {d}. Drugi pionek jest na mecie — wykonujesz tylko 1 ruch."]
-
-                msg, rv, _, _, _, _ = self._move_with_roll(idx_move, d)
-                self.last_roll = int(rv)
-                self.last_player = idx_move
-                self.move_count += 1
-                parts.append(msg)
-
-                # snake pending (tylko człowiek)
-                if self._try_start_snake_pending(self.players[idx_move], idx_move,
-                                                 resume={"type": "after_auto_one", "next": None}):
-                    parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
-                    self.message = " | ".join(parts)
-                    self.push_history(self.message)
-                    self.last_move = None
-                    return
-
-                extra = self._apply_snake_if_no_pending(self.players[idx_move])
-                if extra:
-                    parts[-1] += extra
-                extra2 = self._give_card_if_magic_tile(self.players[idx_move])
-                if extra2:
-                    parts[-1] += extra2
-
-                if self.team_won("h"):
-                    self.pending = None
-                    self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
-                    self.push_history(self.message)
-                    return
+# statystyki planszy z rozegranych gier (patrz stats.py); STATS_FILE — wspólny plik workerów
+STATS = StatsCollector(
+    Path(os.environ.get("STATS_FILE", "data/stats.json")),
+    tiles=BOARD_END + 1,
+    cards=len(CARD_POOL),
+    flush_interval=float(os.environ.get("STATS_FLUSH_SECONDS", 30)),
+)
+Game.stats = STATS
 
-                self.pending = None
-                self.turn = 2
-                self.message = " | ".join(parts)
-                self.push_history(self.message)
-                return
-
-                extra = self._apply_snake_if_no_pending(self.players[idx_move])
-                if extra:
-                    parts[-1] += extra
-                extra2 = self._give_card_if_magic_tile(self.players[idx_move])
-                if extra2:
-                    parts[-1] += extra2
-
-                if self.team_won("h"):
-                    self.pending = None
-                    self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
-                    self.push_history(self.message)
-                    return
-
-                self.pending = None
-                self.turn = 2
-                self.message = " | ".join(parts)
-                self.push_history(self.message)
-                return
-
-            self.pending = {"type": "dice_choice", "dice": [d1, d2]}
-            self.message = f"🎲 Wyrzucono: {d1} i {d2}. Wybierz przypisanie kości do pionków."
-            self.push_history(self.message)
-            self.last_move = None
-            return
-
-        # ===== AI classic: blokuj gdy bot =====
-        if self.mode == "ai" and self.players[idx].is_bot:
-            self.message = "Teraz ruch komputera…"
-            self.push_history(self.message)
-            return
-
-        msg, roll_value, won, from_pos, land_pos, to_pos = self._raw_move(idx)
-
-        self.last_roll = int(roll_value)
-        self.last_player = idx
-        self.move_count += 1
-
-        if (not won) and self._try_start_snake_pending(self.players[idx], idx):
-            msg += " 🃏 Masz ANTY WĄŻ - wybierz: zostać czy cofnąć się?"
-            self.message = msg
-            self.push_history(msg)
-            self.last_move = None
-            return
-
-        if not won:
-            extra = self._apply_snake_if_no_pending(self.players[idx])
-            if extra:
-                msg += extra
-                to_pos = int(self.players[idx].pos)
+# ===== MULTIPLAYER SAVE =====
+# katalog powstaje przy pierwszym zapisie / starcie usług, nie przy imporcie
+ROOMS_DIR = Path("data/rooms")
 
-        if not won:
-            extra2 = self._give_card_if_magic_tile(self.players[idx])
-            if extra2:
-                msg += extra2
+# ROOM_DURABILITY=none|strict|group|behind, ROOM_COALESCE_MS — okno sklejania zapisów
+# jednego pokoju w trybie none (domyślnie 0 = wyłączone: przy kilku workerach inny
+# proces przez to okno czytałby stary stan z dysku), ROOM_SHARDS — podkatalogi z własnym
+# wątkiem zapisu (0 = płaski katalog; patrz room_store.py)
+ROOM_STORE = RoomStore(
+    ROOMS_DIR,
+    durability=os.environ.get("ROOM_DURABILITY", "none"),
+    coalesce_window=float(os.environ.get("ROOM_COALESCE_MS", 0)) / 1000.0,
+    shards=int(os.environ.get("ROOM_SHARDS", 8)),
+)
 
-        if (not won) and int(roll_value) == 6:
-            msg += " 🎲 Bonus: 6 → dodatkowy rzut!"
 
-        self.last_move = {
-            "player": idx,
-            "from": from_pos,
-            "land": land_pos,
-            "to": int(self.players[idx].pos),
-            "move_count": self.move_count,
-            "won": bool(won),
-        } if (from_pos != int(self.players[idx].pos) or from_pos != land_pos) else None
+# gorący stan pokoi w pliku mmap (patrz room_table.py), wspólny dla workerów;
+# ROOM_TABLE=off wyłącza — /hot czyta wtedy plik pokoju
+ROOM_TABLE = RoomTable(
+    Path(os.environ.get("ROOM_TABLE_FILE", "data/room_table.bin")) if os.environ.get("ROOM_TABLE") != "off" else None,
+    magic_tiles=list(MAGIC_TILES_TEMPLATE),
+    cards=CARD_POOL,
+)
 
-        self.message = msg
-        self.push_history(msg)
 
-        if not won and int(roll_value) != 6:
-            self.turn = (idx + 1) % len(self.players)
+def room_path(code: str) -> Path:
+    return ROOM_STORE.path(code)
 
-    # ===== AI DOUBLE: apply dice choice for human (2 moves) =====
-    def apply_dice_choice_human(self, swap: bool) -> None:
-        self.touch()
 
-        if not (self.mode == "ai" and self.variant == "double"):
-            return
+def load_room(code: str) -> Dict[str, Any]:
+    room = ROOM_STORE.load(code)
+    ROOM_INDEX.observe(code, room)
+    return room
 
-        pend = self.pending
-        if not pend or pend.get("type") != "dice_choice":
-            return
 
-        d1, d2 = pend.get("dice", [None, None])
-        if d1 is None or d2 is None:
-            self.pending = None
-            return
+def save_room(code: str, data: Dict[str, Any]) -> None:
+    size = ROOM_STORE.save(code, data)
+    ROOM_TABLE.put(code, data)
+    ROOM_INDEX.update(code, data, size)
 
-        i1, i2 = 0, 1
-        r1, r2 = (d2, d1) if swap else (d1, d2)
 
-        parts: List[str] = []
+def delete_room(code: str) -> None:
+    ROOM_STORE.delete(code)
+    ROOM_TABLE.clear(code)
+    ROOM_SNAPSHOTS.invalidate(code)
 
-        msg1, rv1, _, _, _, _ = self._move_with_roll(i1, r1)
-        self.last_roll = int(rv1)
-        self.last_player = i1
-        self.move_count += 1
-        parts.append(msg1)
 
-        if self._try_start_snake_pending(self.players[i1], i1, resume={"type": "after_dice_choice", "next": [i2, r2]}):
-            parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
-            self.message = " | ".join(parts)
-            self.push_history(self.message)
-            self.last_move = None
-            return
+def bump_version(room: Dict[str, Any]) -> None:
+    room["version"] = int(room.get("version", 0)) + 1
 
-        extra = self._apply_snake_if_no_pending(self.players[i1])
-        if extra:
-            parts[-1] += extra
-        extra2 = self._give_card_if_magic_tile(self.players[i1])
-        if extra2:
-            parts[-1] += extra2
-
-        if self.team_won("h"):
-            self.pending = None
-            self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
-            self.push_history(self.message)
-            return
 
-        msg2, rv2, _, _, _, _ = self._move_with_roll(i2, r2)
-        self.last_roll = int(rv2)
-        self.last_player = i2
-        self.move_count += 1
-        parts.append(msg2)
-
-        if self._try_start_snake_pending(self.players[i2], i2, resume={"type": "after_dice_choice", "next": None}):
-            parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
-            self.message = " | ".join(parts)
-            self.push_history(self.message)
-            self.last_move = None
-            return
+def room_locked(fn):
+    # odczyt-zmiana-zapis pokoju pod blokadą kodu (wątki i workery, patrz RoomStore.lock):
+    # bez niej ruch gracza, tura bota i timeout z tej samej wersji nadpisują sobie zapisy
+    @functools.wraps(fn)
+    def wrapper(code, *args, **kwargs):
+        with ROOM_STORE.lock(code.upper()):
+            return fn(code, *args, **kwargs)
+    return wrapper
 
-        extra = self._apply_snake_if_no_pending(self.players[i2])
-        if extra:
-            parts[-1] += extra
-        extra2 = self._give_card_if_magic_tile(self.players[i2])
-        if extra2:
-            parts[-1] += extra2
-
-        if self.team_won("h"):
-            self.pending = None
-            self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
-            self.push_history(self.message)
-            return
 
-        self.pending = None
-        self.turn = 2
-        self.message = " | ".join(parts)
-        self.push_history(self.message)
+def save_room_bumped(code: str, room: Dict[str, Any]) -> None:
+    bump_version(room)
+    room["updated"] = round(time.time(), 3)  # ostatnia zmiana pokoju — wspólna dla wszystkich workerów
+    save_room(code, room)
+    # serializacja raz na wersję: ten sam bufor dla /state i dla kanału push
+    snap = ROOM_SNAPSHOTS.put(code, room)
+    if ROOM_HUB.listeners(code):
+        ROOM_HUB.publish(code, snap.version, snap.raw)
+    schedule_turn_timeout(code, room)
+    if is_bot_turn(room):
+        ROOM_BOTS.wake(code)
+
+
+def room_activity(code: str, room: Dict[str, Any]) -> float:
+    # czas ostatniej zmiany pokoju zapisany na dysku (widzą go wszystkie workery)
+    if room.get("updated"):
+        return float(room["updated"])
+    try:
+        return ROOM_STORE.path(code).stat().st_mtime
+    except FileNotFoundError:
+        return time.time()  # zapis jeszcze w kolejce wątku zapisu
+
+
+ROOM_SNAPSHOTS = RoomSnapshotCache(room_path)
+
+# zakończone gry po ROOM_TTL_FINISHED trafiają do archiwum segmentowego (room_archive.py):
+# znikają z gorącego magazynu, ale powtórka i statystyki dalej działają; kod wraca
+# do puli, a gra w archiwum ma własny numer (/mp/archive/<id>/replay)
+ROOM_ARCHIVE = RoomArchive(Path(os.environ.get("ROOM_ARCHIVE_DIR", "data/archive")))
+
+
+@room_locked
+def retire_room(code: str) -> bool:
+    # wołane przez wątek wygaszania ROOM_INDEX; False = pokój zostaje w indeksie.
+    # Indeks zna tylko aktywność z tego procesu — o wygaszeniu decyduje czas
+    # ostatniej zmiany zapisany w pokoju (gra mogła toczyć się przez inny worker)
+    room = ROOM_STORE.load(code)
+    if not room:
+        return True  # już usunięty (inny worker)
+    activity = room_activity(code, room)
+    ttl = ROOM_INDEX.ttl_finished if room.get("winner") else ROOM_INDEX.ttl_idle
+    if time.time() - activity < ttl:
+        ROOM_INDEX.touch(code, activity, room.get("winner"))
+        return False
+    if room.get("winner") and room.get("replay"):
+        try:
+            ROOM_ARCHIVE.append(code, room)
+        except OSError:
+            return False  # spróbujemy przy następnym przebiegu
+    delete_room(code)
+    ROOM_PRESENCE.forget(code)
+    return True
+
+# indeks pokoi: przydział kodów bez pętli stat() + wygaszanie zakończonych/porzuconych w tle
+# (ROOM_TTL_FINISHED / ROOM_TTL_IDLE w sekundach)
+ROOM_INDEX = RoomIndex(
+    ROOMS_DIR,
+    ttl_finished=float(os.environ.get("ROOM_TTL_FINISHED", 10 * 60)),
+    ttl_idle=float(os.environ.get("ROOM_TTL_IDLE", 60 * 60 * 24)),
+    files=ROOM_STORE.iter_files,
+)
+
+
+# ===== obecność + limit czasu tury (AFK) =====
+# Sygnał obecności to poll /state albo otwarty kanał push (z ciasteczkiem gracza).
+# Po każdej zmianie pokoju koło czasowe dostaje jeden timer na pokój:
+#   - gracz na turze obecny, ale bez ruchu -> auto-rzut (albo "zostań" na wężu),
+#   - gracz nieobecny -> tura pominięta,
+#   - nikt nieobecny od ROOM_ABANDON_SECONDS -> pokój usuwany.
+# Zakończone pokoje nie mają timera — wygasza je ROOM_INDEX.
+# Timery i obecność są w pamięci procesu, a gracz może grać przez inny worker:
+# timer pamięta wersję (i turę), na którą był ustawiony, i nic nie robi, jeśli
+# pokój się od tego czasu zmienił; porzucenie liczymy od zapisanego w pokoju
+# czasu ostatniej zmiany (room["updated"], dla starszych pokoi mtime pliku),
+# nie tylko od obecności widzianej w tym procesie.
+TURN_TIMEOUT = float(os.environ.get("ROOM_TURN_TIMEOUT", 45))
+PRESENCE_TIMEOUT = float(os.environ.get("ROOM_PRESENCE_TIMEOUT", 20))
+ROOM_ABANDON_SECONDS = float(os.environ.get("ROOM_ABANDON_SECONDS", 600))
+ROOM_PRESENCE = RoomPresence()
+ROOM_TIMERS = TimerWheel(tick=0.5)
+
+
+def schedule_turn_timeout(code: str, room: Dict[str, Any], delay: Optional[float] = None) -> None:
+    if room.get("winner"):
+        ROOM_TIMERS.cancel(code)
+        return
+    version, turn = int(room.get("version", 0)), int(room.get("turn", 0))
+    ROOM_TIMERS.schedule(code, TURN_TIMEOUT if delay is None else delay,
+                         lambda: on_turn_timeout(code, version, turn))
 
-    # ===== snake decision (classic + mp + double resume) =====
-    def snake_decision(self, player_id: Any, choice: str) -> None:
-        self.touch()
 
-        pend = self.pending
-        if not pend or pend.get("type") != "snake_choice":
+@room_locked
+def on_turn_timeout(code: str, version: int, turn: int) -> None:
+    # wątek koła czasowego
+    room = load_room(code)
+    if not room or room.get("winner"):
+        ROOM_PRESENCE.forget(code)
+        return
+    if (int(room.get("version", 0)), int(room.get("turn", 0))) != (version, turn):
+        # ktoś ruszył pokój po ustawieniu timera (może przez inny worker) — liczymy od nowa
+        schedule_turn_timeout(code, room)
+        return
+    now = time.time()
+    present = ROOM_PRESENCE.present(code, PRESENCE_TIMEOUT, now)
+    if not present:
+        idle_since = max(ROOM_PRESENCE.last_seen(code), room_activity(code, room))
+        left = ROOM_ABANDON_SECONDS - (now - idle_since)
+        if left <= 0:
+            delete_room(code)
+            ROOM_INDEX.remove(code)
+            ROOM_PRESENCE.forget(code)
             return
+        schedule_turn_timeout(code, room, delay=left)
+        return
+    if len(room.get("players", [])) < 2:
+        schedule_turn_timeout(code, room)
+        return
+    if is_bot_turn(room):
+        # bot nie ma limitu czasu — tura w puli botów (np. zgubiona po restarcie)
+        ROOM_BOTS.wake(code, delay=0)
+        schedule_turn_timeout(code, room)
+        return
 
-        idx = next((i for i, p in enumerate(self.players) if p.id == player_id), None)
-        if idx is None:
-            self.pending = None
+    game = Game.from_room_dict(room)
+    pend = game.pending
+    if pend and pend.get("type") == "snake_choice":
+        snake_pid = pend.get("player_id")
+        if snake_pid is None:
+            # uszkodzone pending bez gracza — nie zgadujemy, czekamy na kolejny timer
+            schedule_turn_timeout(code, room)
             return
-
-        pl = self.players[idx]
-        from_pos = int(pl.pos)
-        land_pos = int(pend["from"])
-
-        team_key = pend.get("team_key") or self._team_key_for_player(pl)
-        resume = pend.get("resume")
-
-        if choice == "back":
-            # NIE zużywamy karty
-            pl.pos = int(pend["to"])
-            msg = f"{pl.name}: wybrał(a) cofnięcie. 🐍 {pend['from']} -> {pend['to']}"
+        game.mp_act(ACT_SNAKE, snake_pid, "stay")
+    else:
+        pid = game.players[game.current_index()].id
+        if pid not in present:
+            game.mp_act(ACT_SKIP, pid)
         else:
-            # Zużywamy ANTY_WAZ drużyny
-            if self.team_cards.get(team_key) == "ANTY_WAZ":
-                self.team_cards[team_key] = None
-            msg = f"{pl.name}: użył(a) ANTY WĄŻ i zostaje na {pend['from']} ✅"
-
-        self.pending = None
-
-        self.message = msg
-        self.push_history(msg)
-
-        self.move_count += 1
-        self.last_move = {
-            "player": idx,
-            "from": from_pos,
-            "land": land_pos,
-            "to": int(pl.pos),
-            "move_count": self.move_count,
-            "won": False,
-        }
-
-        # ===== AI DOUBLE resume: execute second pawn move after snake decision =====
-        if self.mode == "ai" and self.variant == "double" and isinstance(resume, dict) and resume.get("type") == "after_dice_choice":
-            nxt = resume.get("next")
-            if nxt:
-                i2, r2 = int(nxt[0]), int(nxt[1])
-                parts = [self.message]
-
-                msg2, rv2, _, _, _, _ = self._move_with_roll(i2, r2)
-                self.last_roll = int(rv2)
-                self.last_player = i2
-                self.move_count += 1
-                parts.append(msg2)
-
-                if self._try_start_snake_pending(self.players[i2], i2, resume={"type": "after_dice_choice", "next": None}):
-                    parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
-                    self.message = " | ".join(parts)
-                    self.push_history(self.message)
-                    self.last_move = None
-                    return
-
-                extra = self._apply_snake_if_no_pending(self.players[i2])
-                if extra:
-                    parts[-1] += extra
-                extra2 = self._give_card_if_magic_tile(self.players[i2])
-                if extra2:
-                    parts[-1] += extra2
-
-                if self.team_won("h"):
-                    self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
-                    self.push_history(self.message)
-                    return
-
-                self.turn = 2
-                self.message = " | ".join(parts)
-                self.push_history(self.message)
-                return
-
-            self.turn = 2
-            return
-
-        if self.last_roll != 6:
-            self.turn = (idx + 1) % len(self.players)
-
-    # ===== use_card (TELEPORT only) =====
-    def use_card(self, pawn_idx: Optional[int] = None) -> None:
-        self.touch()
-
-        if not self.players or self.anyone_won():
-            return
-        if self.pending:
-            self.message = "Najpierw rozwiąż decyzję (pending)."
-            self.push_history(self.message)
-            return
-
-        idx_turn = self.current_index()
-        turn_player = self.players[idx_turn]
-        team_key = self._team_key_for_player(turn_player)
-        card = self.team_cards.get(team_key)
-        if not card:
-            return
-
-        # W AI double: człowiek może użyć na wybranym swoim pionku (0 lub 1)
-        target_idx = idx_turn
-        if self.mode == "ai" and self.variant == "double" and team_key == "h":
-            if pawn_idx is not None:
-                try:
-                    pi = int(pawn_idx)
-                    if pi in (0, 1):
-                        target_idx = pi
-                except Exception:
-                    pass
-
-        pl = self.players[target_idx]
-
-        # nie pozwól użyć na pionku już na mecie
-        if int(pl.pos) == BOARD_END:
-            self.message = "Ten pionek jest już na mecie."
-            self.push_history(self.message)
-            return
-
-        if card == "TELEPORT_PLUS3":
-            start = int(pl.pos)
-            tentative = start + 3
-
-            if tentative > BOARD_END:
-                msg = f"{pl.name}: TELEPORT +3, ale musisz trafić dokładnie!"
-                self.message = msg
-                self.push_history(msg)
-                return
-
-            # schodzimy z żółtego pola (marker=team_key)
-            self._mark_magic_tile_used_if_leaving(team_key, start)
-
-            # zużyj kartę drużyny
-            self.team_cards[team_key] = None
-
-            pl.pos = tentative
-            msg = f"{pl.name}: używa TELEPORT +3: {start} -> {tentative}"
-            land_pos = tentative
-
-            if is_ladder(tentative):
-                after = SNAKE_LADDERS[tentative]
-                pl.pos = after
-                msg += f" 🪜 Drabina! {tentative} -> {after}"
-            elif is_snake(tentative):
-                # człowiek: może mieć ANTY_WAZ tylko jeśli drużyna ma ANTY_WAZ (ale teraz zużyliśmy teleport)
-                extra = self._apply_snake_if_no_pending(pl)
-                if extra:
-                    msg += extra
-
-            extra2 = self._give_card_if_magic_tile(pl)
-            if extra2:
-                msg += extra2
-
-            self.move_count += 1
-            self.last_move = {
-                "player": target_idx,
-                "from": start,
-                "land": land_pos,
-                "to": int(pl.pos),
-                "move_count": self.move_count,
-                "won": False,
-            }
-
-            self.message = msg
-            self.push_history(msg)
-
-    # ===== AI classic =====
-    def ai_move(self) -> None:
-        self.touch()
-
-        if not self.players or self.anyone_won():
-            return
-
-        idx = self.current_index()
-        if not (self.mode == "ai" and self.players[idx].is_bot):
-            return
-
-        bot = self.players[idx]
-        team_key = self._team_key_for_player(bot)
-
-        # BOT: TELEPORT asap (karta drużyny)
-        if self.team_cards.get(team_key) == "TELEPORT_PLUS3" and not self.pending:
-            start = int(bot.pos)
-            tentative = start + 3
-            if tentative <= BOARD_END:
-                self._mark_magic_tile_used_if_leaving(team_key, start)
-                self.team_cards[team_key] = None
-                bot.pos = tentative
-
-                msg = f"{bot.name}: używa TELEPORT +3: {start} -> {tentative}"
-
-                if is_ladder(tentative):
-                    after = SNAKE_LADDERS[tentative]
-                    bot.pos = after
-                    msg += f" 🪜 Drabina! {tentative} -> {after}"
-                elif is_snake(tentative):
-                    # BOT: jeśli ma ANTY_WAZ jako karta drużyny, to zostaje
-                    if self.team_cards.get(team_key) == "ANTY_WAZ":
-                        self.team_cards[team_key] = None
-                        msg += f" 🃏 BOT używa ANTY WĄŻ i zostaje na {tentative} ✅"
-                    else:
-                        extra = self._apply_snake_if_no_pending(bot)
-                        if extra:
-                            msg += extra
-
-                extra2 = self._give_card_if_magic_tile(bot)
-                if extra2:
-                    msg += extra2
-
-                self.move_count += 1
-                self.last_roll = None
-                self.last_player = idx
-                self.last_move = {
-                    "player": idx,
-                    "from": start,
-                    "land": tentative,
-                    "to": int(bot.pos),
-                    "move_count": self.move_count,
-                    "won": bool(int(bot.pos) == BOARD_END),
-                }
-
-                self.message = msg
-                self.push_history(msg)
-
-                if int(bot.pos) == BOARD_END:
-                    return
+            game.mp_act(ACT_ROLL, pid)
+    if not game.message.startswith("⏱"):
+        game.message = "⏱ " + game.message
+        if game.history:
+            game.history[-1] = "⏱ " + game.history[-1]
+    room = game.to_room_dict(room)
+    save_room_bumped(code, room)
 
-        msg, roll_value, won, from_pos, land_pos, to_pos = self._raw_move(idx)
-
-        self.last_roll = int(roll_value)
-        self.last_player = idx
-        self.move_count += 1
-
-        pos_after = int(self.players[idx].pos)
-        if (not won) and is_snake(pos_after):
-            if self.team_cards.get(team_key) == "ANTY_WAZ":
-                self.team_cards[team_key] = None
-                msg += f" 🃏 BOT używa ANTY WĄŻ i zostaje na {pos_after} ✅"
-            else:
-                extra = self._apply_snake_if_no_pending(self.players[idx])
-                if extra:
-                    msg += extra
-
-        if not won:
-            extra2 = self._give_card_if_magic_tile(self.players[idx])
-            if extra2:
-                msg += extra2
-
-        if (not won) and int(roll_value) == 6:
-            msg += " 🎲 Bonus: 6 → dodatkowy rzut!"
-
-        self.last_move = {
-            "player": idx,
-            "from": from_pos,
-            "land": land_pos,
-            "to": int(self.players[idx].pos),
-            "move_count": self.move_count,
-            "won": bool(won),
-        } if (from_pos != int(self.players[idx].pos) or from_pos != land_pos) else None
-
-        self.message = msg
-        self.push_history(msg)
-
-        if not won and int(roll_value) != 6:
-            self.turn = (idx + 1) % len(self.players)
-
-    # ===== AI DOUBLE: one click AI turn (2 dice + strategies) =====
-    def ai_pair_move(self) -> None:
-        self.touch()
-
-        if not (self.mode == "ai" and self.variant == "double"):
-            return
-        if self.pending or self.anyone_won():
-            return
-        if self.current_index() != 2:
-            return
 
-        ladder_idx = 2
-        card_idx = 3
+# ===== boty w pokojach mp =====
+# Miejsce bota to gracz z is_bot w pokoju. Tury botów liczy wspólna pula
+# (bot_runner.py) zaraz po zapisie, który oddał im turę — bez udziału klienta;
+# jedna tura bota = jeden zapis, który budzi kanał push i poll /hot.
+# Boty grają tylko, gdy ktoś jest w pokoju; pusty pokój wygasza timer tury.
+SEAT_COLORS = ["p-red", "p-blue", "p-green", "p-purple"]
 
-        ladder_p = self.players[ladder_idx]
-        card_p = self.players[card_idx]
-        team_key = "a"
 
-        parts: List[str] = []
+def is_bot_turn(room: Dict[str, Any]) -> bool:
+    players = room.get("players") or []
+    if len(players) < 2 or room.get("winner"):
+        return False
+    return bool(players[int(room.get("turn", 0)) % len(players)].get("is_bot"))
 
-        # Jeśli AI ma TELEPORT jako karta drużyny -> spróbuj użyć sensownie
-        if self.team_cards.get(team_key) == "TELEPORT_PLUS3":
-            used = False
 
-            # card-pionek preferuje magic / drabiny
-            if self._is_active_magic_for(card_p, int(card_p.pos) + 3) or is_ladder(int(card_p.pos) + 3) or (int(card_p.pos) + 3 >= BOARD_END - 3):
-                parts.extend(self._ai_use_teleport_double(card_idx, prefer_magic=True))
-                used = True
+@room_locked
+def run_bot_turn(code: str) -> None:
+    # wątek puli botów
+    room = load_room(code)
+    if not room or not is_bot_turn(room):
+        return
+    if not ROOM_PRESENCE.present(code, PRESENCE_TIMEOUT):
+        return
+    game = Game.from_room_dict(room)
+    if game.mp_bot_turn():
+        save_room_bumped(code, game.to_room_dict(room))
 
-            # jeśli nie zużył, ladder-pionek zużyje gdy pomaga
-            if (not used):
-                t = int(ladder_p.pos) + 3
-                if t <= BOARD_END and (is_ladder(t) or t >= BOARD_END - 3):
-                    parts.extend(self._ai_use_teleport_double(ladder_idx, prefer_magic=False))
-                    used = True
 
-        if self.anyone_won():
-            self.message = " | ".join(parts)
-            self.push_history(self.message)
-            return
+ROOM_BOTS = BotRunner(
+    run_bot_turn,
+    workers=int(os.environ.get("ROOM_BOT_WORKERS", 2)),
+    batch=int(os.environ.get("ROOM_BOT_BATCH", 32)),
+    delay=float(os.environ.get("ROOM_BOT_DELAY_MS", 600)) / 1000.0,
+)
 
-        d1 = random.randint(1, 6)
-        d2 = random.randint(1, 6)
-        parts.append(f"🤖 AI rzuca: {d1} i {d2}")
 
-        scoreA = self._score_runner_ladder(ladder_p, d1) + self._score_card_collector(card_p, d2)
-        scoreB = self._score_runner_ladder(ladder_p, d2) + self._score_card_collector(card_p, d1)
+def next_seat(room: Dict[str, Any]) -> Tuple[str, str]:
+    used = {p.get("color") for p in room["players"]}
+    color = next((c for c in SEAT_COLORS if c not in used), SEAT_COLORS[0])
+    return f"p{len(room['players']) + 1}", color
 
-        if scoreB > scoreA:
-            ladder_roll, card_roll = d2, d1
-            parts.append("🤖 AI wybiera przypisanie: ladder←druga kość, cards←pierwsza kość")
-        else:
-            ladder_roll, card_roll = d1, d2
-            parts.append("🤖 AI wybiera przypisanie: ladder←pierwsza kość, cards←druga kość")
 
-        parts.extend(self._ai_move_one_double(ladder_idx, ladder_roll))
-        if self.team_won("a"):
-            self.message = " | ".join(parts) + " 🏁 Wygrana AI! Oba pionki na mecie."
-            self.push_history(self.message)
+def add_bot_seat(room: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # nowy pokój (dict) z botem na wolnym miejscu albo None, gdy pełno / po grze
+    if room.get("winner") or len(room["players"]) >= int(room.get("max_players", 2)):
+        return None
+    new_id, color = next_seat(room)
+    name = f"🤖 Bot {sum(1 for p in room['players'] if p.get('is_bot')) + 1}"
+    room["players"].append({"id": new_id, "name": name, "pos": 0, "color": color, "card": None, "is_bot": True})
+    append_action(room, ACT_JOIN, len(room["players"]) - 1)
+    room["message"] = f"✅ Dołączył: {name}"
+    room["history"] = (room.get("history") or [])[-7:] + [room["message"]]
+    return room
+
+
+# ===== start usług: I/O i wątki tła dopiero przy pierwszym żądaniu =====
+_services_started = False
+_services_lock = threading.Lock()
+
+
+@app.before_request
+def start_services() -> None:
+    global _services_started
+    if _services_started:
+        return
+    with _services_lock:
+        if _services_started:
             return
+        ROOMS_DIR.mkdir(parents=True, exist_ok=True)
+        ROOM_STORE.migrate_flat()
+        ROOM_STORE.cleanup_tmp()
+        ROOM_INDEX.start_background(retire_room)
+        STATS.start_background()
+        _services_started = True
+
+
+# ===== kontrola przyjęć: limity per klient + globalny limit zapisów pokoi =====
+# ADMISSION=off wyłącza całość (benchmarki, testy obciążeniowe)
+ADMISSION_ON = os.environ.get("ADMISSION", "on") != "off"
+ADMISSION_COUNTERS = Counters()
+RATE_LIMITS = {
+    # tworzenie gier/pokoi i dołączanie: domyślnie 20/min, seria do 5
+    "create": RateLimiter(
+        float(os.environ.get("RATE_CREATE_PER_MIN", 20)) / 60.0 if ADMISSION_ON else 0,
+        float(os.environ.get("RATE_CREATE_BURST", 5)),
+    ),
+    # akcje w grze: domyślnie 10/s, seria do 30 (auto-ruchy AI też się mieszczą)
+    "action": RateLimiter(
+        float(os.environ.get("RATE_ACTION_PER_SEC", 10)) if ADMISSION_ON else 0,
+        float(os.environ.get("RATE_ACTION_BURST", 30)),
+    ),
+}
+ROOM_WRITE_GATE = WriteGate(
+    int(os.environ.get("ROOM_WRITE_CONCURRENCY", 8)) if ADMISSION_ON else 0,
+    max_queue=int(os.environ.get("ROOM_WRITE_QUEUE", 64)),
+    timeout=float(os.environ.get("ROOM_WRITE_WAIT", 2.0)),
+    counters=ADMISSION_COUNTERS,
+)
+# endpoint -> kubełek; zapisujące pokoje dodatkowo przechodzą przez ROOM_WRITE_GATE
+ADMISSION_ROUTES = {
+    "new_game": "create",
+    "mp_create": "create",
+    "mp_join": "create",
+    "roll": "action",
+    "dice_choice": "action",
+    "snake_decision": "action",
+    "use_card": "action",
+    "set_policy": "action",
+    "ai_move": "action",
+    "mp_roll": "action",
+    "mp_snake_decision": "action",
+    "mp_use_card": "action",
+    "mp_policy": "action",
+    "mp_add_bot": "create",
+    "mp_replay": "action",
+}
+ROOM_WRITE_ROUTES = {"mp_create", "mp_join", "mp_roll", "mp_snake_decision", "mp_use_card", "mp_policy", "mp_add_bot"}
 
-        parts.extend(self._ai_move_one_double(card_idx, card_roll))
-        if self.team_won("a"):
-            self.message = " | ".join(parts) + " 🏁 Wygrana AI! Oba pionki na mecie."
-            self.push_history(self.message)
-            return
 
-        self.turn = 0
-        self.message = " | ".join(parts)
-        self.push_history(self.message)
-
-    def _ai_use_teleport_double(self, idx: int, prefer_magic: bool) -> List[str]:
-        parts: List[str] = []
-        bot = self.players[idx]
-        team_key = self._team_key_for_player(bot)
-
-        if self.team_cards.get(team_key) != "TELEPORT_PLUS3":
-            return parts
-
-        start = int(bot.pos)
-        t = start + 3
-        if t > BOARD_END:
-            return parts
-
-        if prefer_magic:
-            good = self._is_active_magic_for(bot, t) or is_ladder(t) or (t >= BOARD_END - 3)
-            if not good:
-                return parts
-
-        self._mark_magic_tile_used_if_leaving(team_key, start)
-
-        # zużyj karta drużyny
-        self.team_cards[team_key] = None
-
-        bot.pos = t
-        msg = f"{bot.name}: używa TELEPORT +3: {start} -> {t}"
-
-        if is_ladder(t):
-            after = SNAKE_LADDERS[t]
-            bot.pos = after
-            msg += f" 🪜 Drabina! {t} -> {after}"
-        elif is_snake(t):
-            # BOT: jeśli ma ANTY_WAZ jako karta drużyny -> zostań (ale tu teleport już zużył, więc raczej nie)
-            extra = self._apply_snake_if_no_pending(bot)
-            if extra:
-                msg += extra
-
-        extra2 = self._give_card_if_magic_tile(bot)
-        if extra2:
-            msg += extra2
-
-        parts.append(msg)
-        return parts
-
-    def _ai_move_one_double(self, idx: int, roll: int) -> List[str]:
-        parts: List[str] = []
-        msg, rv, _, _, _, _ = self._move_with_roll(idx, roll)
-        self.last_roll = int(rv)
-        self.last_player = idx
-        self.move_count += 1
-        parts.append(msg)
-
-        bot = self.players[idx]
-        team_key = self._team_key_for_player(bot)
-        pos_after = int(bot.pos)
-
-        if is_snake(pos_after) and self.team_cards.get(team_key) == "ANTY_WAZ":
-            self.team_cards[team_key] = None
-            parts[-1] += f" 🃏 BOT używa ANTY WĄŻ i zostaje na {pos_after} ✅"
-        else:
-            extra = self._apply_snake_if_no_pending(bot)
-            if extra:
-                parts[-1] += extra
+def client_key() -> str:
+    # za reverse proxy (TRUST_PROXY=1) liczymy pierwszego klienta z X-Forwarded-For
+    if os.environ.get("TRUST_PROXY") == "1" and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or "-"
 
-        extra2 = self._give_card_if_magic_tile(bot)
-        if extra2:
-            parts[-1] += extra2
 
-        return parts
+def refuse(status: int, retry_after: float, text: str):
+    resp = make_response(text, status)
+    resp.mimetype = "text/plain"
+    resp.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
-    # ===== Multiplayer (bez zmian logiki kart tutaj) =====
-    def mp_roll(self, my_pid: str) -> None:
-        self.touch()
 
-        if self.winner:
-            self.message = "Gra zakończona."
-            return
+@app.before_request
+def admit_request():
+    bucket = ADMISSION_ROUTES.get(request.endpoint or "")
+    if bucket is None:
+        return None
+    wait = RATE_LIMITS[bucket].take(client_key())
+    if wait > 0:
+        ADMISSION_COUNTERS.inc(f"{bucket}_limited")
+        return refuse(429, wait, "Za dużo żądań — spróbuj za chwilę.")
+    ADMISSION_COUNTERS.inc(f"{bucket}_allowed")
+    if request.endpoint in ROOM_WRITE_ROUTES:
+        if ROOM_WRITE_GATE.acquire() is not None:
+            return refuse(503, 1, "Serwer jest przeciążony — spróbuj za chwilę.")
+        g.room_write_slot = True
+    return None
+
+
+@app.teardown_request
+def release_write_slot(exc=None) -> None:
+    if g.pop("room_write_slot", False):
+        ROOM_WRITE_GATE.release()
+
+
+@app.route("/stats/admission")
+def admission_stats():
+    return jsonify({
+        "enabled": ADMISSION_ON,
+        "counters": ADMISSION_COUNTERS.snapshot(),
+        "room_writes": ROOM_WRITE_GATE.state(),
+        "clients": {name: len(lim) for name, lim in RATE_LIMITS.items()},
+        "limits": {name: {"rate_per_sec": lim.rate, "burst": lim.burst} for name, lim in RATE_LIMITS.items()},
+    })
 
-        if self.pending:
-            self.message = "Najpierw podejmij decyzję na wężu."
-            return
 
-        idx = next((i for i, p in enumerate(self.players) if p.id == my_pid), None)
-        if idx is None:
-            self.message = "Nie jesteś w tym pokoju."
-            return
+# ===== push: WebSocket per pokój (flask-sock opcjonalnie; bez niego zostaje polling /state) =====
+ROOM_HUB = RoomHub()
+WS_RECHECK_SECONDS = 2.0
 
-        if idx != int(self.turn):
-            self.message = "Nie twoja tura."
-            return
 
-        if self.rolls_in_turn >= 3:
-            self.turn = (idx + 1) % len(self.players)
-            self.rolls_in_turn = 0
-            self.message = "Limit 3 rzutów w turze — koniec tury."
-            self.push_history(self.message)
-            return
+# ===== SESJE (hotseat / ai) =====
+# SESSION_STORE=memory (domyślnie, 1 worker) albo sqlite (wiele workerów na jednym hoście)
+SESSIONS: SessionStore = make_session_store(
+    os.environ.get("SESSION_STORE", "memory"),
+    Path(os.environ.get("SESSION_DB", "data/sessions.sqlite3")),
+    encode=lambda g: g.to_session_dict(),
+    decode=Game.from_session_dict,
+)
 
-        msg, roll_value, won, from_pos, land_pos, to_pos = self._raw_move(idx)
-        roll_value = int(roll_value)
+# plany AI liczone w tle, gdy człowiek myśli (ai_plans.py); AI_PLANS=on włącza —
+# domyślnie wyłączone, bo wątki puli zabierają CPU żądaniom w tym samym procesie
+AI_PLANS = AIPlans(
+    workers=int(os.environ.get("AI_PLANS_WORKERS", 2)),
+    budget=int(os.environ.get("AI_PLANS_BUDGET", 8)),
+) if os.environ.get("AI_PLANS") == "on" else None
+Game.plans = AI_PLANS
 
-        self.last_roll = roll_value
-        self.last_player = idx
-        self.move_count += 1
+_last_cleanup = 0.0
 
-        self.rolls_in_turn += 1
 
-        if (not won) and self._try_start_snake_pending(self.players[idx], idx):
-            msg += " 🃏 Masz ANTY WĄŻ — wybierz: zostać czy cofnąć się?"
-            self.message = msg
-            self.push_history(msg)
-            self.last_move = None
-            return
-
-        if not won:
-            extra = self._apply_snake_if_no_pending(self.players[idx])
-            if extra:
-                msg += extra
-
-        if not won:
-            extra2 = self._give_card_if_magic_tile(self.players[idx])
-            if extra2:
-                msg += extra2
-
-        if (not won) and roll_value == 6 and self.rolls_in_turn < 3:
-            msg += " 🎲 Bonus: 6 → dodatkowy rzut!"
-        elif (not won) and roll_value == 6 and self.rolls_in_turn >= 3:
-            msg += " 🎲 Wypadło 6, ale limit 3 rzutów — koniec tury."
-
-        self.message = msg
-        self.push_history(msg)
-
-        self.last_move = {
-            "player": idx,
-            "from": from_pos,
-            "land": land_pos,
-            "to": int(self.players[idx].pos),
-            "move_count": self.move_count,
-            "won": bool(won),
-        }
-
-        if won:
-            self.winner = str(self.players[idx].id)
-            self.rolls_in_turn = 0
-            return
-
-        if not (roll_value == 6 and self.rolls_in_turn < 3):
-            self.turn = (idx + 1) % len(self.players)
-            self.rolls_in_turn = 0
-
-    # ===== Payload =====
-    def to_template_payload(self) -> Dict[str, Any]:
-        self._sync_cards_for_display()
-        return {
-            "players": [p.to_dict() for p in self.players],
-            "turn": self.turn,
-            "last_roll": self.last_roll,
-            "last_player": self.last_player,
-            "message": self.message,
-            "history": self.history,
-            "move_count": self.move_count,
-            "mode": self.mode,
-            "variant": self.variant,
-            "pending": self.pending,
-            "magic_tiles": self.magic.active_list(),
-            "last_move": self.last_move,
-            "winner_text": self.winner_text(),
-        }
-
-    @staticmethod
-    def new_hotseat(n_players: int) -> "Game":
-        g = Game(mode="hotseat", variant="classic")
-        n = max(2, min(4, int(n_players)))
-        colors = ["p-red", "p-blue", "p-green", "p-purple"]
-        g.players = [
-            Player(pid=i, name=f"Gracz {i+1}", pos=0, color=colors[i], is_bot=False, card=None)
-            for i in range(n)
-        ]
-        # karta per gracz
-        for pl in g.players:
-            g.team_cards[str(pl.id)] = None
-        return g
-
-    @staticmethod
-    def new_ai() -> "Game":
-        g = Game(mode="ai", variant="classic")
-        g.players = [
-            Player(pid=0, name="Ty", pos=0, color="p-red", is_bot=False, card=None),
-            Player(pid=1, name="Komputer", pos=0, color="p-blue", is_bot=True, card=None),
-        ]
-        g.team_cards["h"] = None
-        g.team_cards["a"] = None
-        return g
-
-    @staticmethod
-    def new_ai_double() -> "Game":
-        g = Game(mode="ai", variant="double")
-        g.players = [
-            Player(pid="h1", name="Ty (1)", pos=0, color="p-red", is_bot=False, card=None),
-            Player(pid="h2", name="Ty (2)", pos=0, color="p-red", is_bot=False, card=None),
-            Player(pid="a_lad", name="AI (ladder)", pos=0, color="p-blue", is_bot=True, card=None),
-            Player(pid="a_crd", name="AI (cards)", pos=0, color="p-blue", is_bot=True, card=None),
-        ]
-        g.turn = 0
-        g.team_cards["h"] = None
-        g.team_cards["a"] = None
-        return g
-
-    @staticmethod
-    def from_room_dict(room: Dict[str, Any]) -> "Game":
-        g = Game(mode="mp", variant="classic")
-        g.players = [Player.from_dict(p) for p in room.get("players", [])]
-        g.turn = int(room.get("turn", 0))
-        g.last_roll = room.get("last_roll")
-        g.last_player = int(room.get("last_player", 0))
-        g.message = room.get("message", "")
-        g.history = (room.get("history", []) or [])[-8:]
-        g.move_count = int(room.get("move_count", 0))
-        g.pending = room.get("pending")
-        g.last_move = room.get("last_move")
-        g.magic = MagicTiles.from_any(room.get("magic_tiles"))
-        g.max_players = int(room.get("max_players", 2))
-        g.winner = room.get("winner")
-        g.rolls_in_turn = int(room.get("rolls_in_turn", 0))
-
-        # mp: jeśli chcesz też 1 karta na gracza w mp, trzeba trzymać to w pliku
-        # (na razie trzymamy "jak było": per pionek display)
-        for pl in g.players:
-            g.team_cards[str(pl.id)] = pl.card
-
-        return g
-
-    def to_room_dict(self, base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        room = dict(base) if base else {}
-        self._sync_cards_for_display()
-        room["players"] = [p.to_dict() for p in self.players]
-        room["turn"] = int(self.turn)
-        room["last_roll"] = self.last_roll
-        room["last_player"] = int(self.last_player)
-        room["message"] = self.message
-        room["history"] = self.history[-8:]
-        room["move_count"] = int(self.move_count)
-        room["pending"] = self.pending
-        room["last_move"] = self.last_move
-        room["magic_tiles"] = self.magic.to_json_dict()
-        room["max_players"] = int(self.max_players)
-        room["winner"] = self.winner
-        room["rolls_in_turn"] = int(self.rolls_in_turn)
-        return room
+def cleanup_games(ttl_seconds: int = 60 * 60 * 6) -> None:
+    global _last_cleanup
+    now = time.time()
+    if now - _last_cleanup < 60:
+        return
+    _last_cleanup = now
+    SESSIONS.cleanup(ttl_seconds)
+    if AI_PLANS is not None:
+        AI_PLANS.expire(ttl_seconds)
 
 
-# ===== MULTIPLAYER SAVE =====
-ROOMS_DIR = Path("data/rooms")
-ROOMS_DIR.mkdir(parents=True, exist_ok=True)
+def new_sid() -> str:
+    return SESSIONS.new_sid()
 
 
-def room_path(code: str) -> Path:
-    return ROOMS_DIR / f"{code}.json"
+def current_game() -> Optional[Game]:
+    sid = request.cookies.get("sid")
+    if not sid:
+        return None
+    return SESSIONS.load(sid)
 
 
-def load_room(code: str) -> Dict[str, Any]:
-    p = room_path(code)
-    if not p.exists():
-        return {}
-    with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
+def after_human_action(game: Game) -> None:
+    if game.auto_bots:
+        game.run_bot_turns()
+    save_game(game)
 
 
-def save_room(code: str, data: Dict[str, Any]) -> None:
-    p = room_path(code)
-    tmp = p.with_suffix(".json.tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    tmp.replace(p)
+def save_game(game: Game) -> None:
+    game.note_finished()
+    sid = request.cookies.get("sid")
+    if sid:
+        SESSIONS.save(sid, game)
+        if AI_PLANS is not None and AI_PLANS.wants(game):
+            AI_PLANS.speculate(sid, game.to_session_dict(), Game.from_session_dict)
 
 
-def bump_version(room: Dict[str, Any]) -> None:
-    room["version"] = int(room.get("version", 0)) + 1
+def policy_from_form() -> Tuple[int, bool]:
+    # (indeks progu ANTY WĄŻ w SNAKE_POLICY_STEPS, auto-teleport); "" = pytaj
+    raw = (request.form.get("snake_min") or "").strip()
+    try:
+        snake_min = int(raw) if raw else None
+    except ValueError:
+        snake_min = None
+    step = SNAKE_POLICY_STEPS.index(snake_min) if snake_min in SNAKE_POLICY_STEPS else 0
+    return step, request.form.get("auto_teleport") == "1"
 
 
-def save_room_bumped(code: str, room: Dict[str, Any]) -> None:
-    bump_version(room)
-    save_room(code, room)
+def set_sid_cookie(resp, sid: str):
+    resp.set_cookie("sid", sid, max_age=60 * 60 * 24 * 7)
+    return resp
 
 
-GAMES: Dict[str, Game] = {}
+# ===== Plansza: statyczny szkielet renderowany raz, na żądanie tylko pionki/magic =====
+BOARD_CACHE = BoardCache(render_template)
 
 
-def cleanup_games(ttl_seconds: int = 60 * 60 * 6) -> None:
-    now = time.time()
-    dead = [sid for sid, g in GAMES.items() if getattr(g, "updated_at", now) < now - ttl_seconds]
-    for sid in dead:
-        del GAMES[sid]
+# ===== HTTP: statyki z hashem treści + kompresja HTML/JSON =====
+STATIC_FINGERPRINTS = StaticFingerprints(Path(app.static_folder or "static"))
 
 
-def new_sid() -> str:
-    sid = gen_room_code(8)
-    while sid in GAMES:
-        sid = gen_room_code(8)
-    return sid
+@app.template_global()
+def static_url(filename: str) -> str:
+    return url_for("static", filename=filename, v=STATIC_FINGERPRINTS.version(filename))
 
 
-def current_game() -> Optional[Game]:
-    sid = request.cookies.get("sid")
-    if not sid:
-        return None
-    return GAMES.get(sid)
+def compress_response(resp):
+    if resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed:
+        return resp
+    if "Content-Encoding" in resp.headers or resp.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return resp
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return resp
+    data = resp.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return resp
+    resp.set_data(compress(data, encoding))
+    resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    return resp
 
 
-def set_sid_cookie(resp, sid: str):
-    resp.set_cookie("sid", sid, max_age=60 * 60 * 24 * 7)
-    return resp
+@app.after_request
+def finalize_response(resp):
+    if request.endpoint == "static" and request.args.get("v"):
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return compress_response(resp)
 
 
 @app.route("/")
@@ -1238,12 +554,23 @@ def index():
     mc = int(game.move_count)
     round_num = 1 if mc == 0 else ((mc - 1) // max(1, n_players)) + 1
 
+    # stałe decyzje pokazujemy dla gracza na turze (albo pierwszego człowieka w trybie ai)
+    turn_player = game.players[game.current_index()]
+    policy_player = turn_player if not turn_player.is_bot else next(p for p in game.players if not p.is_bot)
+
     payload = game.to_template_payload()
     payload.update({
+        "policy": game.policy_for(policy_player),
+        "policy_pid": policy_player.id,
+        "policy_name": policy_player.name,
+        "snake_policy_steps": SNAKE_POLICY_STEPS,
         "won": won,
         "winner_text": winner_text,
         "round": round_num,
         "snakes_ladders": SNAKE_LADDERS,
+        "board_html": BOARD_CACHE.board_html(
+            "_board_index.html", SNAKE_LADDERS, set(payload["magic_tiles"]), payload["players"]
+        ),
     })
     return render_template("index.html", **payload)
 
@@ -1255,16 +582,17 @@ def new_game():
 
     if mode == "ai":
         variant = request.args.get("variant", "classic")
+        auto_bots = request.args.get("auto", "1") != "0"
         if variant == "double":
-            game = Game.new_ai_double()
+            game = Game.new_ai_double(auto_bots=auto_bots)
         else:
-            game = Game.new_ai()
+            game = Game.new_ai(auto_bots=auto_bots)
     else:
         n = int(request.args.get("players", 2))
         game = Game.new_hotseat(n)
 
     sid = new_sid()
-    GAMES[sid] = game
+    SESSIONS.save(sid, game)
 
     resp = make_response(redirect("/"))
     return set_sid_cookie(resp, sid)
@@ -1276,6 +604,7 @@ def roll():
     if not game:
         return redirect("/new?mode=hotseat&players=2")
     game.roll()
+    after_human_action(game)
     return redirect("/")
 
 
@@ -1287,6 +616,7 @@ def dice_choice():
 
     swap = (request.form.get("swap") == "1")
     game.apply_dice_choice_human(swap)
+    after_human_action(game)
     return redirect("/")
 
 
@@ -1303,6 +633,7 @@ def snake_decision():
     pid = pend.get("player_id")
     choice = request.form.get("choice", "stay")
     game.snake_decision(pid, choice)
+    after_human_action(game)
     return redirect("/")
 
 
@@ -1314,6 +645,25 @@ def use_card():
 
     pawn_idx = request.form.get("pawn_idx")
     game.use_card(pawn_idx=pawn_idx)
+    after_human_action(game)
+    return redirect("/")
+
+
+@app.route("/policy", methods=["POST"])
+def set_policy():
+    # stałe decyzje: ANTY WĄŻ i TELEPORT rozstrzygane w trakcie rzutu, bez okienka decyzji
+    game = current_game()
+    if not game:
+        return redirect("/new?mode=hotseat&players=2")
+
+    pid = request.form.get("pid")
+    pl = next((p for p in game.players if str(p.id) == pid and not p.is_bot), None)
+    if pl is not None:
+        step, teleport = policy_from_form()
+        changed = game.set_policy(pl.id, "snake_min", SNAKE_POLICY_STEPS[step])
+        changed = game.set_policy(pl.id, "auto_teleport", teleport) or changed
+        if changed:
+            save_game(game)
     return redirect("/")
 
 
@@ -1328,9 +678,31 @@ def ai_move():
     else:
         game.ai_move()
 
+    save_game(game)
     return redirect("/")
 
 
+@app.route("/stats/archive")
+def stats_archive():
+    resp = jsonify(ROOM_ARCHIVE.stats())
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.route("/stats/ai_plans")
+def stats_ai_plans():
+    resp = jsonify(AI_PLANS.counters() if AI_PLANS is not None else {"enabled": False})
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.route("/stats/heatmap")
+def stats_heatmap():
+    resp = jsonify(heatmap(STATS.totals(), CARD_POOL, SNAKE_LADDERS))
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 @app.route("/howto")
 def howto():
     game = current_game()
@@ -1349,15 +721,30 @@ def mp_lobby():
     return render_template("mp_lobby.html")
 
 
+@app.route("/mp/rooms")
+def mp_rooms():
+    # lista otwartych pokoi z indeksu w pamięci (bez czytania data/rooms)
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 20, type=int)
+    listing = ROOM_INDEX.open_rooms(page, per_page)
+    etag = f"lobby-{listing['version']}-{listing['page']}-{per_page}"
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = jsonify(listing)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 @app.route("/mp/create", methods=["POST"])
 def mp_create():
     name = (request.form.get("name") or "Gracz").strip()[:20]
     max_players = int(request.form.get("players") or 2)
     max_players = max(2, min(4, max_players))
+    bots = max(0, min(max_players - 1, int(request.form.get("bots") or 0)))
 
-    code = gen_room_code()
-    while room_path(code).exists():
-        code = gen_room_code()
+    code = ROOM_INDEX.allocate_code(ROOM_STORE.reserve)
 
     game = Game(mode="mp", variant="classic")
     game.max_players = max_players
@@ -1379,8 +766,12 @@ def mp_create():
         "pending": None,
         "last_move": None,
         "rolls_in_turn": 0,
+        "replay": new_replay(random.getrandbits(32), BOARD_ID),
     }
+    append_action(room, ACT_JOIN, 0)
     room = game.to_room_dict(room)
+    for _ in range(bots):
+        room = add_bot_seat(room) or room
     save_room_bumped(code, room)
 
     resp = make_response(redirect(f"/mp/room/{code}"))
@@ -1392,7 +783,11 @@ def mp_create():
 def mp_join():
     code = (request.form.get("code") or "").strip().upper()
     name = (request.form.get("name") or "Gracz").strip()[:20]
+    return join_room(code, name)
+
 
+@room_locked
+def join_room(code: str, name: str):
     room = load_room(code)
     if not room:
         return render_template("mp_lobby.html", error="Nie ma takiego pokoju.")
@@ -1401,12 +796,9 @@ def mp_join():
     if len(room.get("players", [])) >= int(room.get("max_players", 2)):
         return render_template("mp_lobby.html", error="Pokój jest pełny.")
 
-    new_id = f"p{len(room['players']) + 1}"
-    colors = ["p-red", "p-blue", "p-green", "p-purple"]
-    used = {p.get("color") for p in room["players"]}
-    color = next((c for c in colors if c not in used), colors[0])
-
+    new_id, color = next_seat(room)
     room["players"].append({"id": new_id, "name": name, "pos": 0, "color": color, "card": None})
+    append_action(room, ACT_JOIN, len(room["players"]) - 1)
 
     room["message"] = f"✅ Dołączył(a): {name}"
     room.setdefault("history", []).append(room["message"])
@@ -1439,6 +831,7 @@ def mp_room(code):
     my_turn = (my_idx is not None and int(room.get("turn", 0)) == my_idx)
     can_roll = (not winner) and my_turn and (len(room.get("players", [])) >= 2) and (not room.get("pending"))
 
+    magic = {int(k) for k, v in (room.get("magic_tiles") or {}).items() if v != "USED"}
     return render_template(
         "mp_room.html",
         room=room,
@@ -1446,25 +839,137 @@ def mp_room(code):
         my_idx=my_idx,
         my_turn=my_turn,
         can_roll=can_roll,
-        snakes_ladders=SNAKE_LADDERS
+        policy=(room.get("policies") or {}).get(my_pid) or POLICY_DEFAULTS,
+        snake_policy_steps=SNAKE_POLICY_STEPS,
+        snakes_ladders=SNAKE_LADDERS,
+        board_html=BOARD_CACHE.board_html("_board_mp.html", SNAKE_LADDERS, magic, room.get("players", [])),
     )
 
 
+def note_poll(code: str) -> None:
+    ROOM_PRESENCE.seen(code, request.cookies.get(f"mp_{code}_pid"))
+    meta = ROOM_INDEX.get(code)
+    if code not in ROOM_TIMERS and meta is not None and not meta.winner:
+        # po restarcie procesu timery znikają — odtwarzamy je przy pierwszym pollu
+        room = load_room(code)
+        schedule_turn_timeout(code, room)
+        if is_bot_turn(room):
+            ROOM_BOTS.wake(code, delay=0)
+
+
+def no_cache(resp):
+    resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    resp.headers["Pragma"] = "no-cache"
+    return resp
+
+
+@app.route("/mp/room/<code>/hot")
+def mp_hot(code):
+    # tani poll: rekord z tabeli mmap (bez pliku, bez JSON-a pokoju); klient po zmianie
+    # wersji dociąga pełny /state. Brak rekordu (pokój sprzed tabeli, inny worker
+    # zabity w trakcie zapisu) -> jednorazowo z pliku
+    code = code.upper()
+    hot = ROOM_TABLE.hot(code)
+    if hot is None:
+        room = load_room(code)
+        if not room:
+            return no_cache(make_response(jsonify({"ok": False, "error": "no_room"}), 200))
+        ROOM_TABLE.fill(code, room)
+        hot = ROOM_TABLE.hot(code) or {"version": int(room.get("version", 0))}
+    note_poll(code)
+    etag = f"{code}-{hot['version']}"
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = make_response(json.dumps(hot, separators=(",", ":")), 200)
+        resp.mimetype = "application/json"
+    resp.set_etag(etag)
+    return no_cache(resp)
+
+
 @app.route("/mp/room/<code>/state")
 def mp_state(code):
     code = code.upper()
-    room = load_room(code)
-    if not room:
+    snap = ROOM_SNAPSHOTS.get(code, load_room)
+    if snap is not None:
+        note_poll(code)
+    if snap is None:
         resp = make_response(jsonify({"ok": False, "error": "no_room"}), 200)
+    elif request.if_none_match.contains(snap.etag):
+        resp = make_response("", 304)
+        resp.set_etag(snap.etag)
     else:
-        resp = make_response(jsonify(room), 200)
+        body, encoding = snap.encoded(request.headers.get("Accept-Encoding", ""))
+        resp = make_response(body, 200)
+        resp.mimetype = "application/json"
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.set_etag(snap.etag)
+    return no_cache(resp)
+
+
+@app.route("/mp/room/<code>/replay")
+def mp_replay(code):
+    # NDJSON: nagłówek, potem jedna klatka na akcję (pozycje + segmenty ścieżki), na końcu podsumowanie
+    # ziarno pozwala przewidzieć kolejne rzuty, więc tylko gry zakończone albo w archiwum;
+    # bez żywego pokoju — najnowsza gra pod tym kodem z archiwum
+    code = code.upper()
+    room = load_room(code)
+    if room and not room.get("winner") and room.get("replay"):
+        return jsonify({"ok": False, "error": "in_progress"}), 409
+    return replay_response(code, room or ROOM_ARCHIVE.get(code))
 
-    resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    resp.headers["Pragma"] = "no-cache"
+
+@app.route("/mp/archive/<int:aid>/replay")
+def mp_archive_replay(aid):
+    room = ROOM_ARCHIVE.get_id(aid)
+    return replay_response(ROOM_ARCHIVE.entry(aid)[0] if room else "", room)
+
+
+def replay_response(code: str, room: Optional[Dict[str, Any]]):
+    if not room or not room.get("replay"):
+        return jsonify({"ok": False, "error": "no_replay"}), 404
+    resp = Response(ndjson(replay_frames(code, room)), mimetype="application/x-ndjson")
+    resp.headers["Cache-Control"] = "no-cache"
     return resp
 
 
+def mp_ws(ws, code):
+    code = code.upper()
+    try:
+        last = int(request.args.get("v", 0))
+    except ValueError:
+        last = 0
+
+    pid = request.cookies.get(f"mp_{code}_pid")
+    ROOM_HUB.subscribe(code)
+    try:
+        while ws.connected:
+            ROOM_PRESENCE.seen(code, pid)
+            item = ROOM_HUB.wait(code, last, timeout=WS_RECHECK_SECONDS)
+            if item is None:
+                # zapis mógł przyjść z innego workera — jeden słuchacz na pokój czyta plik co kilka sekund
+                if not ROOM_HUB.claim_recheck(code, WS_RECHECK_SECONDS):
+                    continue
+                snap = ROOM_SNAPSHOTS.get(code, load_room)
+                if snap is None:
+                    return
+                if snap.version > last:
+                    ROOM_HUB.publish(code, snap.version, snap.raw)
+                continue
+            last, payload = item
+            ws.send(payload.decode("utf-8"))
+    finally:
+        ROOM_HUB.unsubscribe(code)
+
+
+if sock:
+    mp_ws = sock.route("/mp/room/<code>/ws")(mp_ws)
+
+
 @app.route("/mp/room/<code>/roll", methods=["POST"])
+@room_locked
 def mp_roll(code):
     code = code.upper()
     room = load_room(code)
@@ -1476,7 +981,7 @@ def mp_roll(code):
         return redirect(f"/mp/room/{code}")
 
     game = Game.from_room_dict(room)
-    game.mp_roll(my_pid)
+    game.mp_act(ACT_ROLL, my_pid)
 
     room = game.to_room_dict(room)
     save_room_bumped(code, room)
@@ -1484,6 +989,7 @@ def mp_roll(code):
 
 
 @app.route("/mp/room/<code>/snake_decision", methods=["POST"])
+@room_locked
 def mp_snake_decision(code):
     code = code.upper()
     room = load_room(code)
@@ -1503,7 +1009,7 @@ def mp_snake_decision(code):
         return redirect(f"/mp/room/{code}")
 
     choice = request.form.get("choice", "stay")
-    game.snake_decision(my_pid, choice)
+    game.mp_act(ACT_SNAKE, my_pid, choice)
 
     room = game.to_room_dict(room)
     save_room_bumped(code, room)
@@ -1511,6 +1017,7 @@ def mp_snake_decision(code):
 
 
 @app.route("/mp/room/<code>/use_card", methods=["POST"])
+@room_locked
 def mp_use_card(code):
     code = code.upper()
     room = load_room(code)
@@ -1531,13 +1038,57 @@ def mp_use_card(code):
         return redirect(f"/mp/room/{code}")
 
     # mp: zostawiamy "jak było" (per pionek display)
-    game.use_card()
+    game.mp_act(ACT_CARD, my_pid)
 
     room = game.to_room_dict(room)
     save_room_bumped(code, room)
     return redirect(f"/mp/room/{code}")
 
 
+@app.route("/mp/room/<code>/policy", methods=["POST"])
+@room_locked
+def mp_policy(code):
+    # zmiana trafia do powtórki (ACT_POLICY_*), bo wpływa na przebieg kolejnych rzutów
+    code = code.upper()
+    room = load_room(code)
+    if not room:
+        return redirect("/mp")
+
+    my_pid = request.cookies.get(f"mp_{code}_pid")
+    if not my_pid:
+        return redirect(f"/mp/room/{code}")
+
+    game = Game.from_room_dict(room)
+    step, teleport = policy_from_form()
+    before = len(game.actions), dict(game.policies)
+    game.mp_act(ACT_POLICY_SNAKE, my_pid, arg=step)
+    game.mp_act(ACT_POLICY_TELEPORT, my_pid, arg=int(teleport))
+
+    if (len(game.actions), game.policies) != before:
+        room = game.to_room_dict(room)
+        save_room_bumped(code, room)
+    return redirect(f"/mp/room/{code}")
+
+
+@app.route("/mp/room/<code>/add_bot", methods=["POST"])
+@room_locked
+def mp_add_bot(code):
+    # wolne miejsce dla bota może dodać każdy gracz pokoju
+    code = code.upper()
+    room = load_room(code)
+    if not room:
+        return redirect("/mp")
+
+    my_pid = request.cookies.get(f"mp_{code}_pid")
+    if not any(p.get("id") == my_pid for p in room.get("players", [])):
+        return redirect(f"/mp/room/{code}")
+
+    room = add_bot_seat(room)
+    if room:
+        save_room_bumped(code, room)
+    return redirect(f"/mp/room/{code}")
+
+
 @app.route("/set_colors", methods=["POST"])
 def set_colors():
     game = current_game()
@@ -1559,6 +1110,7 @@ def set_colors():
         game.players[3].color = ai_color
 
         game.touch()
+        save_game(game)
         return redirect("/")
 
     used = set()
@@ -1581,6 +1133,7 @@ def set_colors():
         used.add(c)
 
     game.touch()
+    save_game(game)
     return redirect("/")
 
 
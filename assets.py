@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli jest opcjonalny — wtedy tylko gzip
+    brotli = None
+
+# tylko odpowiedzi generowane przez widoki; pliki statyczne (CSS/JS) idą jako
+# direct_passthrough i after_request ich nie kompresuje — to robi serwer przed aplikacją
+COMPRESSIBLE_MIMETYPES = ("text/html", "application/json")
+MIN_COMPRESS_BYTES = 512
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    # "token;q=waga" po przecinkach: q=0 wyklucza, wygrywa najwyższe q, przy remisie br;
+    # "*" dotyczy kodowań niewymienionych z nazwy
+    weights: Dict[str, float] = {}
+    for part in (accept_encoding or "").lower().split(","):
+        token, _, params = part.partition(";")
+        token = token.strip()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    best, best_q = None, 0.0
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+class StaticFingerprints:
+    # /static/<plik>?v=<hash treści> — URL zmienia się tylko gdy zmieni się plik,
+    # więc przeglądarka może trzymać go "na zawsze" (immutable)
+    def __init__(self, static_dir: Path):
+        self.static_dir = Path(static_dir)
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Tuple[int, str]] = {}
+
+    def version(self, filename: str) -> str:
+        path = self.static_dir / filename
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return ""
+        cached = self._hashes.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        digest = hashlib.sha1(path.read_bytes()).hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (mtime, digest)
+        return digest
@@ -0,0 +1,114 @@
+"""Bajty przesłane na jeden ruch w pokoju multiplayer (2 graczy).
+
+Model klienta:
+  legacy  — brak Accept-Encoding, statyki pobierane przy każdym załadowaniu
+            strony, obaj gracze przeładowują stronę po każdej zmianie wersji
+            (rzucający po redirect, drugi po wykryciu zmiany pollingiem /state).
+  current — gzip, statyki z ?v=<hash> pobrane raz (immutable), rzucający
+            ładuje stronę po redirect, drugi gracz dostaje tylko stan (push/poll)
+            i łata planszę w miejscu.
+
+Można uruchomić na dowolnej wersji drzewa (np. `git worktree` z bazową wersją):
+
+    python bench/bytes_per_move.py --tree /path/to/checkout --client legacy
+    python bench/bytes_per_move.py --client current
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+ASSET_RE = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+class Client:
+    def __init__(self, app, modern: bool):
+        self.c = app.test_client()
+        self.modern = modern
+        self.cached = set()
+        self.bytes = 0
+        self.requests = 0
+
+    def headers(self):
+        return {"Accept-Encoding": "gzip"} if self.modern else {}
+
+    def _count(self, r) -> None:
+        self.bytes += len(r.get_data())
+        self.requests += 1
+
+    def get(self, url):
+        r = self.c.get(url, headers=self.headers())
+        self._count(r)
+        return r
+
+    def post(self, url, data=None):
+        r = self.c.post(url, data=data or {}, headers=self.headers())
+        self._count(r)
+        return r
+
+    def page(self, url) -> None:
+        r = self.get(url)
+        html = r.get_data()
+        if r.headers.get("Content-Encoding") == "gzip":
+            import gzip
+            html = gzip.decompress(html)
+        for asset in ASSET_RE.findall(html.decode("utf-8")):
+            asset = asset.replace("&amp;", "&")
+            if self.modern and asset in self.cached:
+                continue
+            self.cached.add(asset)
+            self.get(asset)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tree", default=str(ROOT))
+    ap.add_argument("--client", choices=["legacy", "current"], default="current")
+    ap.add_argument("--moves", type=int, default=200)
+    args = ap.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bytes_per_move_"))
+    os.environ.setdefault("ADMISSION", "off")  # mierzymy aplikację, nie limity per klient
+    sys.path.insert(0, str(Path(args.tree).resolve()))
+    import app as app_module
+
+    modern = args.client == "current"
+    a = Client(app_module.app, modern)
+    b = Client(app_module.app, modern)
+
+    r = a.post("/mp/create", {"name": "A", "players": "2"})
+    room_url = r.headers["Location"]
+    code = room_url.rsplit("/", 1)[1]
+    b.post("/mp/join", {"code": code, "name": "B"})
+    a.page(room_url)
+    b.page(room_url)
+
+    base_a, base_b = a.bytes, b.bytes
+    base_req = a.requests + b.requests
+    players = [a, b]
+    moves = 0
+    while moves < args.moves:
+        state = a.c.get(f"{room_url}/state").get_json()
+        if state.get("winner"):
+            break
+        roller = players[int(state["turn"])]
+        other = players[1 - int(state["turn"])]
+
+        roller.post(f"{room_url}/roll")
+        roller.page(room_url)
+        other.get(f"{room_url}/state")
+        if not modern:
+            other.page(room_url)
+        moves += 1
+
+    total = (a.bytes - base_a) + (b.bytes - base_b)
+    reqs = a.requests + b.requests - base_req
+    print(f"tree={args.tree} client={args.client} moves={moves}")
+    print(f"bajty/ruch={total / max(1, moves):.0f}  żądania/ruch={reqs / max(1, moves):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Spójność plików pokoi po zabiciu procesu w trakcie zrzutu (SIGKILL).
+
+Proces-pisarz w pętli zapisuje pokoje z rosnącą wersją i po każdym powrocie
+z save() wypisuje "kod wersja" (potwierdzenie). Po losowym czasie dostaje
+SIGKILL, a sprawdzający weryfikuje, że:
+  - każdy plik *.json się parsuje (rename jest atomowy, brak połówek),
+  - w trybach strict/group wersja na dysku >= ostatnia potwierdzona
+    (potwierdzony zapis nie ginie),
+  - w trybie behind wersja na dysku <= potwierdzona (dozwolona utrata
+    ostatnich zapisów, ale nigdy stan "z przyszłości" ani uszkodzony).
+
+Tryb none nie robi fsync, więc gwarancje dotyczą tylko awarii procesu,
+nie systemu; dla zabicia procesu zachowuje się jak strict.
+
+    python bench/crash_consistency.py --modes strict group behind --rounds 20
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def writer(rooms_dir: str, mode: str, rooms: int) -> None:
+    sys.path.insert(0, str(ROOT))
+    from room_store import RoomStore
+
+    store = RoomStore(Path(rooms_dir), durability=mode)
+    versions = {}
+    rnd = random.Random()
+    while True:
+        code = f"R{rnd.randrange(rooms):03d}"
+        v = versions.get(code, 0) + 1
+        versions[code] = v
+        store.save(code, {"code": code, "version": v, "history": ["x" * 64] * 8})
+        sys.stdout.write(f"{code} {v}\n")
+        sys.stdout.flush()
+
+
+def check(rooms_dir: Path, acked: dict, mode: str) -> list:
+    problems = []
+    for p in rooms_dir.glob("*.json"):
+        try:
+            disk = json.loads(p.read_text(encoding="utf-8"))
+        except ValueError as e:
+            problems.append(f"{p.name}: uszkodzony JSON ({e})")
+            continue
+        code, v = disk.get("code"), int(disk.get("version", 0))
+        ack = acked.get(code, 0)
+        if mode in ("none", "strict", "group") and v < ack:
+            problems.append(f"{code}: na dysku v{v}, potwierdzono v{ack}")
+        if v > ack + 1:
+            problems.append(f"{code}: na dysku v{v} > potwierdzone v{ack} + 1")
+    for code, ack in acked.items():
+        if mode != "behind" and not (rooms_dir / f"{code}.json").exists():
+            problems.append(f"{code}: brak pliku mimo potwierdzenia v{ack}")
+    return problems
+
+
+def round_once(mode: str, rooms: int, max_wait: float) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = subprocess.Popen(
+            [sys.executable, __file__, "--writer", tmp, "--modes", mode, "--rooms", str(rooms)],
+            stdout=subprocess.PIPE, text=True,
+        )
+        time.sleep(random.uniform(0.05, max_wait))
+        os.kill(proc.pid, signal.SIGKILL)
+        out, _ = proc.communicate()
+        acked = {}
+        for line in out.splitlines():
+            parts = line.split()
+            if len(parts) == 2:
+                acked[parts[0]] = int(parts[1])
+        return check(Path(tmp), acked, mode)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", nargs="+", default=["none", "strict", "group", "behind"])
+    ap.add_argument("--rounds", type=int, default=10)
+    ap.add_argument("--rooms", type=int, default=20)
+    ap.add_argument("--max-wait", type=float, default=0.5)
+    ap.add_argument("--writer", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.writer:
+        writer(args.writer, args.modes[0], args.rooms)
+        return
+
+    failed = False
+    for mode in args.modes:
+        bad = 0
+        for _ in range(args.rounds):
+            problems = round_once(mode, args.rooms, args.max_wait)
+            if problems:
+                bad += 1
+                failed = True
+                for msg in problems[:5]:
+                    print(f"  [{mode}] {msg}")
+        print(f"mode={mode:6s} rounds={args.rounds} failed={bad}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Czas zimnego importu modułów aplikacji (`python -X importtime`).
+
+Dla każdego modułu uruchamia świeży interpreter z -X importtime, sumuje
+czas importu (kumulatywny, µs) i pokazuje najdroższe zależności. Import
+odbywa się w pustym katalogu tymczasowym, więc widać też, czy import
+dotyka dysku (tworzy data/ itp.).
+
+    python bench/import_time.py --modules engine app simulate --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_once(module: str, cwd: str):
+    env = dict(os.environ, PYTHONPATH=str(ROOT), PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[0].isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2]))
+    total = next((us for us, name in rows if name.strip() == module), 0)
+    return total, rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modules", nargs="+", default=["engine", "app", "simulate"])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=8)
+    args = ap.parse_args()
+
+    for module in args.modules:
+        totals = []
+        rows = []
+        touched = False
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                total, rows = import_once(module, tmp)
+                totals.append(total)
+                touched = touched or bool(os.listdir(tmp))
+        print(f"{module:10s} median={statistics.median(totals) / 1000:7.1f} ms  "
+              f"min={min(totals) / 1000:7.1f} ms  pliki_przy_imporcie={'tak' if touched else 'nie'}")
+        top = sorted((r for r in rows if r[1].strip() != module and not r[1].startswith("  " * 2)),
+                     reverse=True)[:args.top]
+        for us, name in top:
+            print(f"    {us / 1000:7.1f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
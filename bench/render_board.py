@@ -0,0 +1,52 @@
+"""Czas renderowania index.html i mp_room.html: szkielet planszy z cache vs bez.
+
+"bez cache" = szkielet renderowany przy każdym żądaniu (koszt jak dawniej,
+gdy pętla 10x10 była w szablonie strony).
+
+    python bench/render_board.py --n 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="render_board_"))
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+
+    game = app_module.Game.new_hotseat(4)
+    for i, p in enumerate(game.players):
+        p.pos = [0, 6, 33, 47][i]
+    room = game.to_room_dict({"code": "BNCH", "version": 1})
+
+    client = app_module.app.test_client()
+    sid = app_module.SESSIONS.new_sid()
+    app_module.SESSIONS.save(sid, game)
+    client.set_cookie("sid", sid)
+    app_module.save_room_bumped("BNCH", room)
+    client.set_cookie("mp_BNCH_pid", "1")
+
+    for name, url in (("index.html", "/"), ("mp_room.html", "/mp/room/BNCH")):
+        for cached in (False, True):
+            client.get(url)
+            t0 = time.perf_counter()
+            for _ in range(args.n):
+                if not cached:
+                    app_module.BOARD_CACHE.clear()
+                client.get(url)
+            dt = (time.perf_counter() - t0) / args.n * 1e6
+            print(f"{name:13s} cache={'tak' if cached else 'nie':3s}  {dt:8.1f} µs/żądanie")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Przepustowość i opóźnienie zapisów pokoi w zależności od liczby shardów.
+
+N wątków (jak wątki serwera) zapisuje R pokoi; każdy zapis to save()
+z czekaniem na dysk (tryby none/strict/group). shards=0 to dawny płaski
+katalog: w trybie none każdy wątek pisze sam, bez kolejki. Wynik: zapisy/s,
+mediana i p99 czasu save(), pliki faktycznie zapisane i synchronizacje katalogów.
+
+    python bench/room_shards.py --modes none group --shards 0 1 4 16 64 --threads 32 --seconds 3
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from room_store import RoomStore  # noqa: E402
+
+
+def sample_room(code: str, version: int):
+    # ten sam kształt co w bench/room_store.py (~1.5 KB JSON)
+    return {
+        "code": code,
+        "version": version,
+        "turn": version % 2,
+        "players": [{"id": f"p{i}", "name": f"Gracz {i}", "pos": random.randint(0, 100), "color": "p-red", "card": None}
+                    for i in range(1, 5)],
+        "magic_tiles": {str(t): "CARD" for t in (7, 12, 23, 34, 45, 58, 66, 77, 82, 94)},
+        "history": [f"🎲 Gracz rzucił {random.randint(1, 6)}" for _ in range(8)],
+        "move_path": [[version, 0, 10, 14, 14, 0]],
+        "message": "",
+    }
+
+
+def run(mode: str, shards: int, threads: int, seconds: float, rooms: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RoomStore(Path(tmp), durability=mode, shards=shards)
+        codes = [f"R{i:04d}" for i in range(rooms)]
+        lat = [[] for _ in range(threads)]
+        stop = time.perf_counter() + seconds
+
+        def worker(i: int) -> None:
+            rnd = random.Random(i)
+            n = 0
+            out = lat[i]
+            while time.perf_counter() < stop:
+                code = rnd.choice(codes)
+                t0 = time.perf_counter()
+                store.save(code, sample_room(code, n))
+                out.append(time.perf_counter() - t0)
+                n += 1
+
+        ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        store.flush()
+
+    all_lat = sorted(x for part in lat for x in part)
+    total = len(all_lat)
+    p50 = all_lat[total // 2] * 1000 if total else 0.0
+    p99 = all_lat[min(total - 1, int(total * 0.99))] * 1000 if total else 0.0
+    print(f"mode={mode:6s} shards={shards:3d} threads={threads:3d}  saves/s={total / seconds:9.1f}  "
+          f"p50={p50:7.2f}ms p99={p99:7.2f}ms  file_writes={store.writes:7d}  dir_syncs={store.syncs:6d}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", nargs="+", choices=("none", "strict", "group"), default=["none", "group"])
+    ap.add_argument("--shards", type=int, nargs="+", default=[0, 1, 4, 16, 64])
+    ap.add_argument("--threads", type=int, nargs="+", default=[32])
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--rooms", type=int, default=2000)
+    args = ap.parse_args()
+
+    for mode in args.modes:
+        for t in args.threads:
+            for s in args.shards:
+                run(mode, s, t, args.seconds, args.rooms)
+
+
+if __name__ == "__main__":
+    main()
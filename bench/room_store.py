@@ -0,0 +1,79 @@
+"""Przepustowość zapisów pokoi w każdym trybie trwałości RoomStore.
+
+N wątków (jak wątki serwera) zapisuje na zmianę R pokoi o realistycznym
+rozmiarze; wynik to zapisy/s, liczba plików faktycznie zapisanych na dysk
+i liczba synchronizacji katalogu.
+
+    python bench/room_store.py --modes none strict group behind --threads 1 8 32 --seconds 3
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from room_store import DURABILITY_MODES, RoomStore  # noqa: E402
+
+
+def sample_room(code: str, version: int):
+    return {
+        "code": code,
+        "version": version,
+        "turn": version % 2,
+        "players": [{"id": f"p{i}", "name": f"Gracz {i}", "pos": random.randint(0, 100), "color": "p-red", "card": None}
+                    for i in range(1, 5)],
+        "magic_tiles": {str(t): "CARD" for t in (7, 12, 23, 34, 45, 58, 66, 77, 82, 94)},
+        "history": [f"🎲 Gracz rzucił {random.randint(1, 6)}" for _ in range(8)],
+        "move_path": [[version, 0, 10, 14, 14, 0]],
+        "message": "",
+    }
+
+
+def run(mode: str, threads: int, seconds: float, rooms: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RoomStore(Path(tmp), durability=mode)
+        codes = [f"R{i:03d}" for i in range(rooms)]
+        counts = [0] * threads
+        stop = time.perf_counter() + seconds
+
+        def worker(i: int) -> None:
+            rnd = random.Random(i)
+            n = 0
+            while time.perf_counter() < stop:
+                code = rnd.choice(codes)
+                store.save(code, sample_room(code, n))
+                n += 1
+            counts[i] = n
+
+        ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        store.flush()
+
+    total = sum(counts)
+    print(f"mode={mode:6s} threads={threads:3d}  saves/s={total / seconds:9.1f}  "
+          f"file_writes={store.writes:7d}  dir_syncs={store.syncs:6d}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", nargs="+", choices=DURABILITY_MODES, default=list(DURABILITY_MODES))
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--rooms", type=int, default=200)
+    args = ap.parse_args()
+
+    for mode in args.modes:
+        for t in args.threads:
+            run(mode, t, args.seconds, args.rooms)
+
+
+if __name__ == "__main__":
+    main()
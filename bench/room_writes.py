@@ -0,0 +1,77 @@
+"""Zapisy pokoju na dysk na jedną turę przy różnych oknach sklejania.
+
+Dwóch graczy rozgrywa pokój przez klienta testowego Flask; między akcjami
+jest przerwa --gap-ms (szybkie kliknięcia / tury botów). Po każdej akcji
+drugi gracz czyta /state i sprawdzamy, że widzi dokładnie najnowszą wersję,
+czyli sklejanie zapisów nie zmienia tego, co dostają klienci.
+
+    python bench/room_writes.py --coalesce-ms 0 50 200 --gap-ms 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_one(moves: int, gap_ms: float) -> None:
+    os.chdir(tempfile.mkdtemp(prefix="room_writes_"))
+    os.environ.setdefault("ADMISSION", "off")  # mierzymy aplikację, nie limity per klient
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+
+    a = app_module.app.test_client()
+    b = app_module.app.test_client()
+    url = a.post("/mp/create", data={"name": "A", "players": "2"}).headers["Location"]
+    code = url.rsplit("/", 1)[1]
+    b.post("/mp/join", data={"code": code, "name": "B"})
+    store = app_module.ROOM_STORE
+    base = store.writes
+
+    players = [a, b]
+    done = stale = 0
+    while done < moves:
+        state = a.get(f"{url}/state").get_json()
+        if state.get("winner"):
+            break
+        me = players[int(state["turn"])]
+        pending = state.get("pending") or {}
+        if pending.get("type") == "snake_choice":
+            me.post(f"{url}/snake_decision", data={"choice": "stay"})
+        else:
+            me.post(f"{url}/roll")
+        after = players[1 - int(state["turn"])].get(f"{url}/state").get_json()
+        if after["version"] != store.load(code)["version"]:
+            stale += 1
+        done += 1
+        time.sleep(gap_ms / 1000.0)
+    store.flush()
+    writes = store.writes - base
+    print(f"coalesce_ms={os.environ['ROOM_COALESCE_MS']:>4s} gap_ms={gap_ms:g}  akcje={done}  "
+          f"zapisy/akcję={writes / max(1, done):.2f}  sklejone={store.coalesced}  nieaktualne_odczyty={stale}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--coalesce-ms", type=int, nargs="+", default=[0, 50, 200])
+    ap.add_argument("--gap-ms", type=float, default=20.0)
+    ap.add_argument("--moves", type=int, default=200)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        run_one(args.moves, args.gap_ms)
+        return
+    # osobny proces na ustawienie, bo app czyta ROOM_COALESCE_MS przy imporcie
+    for ms in args.coalesce_ms:
+        env = dict(os.environ, ROOM_COALESCE_MS=str(ms))
+        subprocess.run([sys.executable, __file__, "--child", "--moves", str(args.moves),
+                        "--gap-ms", str(args.gap_ms)], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
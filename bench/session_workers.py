@@ -0,0 +1,91 @@
+"""Przepustowość sesji hotseat/ai przy N procesach-workerach na wspólnym store.
+
+Każdy worker to osobny proces z własną aplikacją Flask (jak `gunicorn -w N`).
+Sesje są tworzone przez jednego workera, a ruchy trafiają losowo do wszystkich,
+więc benchmark od razu sprawdza, że sesja jest widoczna między procesami.
+
+    python bench/session_workers.py --workers 1 2 4 8 --seconds 5
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _worker(db_path: str, sids, seconds: float, out) -> None:
+    os.environ["SESSION_STORE"] = "sqlite"
+    os.environ.setdefault("ADMISSION", "off")  # mierzymy aplikację, nie limity per klient
+    os.environ["SESSION_DB"] = db_path
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+
+    client = app_module.app.test_client()
+    done = 0
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sid = random.choice(sids)
+        client.set_cookie("sid", sid)
+        r = client.get("/roll")
+        if r.status_code != 302 or r.headers.get("Location", "").startswith("/new"):
+            errors += 1
+        done += 1
+    out.put((done, errors))
+
+
+def _seed_sessions(db_path: str, n: int):
+    os.environ["SESSION_STORE"] = "sqlite"
+    os.environ["SESSION_DB"] = db_path
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+
+    sids = []
+    for i in range(n):
+        game = app_module.Game.new_hotseat(4) if i % 2 else app_module.Game.new_ai()
+        sid = app_module.SESSIONS.new_sid()
+        app_module.SESSIONS.save(sid, game)
+        sids.append(sid)
+    return sids
+
+
+def run(workers: int, seconds: float, sessions: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db_path = str(Path(tmp) / "sessions.sqlite3")
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(1) as pool:
+            sids = pool.apply(_seed_sessions, (db_path, sessions))
+
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(db_path, sids, seconds, out)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    total = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    print(f"workers={workers:2d}  req={total:7d}  req/s={total / seconds:9.1f}  lost_sessions={errors}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--sessions", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"cpu_count={os.cpu_count()}")
+    for w in args.workers:
+        run(w, args.seconds, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Opóźnienie rozgłoszenia stanu pokoju do wielu klientów WebSocket.
+
+Startuje lokalny serwer (werkzeug, threaded), podłącza N klientów do jednego
+pokoju, wykonuje serię zapisów przez `save_room_bumped` i mierzy czas od
+zapisu do odebrania nowej wersji przez każdego klienta.
+
+    python bench/ws_fanout.py --clients 300 --writes 20
+
+Wymaga flask-sock (serwer) i simple-websocket (klient).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=300)
+    ap.add_argument("--writes", type=int, default=20)
+    ap.add_argument("--interval", type=float, default=0.25)
+    ap.add_argument("--port", type=int, default=0)
+    args = ap.parse_args()
+
+    try:
+        import simple_websocket
+    except ImportError:
+        sys.exit("simple-websocket nie jest zainstalowany")
+
+    os.chdir(tempfile.mkdtemp(prefix="ws_fanout_"))
+    os.environ.setdefault("ADMISSION", "off")  # mierzymy aplikację, nie limity per klient
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    if app_module.sock is None:
+        sys.exit("flask-sock nie jest zainstalowany — brak kanału /ws")
+
+    code = "BNCH"
+    game = app_module.Game(mode="mp", variant="classic")
+    game.players = [
+        app_module.Player(pid="p1", name="A", color="p-red"),
+        app_module.Player(pid="p2", name="B", color="p-blue"),
+    ]
+    room = game.to_room_dict({"code": code, "created": int(time.time()), "version": 0})
+    app_module.save_room_bumped(code, room)
+
+    server = make_server("127.0.0.1", args.port, app_module.app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    received = {}  # version -> lista czasów odbioru
+    lock = threading.Lock()
+    clients = []
+
+    def reader(ws) -> None:
+        while True:
+            try:
+                msg = ws.receive(timeout=30)
+            except Exception:
+                return
+            if msg is None:
+                return
+            t = time.perf_counter()
+            v = json.loads(msg)["version"]
+            with lock:
+                received.setdefault(v, []).append(t)
+
+    start_version = int(room["version"])
+    for _ in range(args.clients):
+        ws = simple_websocket.Client(f"ws://127.0.0.1:{port}/mp/room/{code}/ws?v={start_version}")
+        clients.append(ws)
+        threading.Thread(target=reader, args=(ws,), daemon=True).start()
+
+    deadline = time.time() + 10
+    while app_module.ROOM_HUB.listeners(code) < args.clients and time.time() < deadline:
+        time.sleep(0.05)
+    print(f"podłączeni klienci: {app_module.ROOM_HUB.listeners(code)}")
+
+    sent = {}
+    for i in range(args.writes):
+        room = app_module.load_room(code)
+        room["message"] = f"zapis {i}"
+        t0 = time.perf_counter()
+        app_module.save_room_bumped(code, room)
+        sent[int(room["version"])] = t0
+        time.sleep(args.interval)
+
+    time.sleep(1.0)
+    lat = []
+    missing = 0
+    for v, t0 in sent.items():
+        got = received.get(v, [])
+        missing += args.clients - len(got)
+        lat.extend((t - t0) * 1000 for t in got)
+
+    for ws in clients:
+        try:
+            ws.close()
+        except Exception:
+            pass
+    server.shutdown()
+
+    if not lat:
+        sys.exit("brak odebranych wiadomości")
+    lat.sort()
+    q = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))]
+    print(f"klienci={args.clients} zapisy={args.writes} dostarczone={len(lat)} brakujące={missing}")
+    print(f"opóźnienie ms: p50={q(0.50):.2f} p95={q(0.95):.2f} p99={q(0.99):.2f} "
+          f"max={lat[-1]:.2f} śr={statistics.mean(lat):.2f}")
+
+
+if __name__ == "__main__":
+    main()
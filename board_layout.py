@@ -0,0 +1,136 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# Definicja planszy (węże/drabiny + pola magiczne): walidacja, zapis/odczyt JSON
+# i dokładna ocena łańcuchem Markowa. Silnik wczytuje plik przy BOARD_FILE,
+# board_optimizer.py szuka układów i zapisuje je w tym formacie.
+#
+# Ocena liczy rozkład liczby tur jednego pionka do mety (dokładne trafienie,
+# bonusowy rzut po 6, limit rzutów w turze), więc bez losowania i bez szumu.
+# Karty (ANTY WĄŻ, TELEPORT) pomijamy — zmieniają wynik o ułamek tury.
+
+BOARD_FORMAT = 1
+
+Layout = Dict[int, int]
+
+
+def layout_key(snake_ladders: Layout) -> Tuple[Tuple[int, int], ...]:
+    return tuple(sorted((int(a), int(b)) for a, b in snake_ladders.items()))
+
+
+def layout_errors(snake_ladders: Layout, magic_tiles: Iterable[int], board_end: int = 100) -> List[str]:
+    errors: List[str] = []
+    magic = {int(t) for t in magic_tiles}
+    heads = set(snake_ladders)
+    tails = set(snake_ladders.values())
+    for head, tail in sorted(snake_ladders.items()):
+        if not (0 < head < board_end):
+            errors.append(f"{head}: początek poza planszą")
+        if not (0 < tail <= board_end) or tail == head:
+            errors.append(f"{head}: zły koniec {tail}")
+        if tail in heads:
+            errors.append(f"{head}: koniec {tail} jest początkiem innego skoku (łańcuch)")
+        if head in magic or tail in magic:
+            errors.append(f"{head}: skok zaczyna się albo kończy na polu magicznym")
+    if len(tails) != len(snake_ladders):
+        errors.append("dwa skoki kończą się na tym samym polu")
+    for t in magic:
+        if not (0 < t < board_end):
+            errors.append(f"pole magiczne {t} poza planszą")
+    return errors
+
+
+def validate(snake_ladders: Layout, magic_tiles: Iterable[int], board_end: int = 100) -> None:
+    errors = layout_errors(snake_ladders, magic_tiles, board_end)
+    if errors:
+        raise ValueError("zła plansza: " + "; ".join(errors))
+
+
+def board_to_dict(snake_ladders: Layout, magic_tiles: Iterable[int],
+                  metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "format": BOARD_FORMAT,
+        "snake_ladders": {str(a): b for a, b in layout_key(snake_ladders)},
+        "magic_tiles": sorted(int(t) for t in magic_tiles),
+    }
+    if metrics:
+        out["metrics"] = metrics
+    return out
+
+
+def load_board(path: Union[str, Path], board_end: int = 100) -> Tuple[Layout, Dict[int, Optional[str]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    snake_ladders = {int(a): int(b) for a, b in (data.get("snake_ladders") or {}).items()}
+    magic: Dict[int, Optional[str]] = {int(t): None for t in data.get("magic_tiles") or []}
+    validate(snake_ladders, magic, board_end)
+    return snake_ladders, magic
+
+
+# ===== dokładna ocena =====
+def turn_transitions(snake_ladders: Layout, board_end: int = 100,
+                     max_rolls: int = 3) -> List[List[Tuple[int, float]]]:
+    # dla każdego pola: rozkład pola po całej turze (z dorzutami po 6)
+    def land(s: int, d: int) -> int:
+        t = s + d
+        if t > board_end:
+            return s
+        return snake_ladders.get(t, t)
+
+    out: List[List[Tuple[int, float]]] = []
+    for s in range(board_end + 1):
+        acc: Dict[int, float] = {}
+        stack = [(s, 1.0, max_rolls)]
+        while stack:
+            pos, p, left = stack.pop()
+            p /= 6.0
+            for d in range(1, 7):
+                t = land(pos, d)
+                if t != board_end and d == 6 and left > 1:
+                    stack.append((t, p, left - 1))
+                else:
+                    acc[t] = acc.get(t, 0.0) + p
+        out.append(sorted(acc.items()))
+    return out
+
+
+def evaluate(snake_ladders: Layout, board_end: int = 100, players: int = 2, max_rolls: int = 3,
+             horizon: int = 5000, eps: float = 1e-10) -> Dict[str, float]:
+    # T = liczba tur jednego pionka do mety; gracze są niezależni, więc
+    # P(wygrywa pierwszy) = sum_k P(T=k) * P(T>=k)^(n-1), a długość gry = E[min T_i]
+    trans = turn_transitions(snake_ladders, board_end, max_rolls)
+    v = [0.0] * (board_end + 1)
+    v[0] = 1.0
+    alive = 1.0
+    mean = sq = first = rounds = 0.0
+    k = 0
+    while alive > eps and k < horizon:
+        k += 1
+        nv = [0.0] * (board_end + 1)
+        for s, mass in enumerate(v):
+            if mass:
+                for t, p in trans[s]:
+                    nv[t] += mass * p
+        done = nv[board_end]
+        nv[board_end] = 0.0
+        survive_before = alive          # P(T >= k)
+        rounds += survive_before ** players
+        first += done * survive_before ** (players - 1)
+        mean += k * done
+        sq += k * k * done
+        alive -= done
+        v = nv
+    # resztę po horyzoncie liczymy jak koniec w turze horyzontu (kara dla plansz bez końca)
+    if alive > eps:
+        mean += k * alive
+        sq += k * k * alive
+    var = max(0.0, sq - mean * mean)
+    return {
+        "turns_mean": round(mean, 4),
+        "turns_std": round(var ** 0.5, 4),
+        "game_rounds": round(rounds, 4),
+        "p_first": round(first, 5),
+        "first_advantage": round(first - 1.0 / players, 5),
+        "unfinished": round(max(0.0, alive), 8),
+    }
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from board_layout import board_to_dict, evaluate, layout_errors, layout_key
+from engine import BOARD_END, MAGIC_TILES_TEMPLATE, SNAKE_LADDERS
+
+# Offline: szukanie układu węży i drabin pod zadaną długość gry, rozrzut i
+# przewagę pierwszego gracza. Algorytm ewolucyjny (mu + lambda) na mutacjach
+# pojedynczych skoków; każdy układ ocenia board_layout.evaluate (dokładnie,
+# bez losowania), kandydaci idą do puli procesów, a już ocenione układy
+# biorą wynik z pamięci. Liczba węży i drabin oraz pola magiczne zostają jak
+# w planszy startowej.
+#
+#   python board_optimizer.py --target-rounds 20 --generations 40 --out data/board.json
+#   BOARD_FILE=data/board.json python app.py
+
+Key = Tuple[Tuple[int, int], ...]
+
+MIN_JUMP = 3  # krótszy skok nic nie wnosi do gry
+
+
+def _score(metrics: Dict[str, float], target: float, w_var: float, w_fair: float) -> float:
+    # im mniej, tym lepiej: odchylenie od docelowej długości (względne),
+    # rozrzut (wsp. zmienności) i przewaga pierwszego gracza
+    length = abs(metrics["game_rounds"] - target) / target
+    cv = metrics["turns_std"] / max(1e-9, metrics["turns_mean"])
+    return length + w_var * cv + w_fair * abs(metrics["first_advantage"]) * 10 + metrics["unfinished"] * 100
+
+
+def _evaluate_key(args: Tuple[Key, int, int]) -> Tuple[Key, Dict[str, float]]:
+    key, players, max_rolls = args
+    return key, evaluate(dict(key), BOARD_END, players=players, max_rolls=max_rolls)
+
+
+class Optimizer:
+    def __init__(self, magic: Set[int], players: int = 2, max_rolls: int = 3, target: float = 20.0,
+                 w_var: float = 0.5, w_fair: float = 1.0, workers: Optional[int] = None,
+                 rng: Optional[random.Random] = None):
+        self.magic = magic
+        self.players = players
+        self.max_rolls = max_rolls
+        self.target = target
+        self.w_var = w_var
+        self.w_fair = w_fair
+        self.workers = workers
+        self.rng = rng or random.Random()
+        self.memo: Dict[Key, Dict[str, float]] = {}
+        self.evaluated = 0
+        self.memo_hits = 0
+
+    def valid(self, key: Key) -> bool:
+        if any(abs(a - b) < MIN_JUMP for a, b in key):
+            return False
+        return not layout_errors(dict(key), self.magic, BOARD_END)
+
+    def score(self, key: Key) -> float:
+        return _score(self.memo[key], self.target, self.w_var, self.w_fair)
+
+    # ----- mutacje -----
+    def _random_jump(self, ladder: bool) -> Tuple[int, int]:
+        a = self.rng.randrange(2, BOARD_END - MIN_JUMP)
+        if ladder:
+            return a, self.rng.randrange(a + MIN_JUMP, BOARD_END + 1)
+        a = max(a, MIN_JUMP + 1)
+        return a, self.rng.randrange(1, a - MIN_JUMP + 1)
+
+    def mutate(self, key: Key) -> Optional[Key]:
+        items = list(key)
+        i = self.rng.randrange(len(items))
+        a, b = items[i]
+        ladder = b > a
+        op = self.rng.random()
+        if op < 0.4:
+            a += self.rng.choice((-1, 1)) * self.rng.randint(1, 8)        # przesuń początek
+        elif op < 0.8:
+            b += self.rng.choice((-1, 1)) * self.rng.randint(1, 8)        # przesuń koniec
+        else:
+            a, b = self._random_jump(ladder)                             # nowy skok tego rodzaju
+        if (b > a) != ladder or not (0 < a < BOARD_END) or not (0 < b <= BOARD_END):
+            return None
+        items[i] = (a, b)
+        if len({x for x, _ in items}) != len(items):
+            return None
+        new = tuple(sorted(items))
+        return new if self.valid(new) else None
+
+    def offspring(self, parents: List[Key], n: int) -> List[Key]:
+        out: List[Key] = []
+        tries = 0
+        while len(out) < n and tries < n * 50:
+            tries += 1
+            child = self.rng.choice(parents)
+            for _ in range(self.rng.randint(1, 3)):
+                child = self.mutate(child) or child
+            if child in self.memo:
+                self.memo_hits += 1
+            elif child not in out:
+                out.append(child)
+        return out
+
+    # ----- ocena -----
+    def evaluate_all(self, pool: Optional[ProcessPoolExecutor], keys: List[Key]) -> None:
+        todo = [k for k in keys if k not in self.memo]
+        self.memo_hits += len(keys) - len(todo)
+        if not todo:
+            return
+        args = [(k, self.players, self.max_rolls) for k in todo]
+        results: Iterable[Tuple[Key, Dict[str, float]]]
+        if pool is None:
+            results = map(_evaluate_key, args)
+        else:
+            chunk = max(1, len(args) // (4 * (self.workers or os.cpu_count() or 1)))
+            results = pool.map(_evaluate_key, args, chunksize=chunk)
+        for key, metrics in results:
+            self.memo[key] = metrics
+        self.evaluated += len(todo)
+
+    def run(self, start: Key, generations: int, population: int, children: int,
+            log=None) -> Key:
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            self.evaluate_all(pool, [start])
+            pop = [start]
+            for gen in range(generations):
+                kids = self.offspring(pop, children)
+                self.evaluate_all(pool, kids)
+                pop = sorted(set(pop) | set(kids), key=self.score)[:population]
+                if log:
+                    best = pop[0]
+                    log(f"pokolenie {gen + 1}: wynik={self.score(best):.4f} {self.memo[best]}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return pop[0]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Optymalizacja układu węży i drabin")
+    ap.add_argument("--target-rounds", type=float, default=20.0, help="docelowa długość gry w rundach")
+    ap.add_argument("--variance-weight", type=float, default=0.5)
+    ap.add_argument("--fairness-weight", type=float, default=1.0)
+    ap.add_argument("--players", type=int, default=2)
+    ap.add_argument("--max-rolls", type=int, default=3, help="limit rzutów w turze (mp: 3)")
+    ap.add_argument("--generations", type=int, default=30)
+    ap.add_argument("--population", type=int, default=16)
+    ap.add_argument("--children", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=None, help="procesy (domyślnie liczba CPU, 1 = bez puli)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="plik JSON planszy (dla BOARD_FILE)")
+    args = ap.parse_args()
+
+    opt = Optimizer(
+        set(MAGIC_TILES_TEMPLATE), players=args.players, max_rolls=args.max_rolls,
+        target=args.target_rounds, w_var=args.variance_weight, w_fair=args.fairness_weight,
+        workers=args.workers, rng=random.Random(args.seed),
+    )
+    start = layout_key(SNAKE_LADDERS)
+    log = lambda line: sys.stderr.write(line + "\n")  # noqa: E731
+
+    t0 = time.perf_counter()
+    best = opt.run(start, args.generations, args.population, args.children, log=log)
+    dt = time.perf_counter() - t0
+    log(f"start: wynik={opt.score(start):.4f} {opt.memo[start]}")
+    log(f"najlepszy: wynik={opt.score(best):.4f} {opt.memo[best]}")
+    log(f"ocenionych układów={opt.evaluated} z pamięci={opt.memo_hits} czas={dt:.1f}s "
+        f"({opt.evaluated / dt:.0f} układów/s)")
+
+    board = board_to_dict(dict(best), MAGIC_TILES_TEMPLATE, metrics=dict(opt.memo[best], score=round(opt.score(best), 5)))
+    text = json.dumps(board, ensure_ascii=False, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
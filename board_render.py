@@ -0,0 +1,84 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from markupsafe import Markup, escape
+
+MAGIC_SLOT = "\x00magic\x00"
+PAWNS_SLOT = "\x00pawns\x00"
+
+
+def board_order() -> List[int]:
+    # kolejność pól w siatce 10x10 (wąż: co drugi rząd od prawej) — jak w szablonach
+    out = []
+    for idx in range(100):
+        row = 9 - (idx // 10)
+        col = idx % 10
+        out.append(row * 10 + col + 1 if row % 2 == 0 else row * 10 + (10 - col))
+    return out
+
+
+class BoardSkeleton:
+    # statyczna plansza pocięta na kawałki między znacznikami; na żądanie
+    # wstawiamy tylko klasę "magic" i pionki
+    def __init__(self, html: str):
+        self.order = board_order()
+        parts = html.replace(PAWNS_SLOT, MAGIC_SLOT).split(MAGIC_SLOT)
+        if len(parts) != 2 * len(self.order) + 1:
+            raise ValueError("szkielet planszy musi mieć magic_slot i pawns_slot w każdym polu")
+        self.parts = parts
+
+    def render(self, magic: Set[int], pawns: Dict[int, List[str]]) -> Markup:
+        parts = self.parts
+        out = [parts[0]]
+        for i, n in enumerate(self.order):
+            out.append("magic" if n in magic else "")
+            out.append(parts[2 * i + 1])
+            cell_pawns = pawns.get(n)
+            if cell_pawns:
+                out.append("\n".join(cell_pawns))
+            out.append(parts[2 * i + 2])
+        return Markup("".join(out))
+
+
+def pawn_html(players: Iterable[Dict[str, Any]]) -> Dict[int, List[str]]:
+    out: Dict[int, List[str]] = {}
+    for i, p in enumerate(players):
+        pos = int(p.get("pos", 0))
+        if pos > 0:
+            out.setdefault(pos, []).append(
+                f'<div class="pawn {escape(p.get("color", ""))} slot-{i}" data-player="{i}"></div>'
+            )
+    return out
+
+
+class BoardCache:
+    # szkielet renderowany raz na (szablon, definicja planszy)
+    def __init__(self, render: Callable[..., str]):
+        self.render_template = render
+        self._lock = threading.Lock()
+        self._skeletons: Dict[Tuple[str, Tuple[Tuple[int, int], ...]], BoardSkeleton] = {}
+
+    def skeleton(self, template: str, snakes_ladders: Dict[int, int]) -> BoardSkeleton:
+        key = (template, tuple(sorted(snakes_ladders.items())))
+        sk = self._skeletons.get(key)
+        if sk is None:
+            html = self.render_template(
+                template, snakes_ladders=snakes_ladders, magic_slot=MAGIC_SLOT, pawns_slot=PAWNS_SLOT
+            )
+            sk = BoardSkeleton(html)
+            with self._lock:
+                self._skeletons[key] = sk
+        return sk
+
+    def board_html(
+        self,
+        template: str,
+        snakes_ladders: Dict[int, int],
+        magic: Set[int],
+        players: Iterable[Dict[str, Any]],
+    ) -> Markup:
+        return self.skeleton(template, snakes_ladders).render(magic, pawn_html(players))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._skeletons.clear()
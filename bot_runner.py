@@ -0,0 +1,110 @@
+import heapq
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Wspólny wykonawca tur botów w pokojach mp. Zapis pokoju, po którym tura
+# przechodzi na bota, budzi pokój (wake) z krótkim opóźnieniem, żeby ludzie
+# zdążyli zobaczyć poprzedni ruch. Jeden wątek rozdzielający zbiera pokoje,
+# którym minął termin, w partie (do `batch` pokoi) i oddaje partię do puli
+# wątków; terminy są zaokrąglane w górę do `tick`, więc pokoje obudzone w tym
+# samym oknie trafiają do jednej partii. Pula rozgrywa po jednej turze bota
+# na pokój (jeden zapis na turę).
+# Pokój jest w kolejce najwyżej raz i nigdy nie jest liczony przez dwa wątki naraz:
+# wake() w trakcie tury (zapis kończący turę, po której gra kolejny bot) czeka,
+# aż bieżąca tura się skończy.
+
+
+class BotRunner:
+    def __init__(self, run_turn: Callable[[str], None], workers: int = 2, batch: int = 32, delay: float = 0.5,
+                 tick: float = 0.05):
+        self.run_turn = run_turn
+        self.workers = max(1, workers)
+        self.batch = max(1, batch)
+        self.delay = delay
+        self.tick = tick
+        self._cond = threading.Condition()
+        self._due: Dict[str, float] = {}             # kod -> termin (monotonic)
+        self._heap: List[Tuple[float, str]] = []     # (termin, kod); nieaktualne wpisy pomijamy
+        self._busy: Set[str] = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self.turns = 0
+        self.batches = 0
+        self.errors = 0
+
+    def wake(self, code: str, delay: Optional[float] = None) -> None:
+        due = time.monotonic() + (self.delay if delay is None else delay)
+        if self.tick > 0:
+            due = math.ceil(due / self.tick) * self.tick
+        self._ensure_thread()
+        with self._cond:
+            prev = self._due.get(code)
+            if prev is not None and prev <= due:
+                return
+            self._due[code] = due
+            heapq.heappush(self._heap, (due, code))
+            self._cond.notify()
+
+    def __contains__(self, code: str) -> bool:
+        with self._cond:
+            return code in self._due or code in self._busy
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="room-bots")
+                self._thread = threading.Thread(target=self._run, args=(self._pool,), name="room-bots-dispatch",
+                                                daemon=True)
+                self._thread.start()
+
+    def _take(self) -> List[str]:
+        # czeka na pierwszy termin; zwraca do `batch` pokoi, które nie są właśnie liczone
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                out: List[str] = []
+                skipped: List[Tuple[float, str]] = []
+                while self._heap and self._heap[0][0] <= now and len(out) < self.batch:
+                    due, code = heapq.heappop(self._heap)
+                    if self._due.get(code) != due:
+                        continue  # przeterminowany wpis (pokój obudzony wcześniej)
+                    if code in self._busy:
+                        skipped.append((due, code))
+                        continue
+                    del self._due[code]
+                    self._busy.add(code)
+                    out.append(code)
+                for item in skipped:
+                    heapq.heappush(self._heap, item)
+                if out:
+                    return out
+                # najbliższy termin pokoju, który nie jest liczony; zajęte budzi koniec tury
+                nxt = min((d for d, c in self._heap if c not in self._busy and self._due.get(c) == d), default=None)
+                self._cond.wait(None if nxt is None else max(0.0, nxt - now))
+
+    def _run(self, pool: ThreadPoolExecutor) -> None:
+        while True:
+            codes = self._take()
+            self.batches += 1
+            pool.submit(self._run_batch, codes)
+
+    def _run_batch(self, codes: List[str]) -> None:
+        for code in codes:
+            try:
+                self.run_turn(code)
+                self.turns += 1
+            except Exception:
+                self.errors += 1
+            finally:
+                with self._cond:
+                    self._busy.discard(code)
+                    self._cond.notify()
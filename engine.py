@@ -0,0 +1,1596 @@
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from board_layout import load_board
+from replay import (
+    ACT_CARD, ACT_JOIN, ACT_NAMES, ACT_POLICY_SNAKE, ACT_POLICY_TELEPORT, ACT_ROLL, ACT_SKIP, ACT_SNAKE,
+    REPLAY_VERSION, action_rng, board_id, decoded, dice_index, encode_action, pack_actions, unpack_actions,
+)
+from stats import MODES as STATS_MODES, NullStats
+
+# Silnik gry: plansza, gracze, karty, AI i powtórki — bez Flaska i bez I/O
+# (poza opcjonalnym BOARD_FILE), więc import jest tani (CLI, symulacje,
+# workery przed pierwszym żądaniem).
+
+BOARD_END = 100
+
+SNAKE_LADDERS = {
+    9: 27, 16: 7, 18: 37, 28: 51, 25: 54, 56: 64, 59: 17, 63: 19,
+    67: 30, 68: 88, 76: 97, 79: 100, 93: 69, 95: 75, 99: 77
+}
+
+MAGIC_TILES_TEMPLATE: Dict[int, Optional[str]] = {
+    6: None, 14: None, 22: None, 35: None, 47: None, 58: None, 73: None, 86: None
+}
+
+# plansza z pliku (board_optimizer.py --out): podmieniamy zawartość w miejscu,
+# zanim ktokolwiek zaimportuje stałe; BOARD_ID niżej liczy się już z nowej planszy
+if os.environ.get("BOARD_FILE"):
+    _sl, _magic = load_board(os.environ["BOARD_FILE"], BOARD_END)
+    SNAKE_LADDERS.clear()
+    SNAKE_LADDERS.update(_sl)
+    MAGIC_TILES_TEMPLATE.clear()
+    MAGIC_TILES_TEMPLATE.update(_magic)
+
+CARD_POOL = ["ANTY_WAZ", "TELEPORT_PLUS3"]
+
+CARD_INDEX = {c: i for i, c in enumerate(CARD_POOL)}
+
+# identyfikator planszy w powtórkach: inna plansza = powtórka nie do odtworzenia
+BOARD_ID = board_id(SNAKE_LADDERS, MAGIC_TILES_TEMPLATE, CARD_POOL)
+
+# stałe decyzje gracza (drużyny), stosowane w trakcie rzutu bez okienka "pending":
+#   snake_min     — None = pytaj; N = ANTY WĄŻ na wężach dłuższych niż N, krótsze bierzemy (karta zostaje)
+#   auto_teleport — TELEPORT +3 od razu po rzucie, jeśli +3 trafia na drabinę
+# progi są z krótkiej listy, żeby zmiana mieściła się w jednym bajcie powtórki
+SNAKE_POLICY_STEPS: Tuple[Optional[int], ...] = (None, 0, 10, 20, 30, 40)
+POLICY_DEFAULTS: Dict[str, Any] = {"snake_min": None, "auto_teleport": False}
+
+# ścieżka animacji: [seq, gracz, skąd, lądowanie, dokąd, rodzaj]
+PATH_ROLL = 0       # krokami from -> land, potem ewentualny skok land -> to
+PATH_TELEPORT = 1   # karta TELEPORT +3
+PATH_JUMP = 2       # sam skok (np. decyzja "spadnij" na wężu)
+PATH_STAY = 3       # rzut bez ruchu (trzeba trafić dokładnie)
+PATH_MAX_SEGMENTS = 32
+
+
+def is_snake(pos: int) -> bool:
+    return pos in SNAKE_LADDERS and SNAKE_LADDERS[pos] < pos
+
+
+def is_ladder(pos: int) -> bool:
+    return pos in SNAKE_LADDERS and SNAKE_LADDERS[pos] > pos
+
+
+class Player:
+    def __init__(
+        self,
+        pid: Any,
+        name: str,
+        pos: int = 0,
+        color: str = "p-red",
+        card: Optional[str] = None,  # UWAGA: w tej wersji to tylko "display"
+        is_bot: bool = False
+    ):
+        self.id = pid
+        self.name = name
+        self.pos = int(pos)
+        self.color = color
+        self.card = card
+        self.is_bot = bool(is_bot)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "pos": int(self.pos),
+            "color": self.color,
+            "card": self.card,
+            "is_bot": self.is_bot
+        }
+
+    @staticmethod
+    def from_dict(d: Dict[str, Any]) -> "Player":
+        return Player(
+            pid=d.get("id"),
+            name=d.get("name", "Gracz"),
+            pos=int(d.get("pos", 0)),
+            color=d.get("color", "p-red"),
+            card=d.get("card"),
+            is_bot=bool(d.get("is_bot", False))
+        )
+
+
+class MagicTiles:
+    def __init__(self, initial: Optional[Dict[int, Any]] = None):
+        self.tiles: Dict[int, Any] = dict(initial) if initial else MAGIC_TILES_TEMPLATE.copy()
+
+    @staticmethod
+    def from_any(mt: Any) -> "MagicTiles":
+        if not mt:
+            return MagicTiles(MAGIC_TILES_TEMPLATE.copy())
+
+        out: Dict[int, Any] = {}
+        if isinstance(mt, dict):
+            for k, v in mt.items():
+                try:
+                    out[int(k)] = v
+                except Exception:
+                    pass
+        elif isinstance(mt, list):
+            out = {int(x): None for x in mt}
+        return MagicTiles(out)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {str(k): v for k, v in self.tiles.items()}
+
+    def active_list(self) -> List[int]:
+        return [k for k, v in self.tiles.items() if v != "USED"]
+
+
+class Game:
+    # licznik statystyk wspólny dla gier; aplikacja podpina StatsCollector,
+    # powtórki i narzędzia zostają przy NullStats
+    stats: NullStats = NullStats()
+    # plany AI policzone zawczasu (ai_plans.py): lookup(klucz) -> tabela albo None;
+    # None = przypisanie kości liczone w miejscu
+    plans: Optional[Any] = None
+
+    def __init__(self, mode: str = "hotseat", variant: str = "classic"):
+        self.mode: str = mode
+        self.variant: str = variant
+
+        self.players: List[Player] = []
+        self.turn: int = 0
+
+        self.last_roll: Optional[int] = None
+        self.last_player: int = 0
+        self.message: str = ""
+        self.history: List[str] = []
+        self.move_count: int = 0
+
+        self.pending: Optional[Dict[str, Any]] = None
+        self.last_move: Optional[Dict[str, Any]] = None
+
+        # wszystkie ruchy ostatnich akcji (bonusowe 6, teleporty, skoki) — klient
+        # odtwarza segmenty o seq większym niż ostatnio widziany
+        self.move_path: List[List[int]] = []
+        self.path_seq: int = 0
+
+        # tryb ai: po ruchu człowieka od razu rozgrywamy wszystkie kolejne ruchy bota
+        # (bonusowe 6 też), klient dostaje całą sekwencję w move_path
+        self.auto_bots: bool = False
+
+        self.magic: MagicTiles = MagicTiles(MAGIC_TILES_TEMPLATE.copy())
+
+        # KARTY: jedna karta na "gracza/drużynę"
+        # - hotseat: key = str(player.id)
+        # - ai classic: key = "h" / "a"
+        # - ai double: key = "h" / "a"
+        self.team_cards: Dict[str, Optional[str]] = {}
+        # stałe decyzje per drużyna (klucz jak w team_cards), patrz POLICY_DEFAULTS
+        self.policies: Dict[str, Dict[str, Any]] = {}
+        # pionek, który właśnie uniknął węża z polityki (zużyte przez _apply_snake_if_no_pending)
+        self._snake_shield: Optional[Tuple[int, int]] = None
+
+        # Multiplayer
+        self.max_players: int = 2
+        self.winner: Optional[str] = None
+        self.rolls_in_turn: int = 0
+
+        # własny generator na grę — symulacje/testy mogą go zasiać
+        self.rng: random.Random = random.Random()
+
+        # powtórka (mp): ziarno + log akcji po 1 bajcie; None = gra bez powtórki
+        self.replay_seed: Optional[int] = None
+        self.replay_version: int = REPLAY_VERSION
+        self.actions: bytearray = bytearray()
+
+        # czy koniec gry już policzony w statystykach
+        self.stats_done: bool = False
+
+        self.updated_at: float = time.time()
+
+    def touch(self) -> None:
+        self.updated_at = time.time()
+
+    def push_history(self, text: str) -> None:
+        self.history.append(text)
+        self.history = self.history[-8:]
+
+    def current_index(self) -> int:
+        return int(self.turn) % max(1, len(self.players))
+
+    # ===== Ścieżka animacji =====
+    def _player_index(self, p: Player) -> int:
+        return next((i for i, x in enumerate(self.players) if x is p), 0)
+
+    def _path_push(self, idx: int, start: int, land: int, to: int, kind: int) -> None:
+        self.path_seq += 1
+        self.move_path.append([self.path_seq, int(idx), int(start), int(land), int(to), int(kind)])
+        if len(self.move_path) > PATH_MAX_SEGMENTS:
+            self.move_path = self.move_path[-PATH_MAX_SEGMENTS:]
+
+    def _path_jump(self, idx: int, start: int, to: int) -> None:
+        # skok po lądowaniu dopisujemy do segmentu, który na tym polu skończył
+        last = self.move_path[-1] if self.move_path else None
+        if last and last[1] == idx and last[3] == last[4] == int(start):
+            last[4] = int(to)
+            return
+        self._path_push(idx, start, start, to, PATH_JUMP)
+
+    # ===== Helpers: team key / card =====
+    def _team_key_for_player(self, p: Player) -> str:
+        # AI modes: human vs ai
+        if self.mode == "ai":
+            pid = str(p.id)
+            if pid.startswith("h") or pid in ("0",):  # "Ty" classic ma pid=0
+                return "h"
+            return "a"
+        # hotseat / mp: każdy gracz osobno
+        return str(p.id)
+
+    def _get_team_card(self, p: Player) -> Optional[str]:
+        key = self._team_key_for_player(p)
+        return self.team_cards.get(key)
+
+    def _set_team_card(self, p: Player, value: Optional[str]) -> None:
+        key = self._team_key_for_player(p)
+        self.team_cards[key] = value
+
+    def _sync_cards_for_display(self) -> None:
+        # żeby UI dalej działał na players[i].card
+        for pl in self.players:
+            pl.card = self._get_team_card(pl)
+
+    def _team_card_exists(self, team_key: str) -> bool:
+        return bool(self.team_cards.get(team_key))
+
+    # ===== AI DOUBLE WIN =====
+    def _team_positions(self, prefix: str) -> List[int]:
+        return [int(p.pos) for p in self.players if str(p.id).startswith(prefix)]
+
+    def team_won(self, prefix: str) -> bool:
+        pos = self._team_positions(prefix)
+        return len(pos) >= 2 and all(x == BOARD_END for x in pos[:2])
+
+    def winner_text(self) -> Optional[str]:
+        if self.mode == "ai" and self.variant == "double":
+            if self.team_won("h"):
+                return "Ty"
+            if self.team_won("a"):
+                return "Komputer"
+        return None
+
+    def anyone_won(self) -> bool:
+        if self.mode == "ai" and self.variant == "double":
+            return self.team_won("h") or self.team_won("a")
+        return any(int(p.pos) == BOARD_END for p in self.players)
+
+    # ===== Rules helpers =====
+    def _mark_magic_tile_used_if_leaving(self, marker: Any, start_pos: int) -> None:
+        # marker = identyfikator "zajęcia" pola (teraz: team_key)
+        if start_pos in self.magic.tiles and self.magic.tiles.get(start_pos) == marker:
+            self.magic.tiles[start_pos] = "USED"
+
+    def _can_team_take_card_on_tile(self, team_key: str, pos: int) -> bool:
+        if pos not in self.magic.tiles:
+            return False
+        state = self.magic.tiles.get(pos)
+        if state == "USED":
+            return False
+        # jeśli pole jest "zarezerwowane" dla innej drużyny, nie da
+        if state is not None and state != team_key:
+            return False
+        # jeśli drużyna już ma kartę, nie może dostać nowej
+        if self.team_cards.get(team_key) is not None:
+            return False
+        return True
+
+    def _give_card_if_magic_tile(self, p: Player) -> Optional[str]:
+        pos = int(p.pos)
+        team_key = self._team_key_for_player(p)
+
+        if not self._can_team_take_card_on_tile(team_key, pos):
+            return None
+
+        card = self.rng.choice(CARD_POOL)
+        self.team_cards[team_key] = card
+        self.stats.card_gained(pos, CARD_INDEX[card])
+        self.magic.tiles[pos] = team_key  # "rezerwacja" żółtego pola dla tej drużyny
+        return f" ✨ Zdobywasz kartę: {card.replace('_', ' ')}"
+
+    def _try_start_snake_pending(self, p: Player, idx: int, resume: Optional[Dict[str, Any]] = None) -> bool:
+        pos = int(p.pos)
+        if not is_snake(pos):
+            return False
+
+        team_key = self._team_key_for_player(p)
+        team_card = self.team_cards.get(team_key)
+
+        # tylko człowiek dostaje okienko decyzji (w AI double też)
+        if team_card == "ANTY_WAZ" and (not p.is_bot):
+            snake_min = self.policy_for(p).get("snake_min")
+            if snake_min is not None:
+                # stała decyzja: bez okienka i bez dodatkowego żądania
+                if pos - SNAKE_LADDERS[pos] > snake_min:
+                    self.team_cards[team_key] = None
+                    self.stats.card_used(CARD_INDEX["ANTY_WAZ"])
+                    self.stats.snake_avoided(pos)
+                    self._snake_shield = (idx, pos)
+                return False
+            pend = {
+                "type": "snake_choice",
+                "player_id": p.id if p.id is not None else idx,
+                "pawn_idx": idx,
+                "team_key": team_key,
+                "from": pos,
+                "to": SNAKE_LADDERS[pos],
+            }
+            if resume:
+                pend["resume"] = resume
+            self.pending = pend
+            return True
+
+        return False
+
+    def _apply_snake_if_no_pending(self, p: Player) -> Optional[str]:
+        pos = int(p.pos)
+        if self._snake_shield is not None:
+            shield, self._snake_shield = self._snake_shield, None
+            if shield == (self._player_index(p), pos):
+                return f" 🛡 ANTY WĄŻ (auto): zostaje na {pos}"
+        if is_snake(pos):
+            to = SNAKE_LADDERS[pos]
+            p.pos = to
+            self._path_jump(self._player_index(p), pos, to)
+            self.stats.snake(pos)
+            return f" 🐍 Wąż! {pos} -> {to}"
+        return None
+
+    # ===== Stałe decyzje =====
+    def policy_for(self, p: Player) -> Dict[str, Any]:
+        return self.policies.get(self._team_key_for_player(p)) or POLICY_DEFAULTS
+
+    def set_policy(self, player_id: Any, name: str, value: Any) -> bool:
+        # True = coś się zmieniło; nieznane nazwy/wartości ignorujemy
+        p = next((pl for pl in self.players if pl.id == player_id), None)
+        if p is None or p.is_bot or name not in POLICY_DEFAULTS:
+            return False
+        if name == "snake_min" and value not in SNAKE_POLICY_STEPS:
+            return False
+        if name == "auto_teleport":
+            value = bool(value)
+        team_key = self._team_key_for_player(p)
+        cur = self.policies.get(team_key) or dict(POLICY_DEFAULTS)
+        if cur.get(name) == value:
+            return False
+        self.policies[team_key] = dict(cur, **{name: value})
+        return True
+
+    def _auto_teleport(self, idx: int) -> Optional[str]:
+        p = self.players[idx]
+        team_key = self._team_key_for_player(p)
+        if self.team_cards.get(team_key) != "TELEPORT_PLUS3" or p.is_bot:
+            return None
+        if not self.policy_for(p).get("auto_teleport") or not is_ladder(int(p.pos) + 3):
+            return None
+        self.move_count += 1
+        return " | 🃏 (auto) " + self._teleport_plus3(idx, team_key)
+
+    def _teleport_plus3(self, target_idx: int, team_key: str) -> str:
+        # wywołujący sprawdza, że start + 3 mieści się na planszy
+        pl = self.players[target_idx]
+        start = int(pl.pos)
+        tentative = start + 3
+
+        # schodzimy z żółtego pola (marker=team_key)
+        self._mark_magic_tile_used_if_leaving(team_key, start)
+
+        # zużyj kartę drużyny
+        self.team_cards[team_key] = None
+        self.stats.card_used(CARD_INDEX["TELEPORT_PLUS3"])
+
+        pl.pos = tentative
+        msg = f"{pl.name}: używa TELEPORT +3: {start} -> {tentative}"
+        land_pos = tentative
+
+        if is_ladder(tentative):
+            after = SNAKE_LADDERS[tentative]
+            pl.pos = after
+            self.stats.ladder(tentative)
+            msg += f" 🪜 Drabina! {tentative} -> {after}"
+        self._path_push(target_idx, start, land_pos, int(pl.pos), PATH_TELEPORT)
+
+        if is_snake(tentative):
+            # człowiek: może mieć ANTY_WAZ tylko jeśli drużyna ma ANTY_WAZ (ale teraz zużyliśmy teleport)
+            extra = self._apply_snake_if_no_pending(pl)
+            if extra:
+                msg += extra
+
+        extra2 = self._give_card_if_magic_tile(pl)
+        if extra2:
+            msg += extra2
+        return msg
+
+    def _raw_move(self, idx: int) -> Tuple[str, int, bool, int, int, int]:
+        roll_value = self.rng.randint(1, 6)
+        return self._move_with_roll(idx, roll_value)
+
+    def _move_with_roll(self, idx: int, roll_value: int) -> Tuple[str, int, bool, int, int, int]:
+        p = self.players[idx]
+        roll_value = int(roll_value)
+
+        start = int(p.pos)
+        tentative = start + roll_value
+
+        if tentative > BOARD_END:
+            msg = f"{p.name}: wyrzucono {roll_value}. Musisz trafić dokładnie!"
+            self._path_push(idx, start, start, start, PATH_STAY)
+            self.stats.overshot(roll_value)
+            return msg, roll_value, False, start, start, start
+
+        # schodząc z żółtego pola — oznaczamy USED (teraz marker=team_key)
+        team_key = self._team_key_for_player(p)
+        self._mark_magic_tile_used_if_leaving(team_key, start)
+
+        p.pos = tentative
+        land_pos = tentative
+
+        msg = f"{p.name}: wyrzucono {roll_value}. Ruch: {start} -> {land_pos}"
+
+        self.stats.rolled(roll_value, land_pos)
+        if is_ladder(land_pos):
+            after = SNAKE_LADDERS[land_pos]
+            p.pos = after
+            self.stats.ladder(land_pos)
+            msg = f"{p.name}: wyrzucono {roll_value}. Drabina! {land_pos} -> {after}"
+        elif is_snake(land_pos):
+            after = SNAKE_LADDERS[land_pos]
+            msg = f"{p.name}: wyrzucono {roll_value}. Wąż! {land_pos} -> {after}"
+
+        self._path_push(idx, start, land_pos, int(p.pos), PATH_ROLL)
+
+        won = (int(p.pos) == BOARD_END) if not (self.mode == "ai" and self.variant == "double") else False
+        return msg, roll_value, bool(won), start, land_pos, int(p.pos)
+
+    # ===== AI double evaluation helpers =====
+    def _apply_ladder_virtual(self, n: int) -> int:
+        if is_ladder(n):
+            return int(SNAKE_LADDERS[n])
+        return int(n)
+
+    def _is_active_magic_for(self, p: Player, n: int) -> bool:
+        if n > BOARD_END:
+            return False
+        team_key = self._team_key_for_player(p)
+        if n not in self.magic.tiles:
+            return False
+        if self.magic.tiles.get(n) == "USED":
+            return False
+        # jeśli drużyna ma już kartę -> nie opłaca się "polować"
+        if self.team_cards.get(team_key) is not None:
+            return False
+        state = self.magic.tiles.get(n)
+        return (state is None) or (state == team_key)
+
+    def _score_runner_ladder(self, p: Player, die: int) -> int:
+        start = int(p.pos)
+        land = start + int(die)
+        if land > BOARD_END:
+            return -10_000
+        after = self._apply_ladder_virtual(land)
+
+        score = after * 10
+        if is_ladder(land):
+            score += 5000
+        if is_snake(land):
+            score -= 3000
+        score += max(0, after - 90) * 30
+        return score
+
+    def _score_card_collector(self, p: Player, die: int) -> int:
+        start = int(p.pos)
+        land = start + int(die)
+        if land > BOARD_END:
+            return -10_000
+
+        after = self._apply_ladder_virtual(land)
+        score = after * 5
+
+        if self._is_active_magic_for(p, land):
+            score += 6000
+        if is_snake(land):
+            score -= 1500
+        if is_ladder(land):
+            score += 700
+        return score
+
+    # ===== Normal roll (hotseat / ai classic) + AI double dice pending/auto =====
+    def roll(self) -> None:
+        self.touch()
+
+        if not self.players:
+            self.message = "Brak graczy."
+            return
+
+        if self.anyone_won():
+            self.message = "Gra zakończona."
+            return
+
+        if self.pending:
+            self.message = "Najpierw podejmij decyzję (pending)."
+            self.push_history(self.message)
+            self.last_move = None
+            return
+
+        idx = self.current_index()
+
+        # ===== AI DOUBLE: człowiek rzuca 2 kośćmi =====
+        if self.mode == "ai" and self.variant == "double":
+            if idx != 0:
+                self.message = "Teraz ruch komputera…"
+                self.push_history(self.message)
+                return
+
+            d1 = self.rng.randint(1, 6)
+            d2 = self.rng.randint(1, 6)
+
+            h1_done = int(self.players[0].pos) == BOARD_END
+            h2_done = int(self.players[1].pos) == BOARD_END
+
+            # jeśli dokładnie jeden pionek jest na mecie -> rzut tylko 1 kością (bez wyboru)
+            if h1_done ^ h2_done:
+                idx_move = 1 if h1_done else 0
+                d = self.rng.randint(1, 6)
+
+                parts = [f"🎲 Wyrzucono: {d}. Drugi pionek jest na mecie — wykonujesz tylko 1 ruch."]
+
+                msg, rv, _, _, _, _ = self._move_with_roll(idx_move, d)
+                self.last_roll = int(rv)
+                self.last_player = idx_move
+                self.move_count += 1
+                parts.append(msg)
+
+                # snake pending (tylko człowiek)
+                if self._try_start_snake_pending(self.players[idx_move], idx_move,
+                                                 resume={"type": "after_auto_one", "next": None}):
+                    parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
+                    self.message = " | ".join(parts)
+                    self.push_history(self.message)
+                    self.last_move = None
+                    return
+
+                extra = self._apply_snake_if_no_pending(self.players[idx_move])
+                if extra:
+                    parts[-1] += extra
+                extra2 = self._give_card_if_magic_tile(self.players[idx_move])
+                if extra2:
+                    parts[-1] += extra2
+
+                if self.team_won("h"):
+                    self.pending = None
+                    self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
+                    self.push_history(self.message)
+                    return
+
+                self.pending = None
+                self.turn = 2
+                self.message = " | ".join(parts)
+                self.push_history(self.message)
+                return
+
+                extra = self._apply_snake_if_no_pending(self.players[idx_move])
+                if extra:
+                    parts[-1] += extra
+                extra2 = self._give_card_if_magic_tile(self.players[idx_move])
+                if extra2:
+                    parts[-1] += extra2
+
+                if self.team_won("h"):
+                    self.pending = None
+                    self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
+                    self.push_history(self.message)
+                    return
+
+                self.pending = None
+                self.turn = 2
+                self.message = " | ".join(parts)
+                self.push_history(self.message)
+                return
+
+            self.pending = {"type": "dice_choice", "dice": [d1, d2]}
+            self.message = f"🎲 Wyrzucono: {d1} i {d2}. Wybierz przypisanie kości do pionków."
+            self.push_history(self.message)
+            self.last_move = None
+            return
+
+        # ===== AI classic: blokuj gdy bot =====
+        if self.mode == "ai" and self.players[idx].is_bot:
+            self.message = "Teraz ruch komputera…"
+            self.push_history(self.message)
+            return
+
+        msg, roll_value, won, from_pos, land_pos, to_pos = self._raw_move(idx)
+
+        self.last_roll = int(roll_value)
+        self.last_player = idx
+        self.move_count += 1
+
+        if (not won) and self._try_start_snake_pending(self.players[idx], idx):
+            msg += " 🃏 Masz ANTY WĄŻ - wybierz: zostać czy cofnąć się?"
+            self.message = msg
+            self.push_history(msg)
+            self.last_move = None
+            return
+
+        if not won:
+            extra = self._apply_snake_if_no_pending(self.players[idx])
+            if extra:
+                msg += extra
+                to_pos = int(self.players[idx].pos)
+
+        if not won:
+            extra2 = self._give_card_if_magic_tile(self.players[idx])
+            if extra2:
+                msg += extra2
+
+        if not won:
+            extra3 = self._auto_teleport(idx)
+            if extra3:
+                msg += extra3
+                won = int(self.players[idx].pos) == BOARD_END
+
+        if (not won) and int(roll_value) == 6:
+            msg += " 🎲 Bonus: 6 → dodatkowy rzut!"
+
+        self.last_move = {
+            "player": idx,
+            "from": from_pos,
+            "land": land_pos,
+            "to": int(self.players[idx].pos),
+            "move_count": self.move_count,
+            "won": bool(won),
+        } if (from_pos != int(self.players[idx].pos) or from_pos != land_pos) else None
+
+        self.message = msg
+        self.push_history(msg)
+
+        if not won and int(roll_value) != 6:
+            self.turn = (idx + 1) % len(self.players)
+
+    # ===== AI DOUBLE: apply dice choice for human (2 moves) =====
+    def apply_dice_choice_human(self, swap: bool) -> None:
+        self.touch()
+
+        if not (self.mode == "ai" and self.variant == "double"):
+            return
+
+        pend = self.pending
+        if not pend or pend.get("type") != "dice_choice":
+            return
+
+        d1, d2 = pend.get("dice", [None, None])
+        if d1 is None or d2 is None:
+            self.pending = None
+            return
+
+        i1, i2 = 0, 1
+        r1, r2 = (d2, d1) if swap else (d1, d2)
+
+        parts: List[str] = []
+
+        msg1, rv1, _, _, _, _ = self._move_with_roll(i1, r1)
+        self.last_roll = int(rv1)
+        self.last_player = i1
+        self.move_count += 1
+        parts.append(msg1)
+
+        if self._try_start_snake_pending(self.players[i1], i1, resume={"type": "after_dice_choice", "next": [i2, r2]}):
+            parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
+            self.message = " | ".join(parts)
+            self.push_history(self.message)
+            self.last_move = None
+            return
+
+        extra = self._apply_snake_if_no_pending(self.players[i1])
+        if extra:
+            parts[-1] += extra
+        extra2 = self._give_card_if_magic_tile(self.players[i1])
+        if extra2:
+            parts[-1] += extra2
+
+        if self.team_won("h"):
+            self.pending = None
+            self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
+            self.push_history(self.message)
+            return
+
+        msg2, rv2, _, _, _, _ = self._move_with_roll(i2, r2)
+        self.last_roll = int(rv2)
+        self.last_player = i2
+        self.move_count += 1
+        parts.append(msg2)
+
+        if self._try_start_snake_pending(self.players[i2], i2, resume={"type": "after_dice_choice", "next": None}):
+            parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
+            self.message = " | ".join(parts)
+            self.push_history(self.message)
+            self.last_move = None
+            return
+
+        extra = self._apply_snake_if_no_pending(self.players[i2])
+        if extra:
+            parts[-1] += extra
+        extra2 = self._give_card_if_magic_tile(self.players[i2])
+        if extra2:
+            parts[-1] += extra2
+
+        if self.team_won("h"):
+            self.pending = None
+            self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
+            self.push_history(self.message)
+            return
+
+        self.pending = None
+        self.turn = 2
+        self.message = " | ".join(parts)
+        self.push_history(self.message)
+
+    # ===== snake decision (classic + mp + double resume) =====
+    def snake_decision(self, player_id: Any, choice: str) -> None:
+        self.touch()
+
+        pend = self.pending
+        if not pend or pend.get("type") != "snake_choice":
+            return
+
+        idx = next((i for i, p in enumerate(self.players) if p.id == player_id), None)
+        if idx is None:
+            self.pending = None
+            return
+
+        pl = self.players[idx]
+        from_pos = int(pl.pos)
+        land_pos = int(pend["from"])
+
+        team_key = pend.get("team_key") or self._team_key_for_player(pl)
+        resume = pend.get("resume")
+
+        if choice == "back":
+            # NIE zużywamy karty
+            pl.pos = int(pend["to"])
+            self._path_jump(idx, land_pos, int(pl.pos))
+            self.stats.snake(land_pos)
+            msg = f"{pl.name}: wybrał(a) cofnięcie. 🐍 {pend['from']} -> {pend['to']}"
+        else:
+            # Zużywamy ANTY_WAZ drużyny
+            if self.team_cards.get(team_key) == "ANTY_WAZ":
+                self.team_cards[team_key] = None
+                self.stats.card_used(CARD_INDEX["ANTY_WAZ"])
+            self.stats.snake_avoided(land_pos)
+            msg = f"{pl.name}: użył(a) ANTY WĄŻ i zostaje na {pend['from']} ✅"
+
+        self.pending = None
+
+        self.message = msg
+        self.push_history(msg)
+
+        self.move_count += 1
+        self.last_move = {
+            "player": idx,
+            "from": from_pos,
+            "land": land_pos,
+            "to": int(pl.pos),
+            "move_count": self.move_count,
+            "won": False,
+        }
+
+        # ===== AI DOUBLE resume: execute second pawn move after snake decision =====
+        # (after_auto_one: jedyny ruch tury już się odbył — oddajemy turę AI)
+        if self.mode == "ai" and self.variant == "double" and isinstance(resume, dict) and resume.get("type") in ("after_dice_choice", "after_auto_one"):
+            nxt = resume.get("next")
+            if nxt:
+                i2, r2 = int(nxt[0]), int(nxt[1])
+                parts = [self.message]
+
+                msg2, rv2, _, _, _, _ = self._move_with_roll(i2, r2)
+                self.last_roll = int(rv2)
+                self.last_player = i2
+                self.move_count += 1
+                parts.append(msg2)
+
+                if self._try_start_snake_pending(self.players[i2], i2, resume={"type": "after_dice_choice", "next": None}):
+                    parts[-1] += " 🃏 Masz ANTY WĄŻ — wybierz decyzję."
+                    self.message = " | ".join(parts)
+                    self.push_history(self.message)
+                    self.last_move = None
+                    return
+
+                extra = self._apply_snake_if_no_pending(self.players[i2])
+                if extra:
+                    parts[-1] += extra
+                extra2 = self._give_card_if_magic_tile(self.players[i2])
+                if extra2:
+                    parts[-1] += extra2
+
+                if self.team_won("h"):
+                    self.message = " | ".join(parts) + " 🏁 Wygrana! Oba Twoje pionki są na mecie."
+                    self.push_history(self.message)
+                    return
+
+                self.turn = 2
+                self.message = " | ".join(parts)
+                self.push_history(self.message)
+                return
+
+            self.turn = 2
+            return
+
+        if self.last_roll != 6:
+            self.turn = (idx + 1) % len(self.players)
+
+    # ===== use_card (TELEPORT only) =====
+    def use_card(self, pawn_idx: Optional[int] = None) -> None:
+        self.touch()
+
+        if not self.players or self.anyone_won():
+            return
+        if self.pending:
+            self.message = "Najpierw rozwiąż decyzję (pending)."
+            self.push_history(self.message)
+            return
+
+        idx_turn = self.current_index()
+        turn_player = self.players[idx_turn]
+        team_key = self._team_key_for_player(turn_player)
+        card = self.team_cards.get(team_key)
+        if not card:
+            return
+
+        # W AI double: człowiek może użyć na wybranym swoim pionku (0 lub 1)
+        target_idx = idx_turn
+        if self.mode == "ai" and self.variant == "double" and team_key == "h":
+            if pawn_idx is not None:
+                try:
+                    pi = int(pawn_idx)
+                    if pi in (0, 1):
+                        target_idx = pi
+                except Exception:
+                    pass
+
+        pl = self.players[target_idx]
+
+        # nie pozwól użyć na pionku już na mecie
+        if int(pl.pos) == BOARD_END:
+            self.message = "Ten pionek jest już na mecie."
+            self.push_history(self.message)
+            return
+
+        if card == "TELEPORT_PLUS3":
+            start = int(pl.pos)
+            tentative = start + 3
+
+            if tentative > BOARD_END:
+                msg = f"{pl.name}: TELEPORT +3, ale musisz trafić dokładnie!"
+                self.message = msg
+                self.push_history(msg)
+                return
+
+            msg = self._teleport_plus3(target_idx, team_key)
+
+            self.move_count += 1
+            self.last_move = {
+                "player": target_idx,
+                "from": start,
+                "land": tentative,
+                "to": int(pl.pos),
+                "move_count": self.move_count,
+                "won": False,
+            }
+
+            self.message = msg
+            self.push_history(msg)
+
+    # ===== AI classic =====
+    def ai_move(self) -> None:
+        self.touch()
+
+        if not self.players or self.anyone_won():
+            return
+
+        idx = self.current_index()
+        if not (self.mode == "ai" and self.players[idx].is_bot):
+            return
+
+        bot = self.players[idx]
+        team_key = self._team_key_for_player(bot)
+
+        # BOT: TELEPORT asap (karta drużyny)
+        if self.team_cards.get(team_key) == "TELEPORT_PLUS3" and not self.pending:
+            start = int(bot.pos)
+            tentative = start + 3
+            if tentative <= BOARD_END:
+                self._mark_magic_tile_used_if_leaving(team_key, start)
+                self.team_cards[team_key] = None
+                self.stats.card_used(CARD_INDEX["TELEPORT_PLUS3"])
+                bot.pos = tentative
+
+                msg = f"{bot.name}: używa TELEPORT +3: {start} -> {tentative}"
+
+                if is_ladder(tentative):
+                    after = SNAKE_LADDERS[tentative]
+                    bot.pos = after
+                    self.stats.ladder(tentative)
+                    msg += f" 🪜 Drabina! {tentative} -> {after}"
+                self._path_push(idx, start, tentative, int(bot.pos), PATH_TELEPORT)
+
+                if is_snake(tentative):
+                    # BOT: jeśli ma ANTY_WAZ jako karta drużyny, to zostaje
+                    if self.team_cards.get(team_key) == "ANTY_WAZ":
+                        self.team_cards[team_key] = None
+                        self.stats.card_used(CARD_INDEX["ANTY_WAZ"])
+                        self.stats.snake_avoided(tentative)
+                        msg += f" 🃏 BOT używa ANTY WĄŻ i zostaje na {tentative} ✅"
+                    else:
+                        extra = self._apply_snake_if_no_pending(bot)
+                        if extra:
+                            msg += extra
+
+                extra2 = self._give_card_if_magic_tile(bot)
+                if extra2:
+                    msg += extra2
+
+                self.move_count += 1
+                self.last_roll = None
+                self.last_player = idx
+                self.last_move = {
+                    "player": idx,
+                    "from": start,
+                    "land": tentative,
+                    "to": int(bot.pos),
+                    "move_count": self.move_count,
+                    "won": bool(int(bot.pos) == BOARD_END),
+                }
+
+                self.message = msg
+                self.push_history(msg)
+
+                if int(bot.pos) == BOARD_END:
+                    return
+
+        msg, roll_value, won, from_pos, land_pos, to_pos = self._raw_move(idx)
+
+        self.last_roll = int(roll_value)
+        self.last_player = idx
+        self.move_count += 1
+
+        pos_after = int(self.players[idx].pos)
+        if (not won) and is_snake(pos_after):
+            if self.team_cards.get(team_key) == "ANTY_WAZ":
+                self.team_cards[team_key] = None
+                self.stats.card_used(CARD_INDEX["ANTY_WAZ"])
+                self.stats.snake_avoided(pos_after)
+                msg += f" 🃏 BOT używa ANTY WĄŻ i zostaje na {pos_after} ✅"
+            else:
+                extra = self._apply_snake_if_no_pending(self.players[idx])
+                if extra:
+                    msg += extra
+
+        if not won:
+            extra2 = self._give_card_if_magic_tile(self.players[idx])
+            if extra2:
+                msg += extra2
+
+        if (not won) and int(roll_value) == 6:
+            msg += " 🎲 Bonus: 6 → dodatkowy rzut!"
+
+        self.last_move = {
+            "player": idx,
+            "from": from_pos,
+            "land": land_pos,
+            "to": int(self.players[idx].pos),
+            "move_count": self.move_count,
+            "won": bool(won),
+        } if (from_pos != int(self.players[idx].pos) or from_pos != land_pos) else None
+
+        self.message = msg
+        self.push_history(msg)
+
+        if not won and int(roll_value) != 6:
+            self.turn = (idx + 1) % len(self.players)
+
+    def run_bot_turns(self, limit: int = 64) -> int:
+        steps = 0
+        while steps < limit and self.mode == "ai" and self.players and not self.pending and not self.anyone_won():
+            if not self.players[self.current_index()].is_bot:
+                break
+            before = (self.turn, self.move_count)
+            if self.variant == "double":
+                self.ai_pair_move()
+            else:
+                self.ai_move()
+            steps += 1
+            if (self.turn, self.move_count) == before:
+                break
+        return steps
+
+    # ===== AI DOUBLE: one click AI turn (2 dice + strategies) =====
+    def ai_pair_move(self) -> None:
+        self.touch()
+
+        if not (self.mode == "ai" and self.variant == "double"):
+            return
+        if self.pending or self.anyone_won():
+            return
+        if self.current_index() != 2:
+            return
+
+        ladder_idx = 2
+        card_idx = 3
+
+        parts = self._ai_pair_teleport()
+
+        if self.anyone_won():
+            self.message = " | ".join(parts)
+            self.push_history(self.message)
+            return
+
+        d1 = self.rng.randint(1, 6)
+        d2 = self.rng.randint(1, 6)
+        parts.append(f"🤖 AI rzuca: {d1} i {d2}")
+
+        if self._ai_pair_swap(d1, d2):
+            ladder_roll, card_roll = d2, d1
+            parts.append("🤖 AI wybiera przypisanie: ladder←druga kość, cards←pierwsza kość")
+        else:
+            ladder_roll, card_roll = d1, d2
+            parts.append("🤖 AI wybiera przypisanie: ladder←pierwsza kość, cards←druga kość")
+
+        parts.extend(self._ai_move_one_double(ladder_idx, ladder_roll))
+        if self.team_won("a"):
+            self.message = " | ".join(parts) + " 🏁 Wygrana AI! Oba pionki na mecie."
+            self.push_history(self.message)
+            return
+
+        parts.extend(self._ai_move_one_double(card_idx, card_roll))
+        if self.team_won("a"):
+            self.message = " | ".join(parts) + " 🏁 Wygrana AI! Oba pionki na mecie."
+            self.push_history(self.message)
+            return
+
+        self.turn = 0
+        self.message = " | ".join(parts)
+        self.push_history(self.message)
+
+    def _ai_pair_teleport(self) -> List[str]:
+        # część tury AI przed rzutem (nie zależy od kości)
+        ladder_idx = 2
+        card_idx = 3
+        ladder_p = self.players[ladder_idx]
+        card_p = self.players[card_idx]
+        team_key = "a"
+
+        parts: List[str] = []
+
+        # Jeśli AI ma TELEPORT jako karta drużyny -> spróbuj użyć sensownie
+        if self.team_cards.get(team_key) == "TELEPORT_PLUS3":
+            used = False
+
+            # card-pionek preferuje magic / drabiny
+            if self._is_active_magic_for(card_p, int(card_p.pos) + 3) or is_ladder(int(card_p.pos) + 3) or (int(card_p.pos) + 3 >= BOARD_END - 3):
+                parts.extend(self._ai_use_teleport_double(card_idx, prefer_magic=True))
+                used = True
+
+            # jeśli nie zużył, ladder-pionek zużyje gdy pomaga
+            if (not used):
+                t = int(ladder_p.pos) + 3
+                if t <= BOARD_END and (is_ladder(t) or t >= BOARD_END - 3):
+                    parts.extend(self._ai_use_teleport_double(ladder_idx, prefer_magic=False))
+                    used = True
+        return parts
+
+    def ai_pair_key(self) -> Tuple[Any, ...]:
+        # wszystko, od czego zależy przypisanie kości: pionki AI, karta drużyny, pola magiczne
+        return (int(self.players[2].pos), int(self.players[3].pos), self.team_cards.get("a"),
+                tuple(sorted(self.magic.tiles.items())))
+
+    def ai_pair_table(self) -> bytes:
+        # przypisanie dla wszystkich 36 wyników (d1, d2): 1 = ladder←d2, cards←d1
+        ladder_p, card_p = self.players[2], self.players[3]
+        runner = [self._score_runner_ladder(ladder_p, d) for d in range(1, 7)]
+        collector = [self._score_card_collector(card_p, d) for d in range(1, 7)]
+        return bytes(
+            int(runner[d2] + collector[d1] > runner[d1] + collector[d2])
+            for d1 in range(6) for d2 in range(6)
+        )
+
+    def _ai_pair_swap(self, d1: int, d2: int) -> bool:
+        table = self.plans.lookup(self.ai_pair_key()) if self.plans is not None else None
+        if table is None:
+            ladder_p, card_p = self.players[2], self.players[3]
+            score_a = self._score_runner_ladder(ladder_p, d1) + self._score_card_collector(card_p, d2)
+            score_b = self._score_runner_ladder(ladder_p, d2) + self._score_card_collector(card_p, d1)
+            return score_b > score_a
+        return bool(table[(d1 - 1) * 6 + d2 - 1])
+
+    def _ai_use_teleport_double(self, idx: int, prefer_magic: bool) -> List[str]:
+        parts: List[str] = []
+        bot = self.players[idx]
+        team_key = self._team_key_for_player(bot)
+
+        if self.team_cards.get(team_key) != "TELEPORT_PLUS3":
+            return parts
+
+        start = int(bot.pos)
+        t = start + 3
+        if t > BOARD_END:
+            return parts
+
+        if prefer_magic:
+            good = self._is_active_magic_for(bot, t) or is_ladder(t) or (t >= BOARD_END - 3)
+            if not good:
+                return parts
+
+        self._mark_magic_tile_used_if_leaving(team_key, start)
+
+        # zużyj karta drużyny
+        self.team_cards[team_key] = None
+        self.stats.card_used(CARD_INDEX["TELEPORT_PLUS3"])
+
+        bot.pos = t
+        msg = f"{bot.name}: używa TELEPORT +3: {start} -> {t}"
+
+        if is_ladder(t):
+            after = SNAKE_LADDERS[t]
+            bot.pos = after
+            self.stats.ladder(t)
+            msg += f" 🪜 Drabina! {t} -> {after}"
+        self._path_push(idx, start, t, int(bot.pos), PATH_TELEPORT)
+
+        if is_snake(t):
+            # BOT: jeśli ma ANTY_WAZ jako karta drużyny -> zostań (ale tu teleport już zużył, więc raczej nie)
+            extra = self._apply_snake_if_no_pending(bot)
+            if extra:
+                msg += extra
+
+        extra2 = self._give_card_if_magic_tile(bot)
+        if extra2:
+            msg += extra2
+
+        parts.append(msg)
+        return parts
+
+    def _ai_move_one_double(self, idx: int, roll: int) -> List[str]:
+        parts: List[str] = []
+        msg, rv, _, _, _, _ = self._move_with_roll(idx, roll)
+        self.last_roll = int(rv)
+        self.last_player = idx
+        self.move_count += 1
+        parts.append(msg)
+
+        bot = self.players[idx]
+        team_key = self._team_key_for_player(bot)
+        pos_after = int(bot.pos)
+
+        if is_snake(pos_after) and self.team_cards.get(team_key) == "ANTY_WAZ":
+            self.team_cards[team_key] = None
+            self.stats.card_used(CARD_INDEX["ANTY_WAZ"])
+            self.stats.snake_avoided(pos_after)
+            parts[-1] += f" 🃏 BOT używa ANTY WĄŻ i zostaje na {pos_after} ✅"
+        else:
+            extra = self._apply_snake_if_no_pending(bot)
+            if extra:
+                parts[-1] += extra
+
+        extra2 = self._give_card_if_magic_tile(bot)
+        if extra2:
+            parts[-1] += extra2
+
+        return parts
+
+    # ===== Multiplayer (bez zmian logiki kart tutaj) =====
+    def mp_roll(self, my_pid: str) -> None:
+        self.touch()
+
+        if self.winner:
+            self.message = "Gra zakończona."
+            return
+
+        if self.pending:
+            self.message = "Najpierw podejmij decyzję na wężu."
+            return
+
+        idx = next((i for i, p in enumerate(self.players) if p.id == my_pid), None)
+        if idx is None:
+            self.message = "Nie jesteś w tym pokoju."
+            return
+
+        if idx != int(self.turn):
+            self.message = "Nie twoja tura."
+            return
+
+        if self.rolls_in_turn >= 3:
+            self.turn = (idx + 1) % len(self.players)
+            self.rolls_in_turn = 0
+            self.message = "Limit 3 rzutów w turze — koniec tury."
+            self.push_history(self.message)
+            return
+
+        msg, roll_value, won, from_pos, land_pos, to_pos = self._raw_move(idx)
+        roll_value = int(roll_value)
+
+        self.last_roll = roll_value
+        self.last_player = idx
+        self.move_count += 1
+
+        self.rolls_in_turn += 1
+
+        if (not won) and self._try_start_snake_pending(self.players[idx], idx):
+            msg += " 🃏 Masz ANTY WĄŻ — wybierz: zostać czy cofnąć się?"
+            self.message = msg
+            self.push_history(msg)
+            self.last_move = None
+            return
+
+        if not won:
+            extra = self._apply_snake_if_no_pending(self.players[idx])
+            if extra:
+                msg += extra
+
+        if not won:
+            extra2 = self._give_card_if_magic_tile(self.players[idx])
+            if extra2:
+                msg += extra2
+
+        if not won:
+            extra3 = self._auto_teleport(idx)
+            if extra3:
+                msg += extra3
+                won = int(self.players[idx].pos) == BOARD_END
+
+        if (not won) and roll_value == 6 and self.rolls_in_turn < 3:
+            msg += " 🎲 Bonus: 6 → dodatkowy rzut!"
+        elif (not won) and roll_value == 6 and self.rolls_in_turn >= 3:
+            msg += " 🎲 Wypadło 6, ale limit 3 rzutów — koniec tury."
+
+        self.message = msg
+        self.push_history(msg)
+
+        self.last_move = {
+            "player": idx,
+            "from": from_pos,
+            "land": land_pos,
+            "to": int(self.players[idx].pos),
+            "move_count": self.move_count,
+            "won": bool(won),
+        }
+
+        if won:
+            self.winner = str(self.players[idx].id)
+            self.rolls_in_turn = 0
+            return
+
+        if not (roll_value == 6 and self.rolls_in_turn < 3):
+            self.turn = (idx + 1) % len(self.players)
+            self.rolls_in_turn = 0
+
+    # ===== Statystyki: koniec gry liczony raz =====
+    def note_finished(self) -> None:
+        if self.stats_done or not (self.winner or self.anyone_won()):
+            return
+        self.stats_done = True
+        if self.mode == "ai":
+            mode = "ai_double" if self.variant == "double" else "ai"
+        else:
+            mode = self.mode
+        if mode in STATS_MODES:
+            self.stats.game_over(STATS_MODES.index(mode), int(self.move_count))
+
+    # ===== Akcje mp z zapisem powtórki =====
+    def mp_act(self, kind: int, player_id: str, choice: str = "stay", arg: int = 0) -> None:
+        # jedyne wejście akcji gracza w mp: generator zasiany z (seed, numer akcji gry),
+        # a akcja, która coś zmieniła, trafia do logu jako jeden bajt
+        idx = next((i for i, p in enumerate(self.players) if p.id == player_id), None)
+        if kind in (ACT_POLICY_SNAKE, ACT_POLICY_TELEPORT):
+            # zmiana polityki nie rusza stanu gry, ale musi trafić do powtórki
+            if kind == ACT_POLICY_SNAKE:
+                arg = max(0, min(len(SNAKE_POLICY_STEPS) - 1, int(arg)))
+                changed = self.set_policy(player_id, "snake_min", SNAKE_POLICY_STEPS[arg])
+            else:
+                arg = 1 if arg else 0
+                changed = self.set_policy(player_id, "auto_teleport", bool(arg))
+            if changed and idx is not None and self.replay_seed is not None:
+                self.actions.append(encode_action(kind, idx, arg))
+            return
+        if self.replay_seed is not None:
+            self.rng = action_rng(self.replay_seed, dice_index(self.actions, self.replay_version))
+        before = (self.move_count, self.turn, self.rolls_in_turn, self.pending, self.winner)
+
+        if kind == ACT_ROLL:
+            self.mp_roll(player_id)
+        elif kind == ACT_SNAKE:
+            self.snake_decision(player_id, choice)
+        elif kind == ACT_CARD:
+            self.use_card()
+        elif kind == ACT_SKIP:
+            self.mp_skip(player_id)
+
+        self.note_finished()
+        if idx is None or self.replay_seed is None:
+            return
+        if before == (self.move_count, self.turn, self.rolls_in_turn, self.pending, self.winner):
+            return
+        arg = 0
+        if kind == ACT_ROLL and self.move_count != before[0]:
+            arg = int(self.last_roll or 0)
+        elif kind == ACT_SNAKE:
+            arg = 1 if choice == "back" else 0
+        self.actions.append(encode_action(kind, idx, arg))
+
+    def mp_skip(self, player_id: str) -> None:
+        # tura oddana bez rzutu (gracz nie odpowiada)
+        self.touch()
+        idx = next((i for i, p in enumerate(self.players) if p.id == player_id), None)
+        if idx is None or idx != int(self.turn) or self.winner or self.pending:
+            return
+        self.turn = (idx + 1) % len(self.players)
+        self.rolls_in_turn = 0
+        self.message = f"⏱ {self.players[idx].name}: brak reakcji — tura pominięta."
+        self.push_history(self.message)
+
+    # ===== Boty w pokojach mp =====
+    def mp_bot_step(self, player_id: str) -> bool:
+        # jedna decyzja bota jak w ai_move: TELEPORT od razu, ANTY WĄŻ zawsze, potem rzut;
+        # wszystko przez mp_act, więc trafia do powtórki jak akcje ludzi
+        idx = next((i for i, p in enumerate(self.players) if p.id == player_id), None)
+        if idx is None or not self.players[idx].is_bot or self.winner:
+            return False
+        before = (self.move_count, self.turn, self.rolls_in_turn, self.pending)
+        pend = self.pending
+        if pend and pend.get("type") == "snake_choice":
+            if pend.get("player_id") != player_id:
+                return False
+            self.mp_act(ACT_SNAKE, player_id, "stay")
+        elif (idx == int(self.turn) and self.team_cards.get(str(player_id)) == "TELEPORT_PLUS3"
+              and int(self.players[idx].pos) + 3 <= BOARD_END):
+            self.mp_act(ACT_CARD, player_id)
+        else:
+            self.mp_act(ACT_ROLL, player_id)
+        return before != (self.move_count, self.turn, self.rolls_in_turn, self.pending)
+
+    def mp_bot_turn(self, limit: int = 8) -> int:
+        # cała tura bota na turze (bonusowe 6, karta, decyzja na wężu) — aż tura przejdzie dalej
+        steps = 0
+        turn = int(self.turn)
+        while steps < limit and not self.winner and len(self.players) >= 2 and int(self.turn) == turn:
+            bot = self.players[self.current_index()]
+            if not bot.is_bot or not self.mp_bot_step(bot.id):
+                break
+            steps += 1
+        return steps
+
+    # ===== Payload =====
+    def to_template_payload(self) -> Dict[str, Any]:
+        self._sync_cards_for_display()
+        return {
+            "players": [p.to_dict() for p in self.players],
+            "turn": self.turn,
+            "last_roll": self.last_roll,
+            "last_player": self.last_player,
+            "message": self.message,
+            "history": self.history,
+            "move_count": self.move_count,
+            "mode": self.mode,
+            "variant": self.variant,
+            "pending": self.pending,
+            "magic_tiles": self.magic.active_list(),
+            "last_move": self.last_move,
+            "move_path": self.move_path,
+            "path_seq": self.path_seq,
+            "winner_text": self.winner_text(),
+        }
+
+    @staticmethod
+    def new_hotseat(n_players: int) -> "Game":
+        g = Game(mode="hotseat", variant="classic")
+        n = max(2, min(4, int(n_players)))
+        colors = ["p-red", "p-blue", "p-green", "p-purple"]
+        g.players = [
+            Player(pid=i, name=f"Gracz {i+1}", pos=0, color=colors[i], is_bot=False, card=None)
+            for i in range(n)
+        ]
+        # karta per gracz
+        for pl in g.players:
+            g.team_cards[str(pl.id)] = None
+        return g
+
+    @staticmethod
+    def new_ai(auto_bots: bool = False) -> "Game":
+        g = Game(mode="ai", variant="classic")
+        g.auto_bots = bool(auto_bots)
+        g.players = [
+            Player(pid=0, name="Ty", pos=0, color="p-red", is_bot=False, card=None),
+            Player(pid=1, name="Komputer", pos=0, color="p-blue", is_bot=True, card=None),
+        ]
+        g.team_cards["h"] = None
+        g.team_cards["a"] = None
+        return g
+
+    @staticmethod
+    def new_ai_double(auto_bots: bool = False) -> "Game":
+        g = Game(mode="ai", variant="double")
+        g.auto_bots = bool(auto_bots)
+        g.players = [
+            Player(pid="h1", name="Ty (1)", pos=0, color="p-red", is_bot=False, card=None),
+            Player(pid="h2", name="Ty (2)", pos=0, color="p-red", is_bot=False, card=None),
+            Player(pid="a_lad", name="AI (ladder)", pos=0, color="p-blue", is_bot=True, card=None),
+            Player(pid="a_crd", name="AI (cards)", pos=0, color="p-blue", is_bot=True, card=None),
+        ]
+        g.turn = 0
+        g.team_cards["h"] = None
+        g.team_cards["a"] = None
+        return g
+
+    @staticmethod
+    def from_room_dict(room: Dict[str, Any]) -> "Game":
+        g = Game(mode="mp", variant="classic")
+        g.players = [Player.from_dict(p) for p in room.get("players", [])]
+        g.turn = int(room.get("turn", 0))
+        g.last_roll = room.get("last_roll")
+        g.last_player = int(room.get("last_player", 0))
+        g.message = room.get("message", "")
+        g.history = (room.get("history", []) or [])[-8:]
+        g.move_count = int(room.get("move_count", 0))
+        g.pending = room.get("pending")
+        g.last_move = room.get("last_move")
+        g.magic = MagicTiles.from_any(room.get("magic_tiles"))
+        g.max_players = int(room.get("max_players", 2))
+        g.winner = room.get("winner")
+        g.rolls_in_turn = int(room.get("rolls_in_turn", 0))
+        g.move_path = room.get("move_path") or []
+        g.path_seq = int(room.get("path_seq", 0))
+        g.stats_done = bool(room.get("stats_done", False))
+        g.policies = dict(room.get("policies") or {})
+        rep = room.get("replay")
+        if rep:
+            g.replay_seed = int(rep.get("seed", 0))
+            g.replay_version = int(rep.get("v", 1))
+            g.actions = unpack_actions(rep.get("actions"))
+
+        # mp: jeśli chcesz też 1 karta na gracza w mp, trzeba trzymać to w pliku
+        # (na razie trzymamy "jak było": per pionek display)
+        for pl in g.players:
+            g.team_cards[str(pl.id)] = pl.card
+
+        return g
+
+    def to_room_dict(self, base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        room = dict(base) if base else {}
+        self._sync_cards_for_display()
+        room["players"] = [p.to_dict() for p in self.players]
+        room["turn"] = int(self.turn)
+        room["last_roll"] = self.last_roll
+        room["last_player"] = int(self.last_player)
+        room["message"] = self.message
+        room["history"] = self.history[-8:]
+        room["move_count"] = int(self.move_count)
+        room["pending"] = self.pending
+        room["last_move"] = self.last_move
+        room["magic_tiles"] = self.magic.to_json_dict()
+        room["max_players"] = int(self.max_players)
+        room["winner"] = self.winner
+        room["rolls_in_turn"] = int(self.rolls_in_turn)
+        room["move_path"] = self.move_path
+        room["path_seq"] = int(self.path_seq)
+        room["stats_done"] = bool(self.stats_done)
+        room["policies"] = self.policies
+        if self.replay_seed is not None and room.get("replay"):
+            room["replay"] = dict(room["replay"], actions=pack_actions(self.actions))
+        return room
+
+    # ===== Session (hotseat / ai) — pełny stan do współdzielonego store =====
+    def to_session_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "variant": self.variant,
+            "players": [p.to_dict() for p in self.players],
+            "turn": int(self.turn),
+            "last_roll": self.last_roll,
+            "last_player": int(self.last_player),
+            "message": self.message,
+            "history": self.history[-8:],
+            "move_count": int(self.move_count),
+            "pending": self.pending,
+            "last_move": self.last_move,
+            "magic_tiles": self.magic.to_json_dict(),
+            "team_cards": dict(self.team_cards),
+            "max_players": int(self.max_players),
+            "winner": self.winner,
+            "rolls_in_turn": int(self.rolls_in_turn),
+            "move_path": self.move_path,
+            "path_seq": int(self.path_seq),
+            "auto_bots": bool(self.auto_bots),
+            "stats_done": bool(self.stats_done),
+            "policies": self.policies,
+            "updated_at": self.updated_at,
+        }
+
+    @staticmethod
+    def from_session_dict(d: Dict[str, Any]) -> "Game":
+        g = Game(mode=d.get("mode", "hotseat"), variant=d.get("variant", "classic"))
+        g.players = [Player.from_dict(p) for p in d.get("players", [])]
+        g.turn = int(d.get("turn", 0))
+        g.last_roll = d.get("last_roll")
+        g.last_player = int(d.get("last_player", 0))
+        g.message = d.get("message", "")
+        g.history = (d.get("history", []) or [])[-8:]
+        g.move_count = int(d.get("move_count", 0))
+        g.pending = d.get("pending")
+        g.last_move = d.get("last_move")
+        g.magic = MagicTiles.from_any(d.get("magic_tiles"))
+        g.team_cards = dict(d.get("team_cards") or {})
+        g.max_players = int(d.get("max_players", 2))
+        g.winner = d.get("winner")
+        g.rolls_in_turn = int(d.get("rolls_in_turn", 0))
+        g.move_path = d.get("move_path") or []
+        g.path_seq = int(d.get("path_seq", 0))
+        g.auto_bots = bool(d.get("auto_bots", False))
+        g.stats_done = bool(d.get("stats_done", False))
+        g.policies = dict(d.get("policies") or {})
+        g.updated_at = float(d.get("updated_at", g.updated_at))
+        return g
+
+
+# ===== powtórki: odtworzenie gry z ziarna i logu akcji =====
+def replay_frames(code: str, room: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rep = room.get("replay") or {}
+    actions = decoded(room)
+    roster = room.get("players", [])
+    yield {
+        "code": code,
+        "board": rep.get("board"),
+        "board_ok": rep.get("board") == BOARD_ID,
+        "seed": rep.get("seed"),
+        "max_players": int(room.get("max_players", 2)),
+        "players": [{"id": p.get("id"), "name": p.get("name"), "color": p.get("color")} for p in roster],
+        "actions": len(actions),
+    }
+    if rep.get("board") != BOARD_ID:
+        return
+
+    g = Game(mode="mp", variant="classic")
+    g.stats = NullStats()  # powtórka nie dolicza się do statystyk
+    g.max_players = int(room.get("max_players", 2))
+    g.magic = MagicTiles(MAGIC_TILES_TEMPLATE.copy())
+    g.replay_seed = int(rep.get("seed", 0))
+    g.replay_version = int(rep.get("v", 1))
+    ok = True
+    for i, (kind, idx, arg) in enumerate(actions):
+        seq = g.path_seq
+        if kind == ACT_JOIN:
+            src = roster[idx] if idx < len(roster) else {"id": f"p{idx + 1}", "name": f"Gracz {idx + 1}"}
+            g.players.append(Player(pid=src.get("id"), name=src.get("name") or f"Gracz {idx + 1}", pos=0,
+                                    color=src.get("color") or "p-red", card=None, is_bot=bool(src.get("is_bot"))))
+            g.team_cards[str(src.get("id"))] = None
+            g.actions.append(encode_action(kind, idx, arg))
+        elif idx < len(g.players):
+            g.mp_act(kind, g.players[idx].id, "back" if arg else "stay", arg)
+            if kind == ACT_ROLL and arg and g.last_roll != arg:
+                ok = False
+        else:
+            ok = False
+        yield {
+            "i": i,
+            "a": ACT_NAMES.get(kind, "?"),
+            "p": idx,
+            "d": arg,
+            "pos": [int(p.pos) for p in g.players],
+            "path": [s for s in g.move_path if s[0] > seq],
+            "turn": int(g.turn),
+            "msg": g.message,
+        }
+    ok = ok and [int(p.pos) for p in g.players] == [int(p.get("pos", 0)) for p in roster]
+    yield {"end": True, "winner": g.winner, "ok": ok}
@@ -0,0 +1,438 @@
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from engine import BOARD_ID, POLICY_DEFAULTS, SNAKE_POLICY_STEPS, Game
+from replay import (
+    ACT_CARD, ACT_JOIN, ACT_POLICY_SNAKE, ACT_POLICY_TELEPORT, ACT_ROLL, ACT_SKIP, ACT_SNAKE, encode_action, new_replay,
+)
+from simulate import MODES, is_finished, new_game
+from stats import NullStats
+
+# Różnicowy fuzzer silnika: te same losowe sekwencje akcji idą przez Game
+# (wzorzec) i przez silnik-kandydata, po każdej akcji porównujemy stan
+# (pozycje, tura, pending, pola magiczne, karty drużyn, zwycięzca, licznik rzutów
+# w turze, ścieżka ruchu, zdarzenia statystyk, log powtórki). Pierwsza różnica
+# jest minimalizowana (ddmin) do krótkiej sekwencji, którą da się odtworzyć --repro.
+# Wyjątek we wzorcu to osobny rodzaj znaleziska ("crash") — zgłaszany nawet
+# wtedy, gdy kandydat rzuca tym samym; różnice stanu to "divergence".
+#
+# Każda akcja niesie własne ziarno kości, więc usunięcie akcji z sekwencji nie
+# przesuwa losowania pozostałych. Wyjątek: gry mp idą jak w aplikacji, z ziarnem
+# powtórki (z ziarna przypadku) i JOIN-ami w logu, więc kości losuje
+# action_rng(ziarno, numer akcji gry) — tak, jak gra je naprawdę dostaje. Akcje są losowane z podglądem stanu wzorca
+# (decyzja na wężu, gdy jest pending, ruch bota w jego turze), ale część to
+# celowo akcje "nie w porę" — strażniki też są semantyką.
+#
+# Kandydat: "roundtrip" (Game z zapisem i odczytem stanu przez JSON sesji/pokoju
+# przed każdą akcją — tak jak aplikacja między żądaniami), "policynoise" (w mp
+# przed każdym rzutem gracz przełącza politykę tam i z powrotem — kości i stan
+# mają zostać te same) albo "moduł:nazwa" z obiektem o metodach
+# new/apply/observe i atrybucie fields (jak GameEngine).
+#
+#   python fuzz_engine.py --candidate roundtrip --cases 20000 --length 200
+#   python fuzz_engine.py --candidate fast_engine:Engine --modes mp --out repro.json
+#   python fuzz_engine.py --candidate fast_engine:Engine --repro repro.json
+
+Action = Tuple[Any, ...]  # (rodzaj, ziarno kości, *argumenty)
+
+FIELDS = ("pos", "turn", "pending", "magic", "team_cards", "winner", "rolls_in_turn", "move_count",
+          "last_roll", "last_player", "path", "path_seq", "policies", "events", "actions", "message")
+DEFAULT_FIELDS = tuple(f for f in FIELDS if f != "message")  # teksty nie są semantyką
+
+AFTER_FINISH = 3  # kilka akcji po końcu gry: strażniki "Gra zakończona"
+
+
+class _Recorder(NullStats):
+    # zdarzenia statystyk z jednej akcji, w kolejności
+    def __init__(self):
+        self.events: List[Tuple[Any, ...]] = []
+
+    def rolled(self, die: int, land: int) -> None:
+        self.events.append(("rolled", die, land))
+
+    def overshot(self, die: int) -> None:
+        self.events.append(("overshot", die))
+
+    def ladder(self, tile: int) -> None:
+        self.events.append(("ladder", tile))
+
+    def snake(self, tile: int) -> None:
+        self.events.append(("snake", tile))
+
+    def snake_avoided(self, tile: int) -> None:
+        self.events.append(("snake_avoided", tile))
+
+    def card_gained(self, tile: int, card: int) -> None:
+        self.events.append(("card_gained", tile, card))
+
+    def card_used(self, card: int) -> None:
+        self.events.append(("card_used", card))
+
+    def game_over(self, mode: int, moves: int) -> None:
+        self.events.append(("game_over", mode, moves))
+
+
+def _plain(value: Any) -> Any:
+    # krotki -> listy, klucze -> str: stan porównywalny niezależnie od reprezentacji
+    # (tak jak po JSON-ie, ale bez kodowania — to gorąca ścieżka fuzzera)
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+# ===== Silniki =====
+class GameEngine:
+    # wzorzec: obecny Game, akcje tak jak wołają je trasy aplikacji
+    name = "game"
+    fields: Tuple[str, ...] = FIELDS
+
+    def new(self, mode: str, players: int, auto_bots: bool, seed: int = 0) -> Game:
+        g = new_game(mode, players)
+        g.auto_bots = auto_bots
+        if mode == "mp":
+            # jak mp_create + mp_join: ziarno powtórki i JOIN każdego gracza w logu
+            rep = new_replay(seed, BOARD_ID)
+            g.replay_seed = rep["seed"]
+            g.replay_version = rep["v"]
+            g.actions = bytearray(encode_action(ACT_JOIN, i) for i in range(len(g.players)))
+        return g
+
+    def apply(self, g: Game, action: Action) -> Game:
+        kind, seed = action[0], action[1]
+        g.rng = random.Random(seed)
+        g.stats = _Recorder()
+        pid = lambda i: g.players[i].id if i < len(g.players) else "nikt"  # noqa: E731
+        if g.mode == "mp":
+            if kind == "roll":
+                g.mp_act(ACT_ROLL, pid(action[2]))
+            elif kind == "snake":
+                g.mp_act(ACT_SNAKE, pid(action[2]), action[3])
+            elif kind == "card":
+                g.mp_act(ACT_CARD, pid(action[2]))
+            elif kind == "skip":
+                g.mp_act(ACT_SKIP, pid(action[2]))
+            elif kind == "policy":
+                act = ACT_POLICY_SNAKE if action[3] == "snake_min" else ACT_POLICY_TELEPORT
+                g.mp_act(act, pid(action[2]), arg=action[4])
+            return g
+        if kind == "roll":
+            g.roll()
+        elif kind == "dice":
+            g.apply_dice_choice_human(action[2])
+        elif kind == "snake":
+            g.snake_decision(pid(action[2]), action[3])
+        elif kind == "card":
+            g.use_card(pawn_idx=action[2])
+        elif kind == "ai":
+            g.ai_move()
+        elif kind == "pair":
+            g.ai_pair_move()
+        elif kind == "bots":
+            g.run_bot_turns()
+        elif kind == "policy":
+            value = SNAKE_POLICY_STEPS[action[4]] if action[3] == "snake_min" else bool(action[4])
+            g.set_policy(pid(action[2]), action[3], value)
+        return g
+
+    def observe(self, g: Game) -> Dict[str, Any]:
+        return {
+            "pos": [int(p.pos) for p in g.players],
+            "turn": int(g.turn),
+            "pending": _plain(g.pending),
+            "magic": {str(k): v for k, v in sorted(g.magic.tiles.items())},
+            "team_cards": dict(g.team_cards),
+            "winner": g.winner if g.mode == "mp" else (g.winner_text() or g.anyone_won()),
+            "rolls_in_turn": int(g.rolls_in_turn),
+            "move_count": int(g.move_count),
+            "last_roll": g.last_roll,
+            "last_player": int(g.last_player),
+            "path": [list(seg) for seg in g.move_path],
+            "path_seq": int(g.path_seq),
+            # wpis równy domyślnym to to samo co brak wpisu
+            "policies": _plain({k: v for k, v in g.policies.items() if v != POLICY_DEFAULTS}),
+            "events": [list(e) for e in getattr(g.stats, "events", ())],
+            "actions": list(g.actions),
+            "message": g.message,
+        }
+
+
+class RoundTripEngine(GameEngine):
+    # Game, który przed każdą akcją przechodzi przez JSON (jak między żądaniami):
+    # wyłapuje stan, który żyje tylko w pamięci albo gubi się przy zapisie
+    name = "roundtrip"
+
+    def apply(self, g: Game, action: Action) -> Game:
+        if g.mode == "mp":
+            base = {"replay": new_replay(g.replay_seed, BOARD_ID)} if g.replay_seed is not None else None
+            g = Game.from_room_dict(json.loads(json.dumps(g.to_room_dict(base))))
+        else:
+            g = Game.from_session_dict(json.loads(json.dumps(g.to_session_dict())))
+        return super().apply(g, action)
+
+
+class PolicyNoiseEngine(GameEngine):
+    # przełączanie polityki nie może zmieniać kolejnych rzutów (inaczej gracz
+    # przełącza, aż trafi dobrą kość); log powtórki ma więcej bajtów, więc bez "actions"
+    name = "policynoise"
+    fields = tuple(f for f in FIELDS if f != "actions")
+
+    def apply(self, g: Game, action: Action) -> Game:
+        if g.mode == "mp" and action[0] == "roll" and action[2] < len(g.players):
+            pid = g.players[action[2]].id
+            on = bool(g.policy_for(g.players[action[2]]).get("auto_teleport"))
+            g.stats = NullStats()
+            g.mp_act(ACT_POLICY_TELEPORT, pid, arg=int(not on))
+            g.mp_act(ACT_POLICY_TELEPORT, pid, arg=int(on))
+        return super().apply(g, action)
+
+
+BUILTIN = {"game": GameEngine, "roundtrip": RoundTripEngine, "policynoise": PolicyNoiseEngine}
+
+
+def load_engine(spec: str) -> Any:
+    if spec in BUILTIN:
+        return BUILTIN[spec]()
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"kandydat: nazwa wbudowana ({', '.join(BUILTIN)}) albo moduł:nazwa, nie {spec!r}")
+    obj = getattr(importlib.import_module(module), attr)
+    return obj if hasattr(obj, "apply") and not isinstance(obj, type) else obj()
+
+
+# ===== Losowanie akcji =====
+def next_action(rng: random.Random, g: Game) -> Action:
+    seed = rng.getrandbits(32)
+    n = len(g.players)
+    who = rng.randrange(n + 1) if rng.random() < 0.05 else None  # czasem obcy gracz (indeks n)
+    pend = g.pending or {}
+    turn = g.current_index()
+
+    if pend.get("type") == "snake_choice" and rng.random() < 0.85:
+        idx = next((i for i, p in enumerate(g.players) if p.id == pend.get("player_id")), 0)
+        return ("snake", seed, idx if who is None else who, rng.choice(("stay", "back")))
+    if pend.get("type") == "dice_choice" and rng.random() < 0.85:
+        return ("dice", seed, rng.random() < 0.5)
+    if g.mode == "ai" and g.players[turn].is_bot and rng.random() < 0.85:
+        if rng.random() < 0.2:
+            return ("bots", seed)
+        return ("pair", seed) if g.variant == "double" else ("ai", seed)
+
+    r = rng.random()
+    if r < 0.15:
+        pawn = rng.choice((0, 1)) if g.variant == "double" else turn
+        return ("card", seed, pawn if g.mode != "mp" else (turn if who is None else who))
+    if r < 0.22:
+        name = rng.choice(("snake_min", "auto_teleport"))
+        value = rng.randrange(len(SNAKE_POLICY_STEPS)) if name == "snake_min" else rng.randrange(2)
+        return ("policy", seed, rng.randrange(n) if who is None else who, name, value)
+    if r < 0.25 and g.mode == "mp":
+        return ("skip", seed, turn if who is None else who)
+    if r < 0.28:
+        # akcja nie w porę: decyzja bez pending, ruch bota w turze człowieka itd.
+        return rng.choice((("snake", seed, rng.randrange(n), "back"), ("dice", seed, True),
+                           ("ai", seed), ("pair", seed), ("roll", seed, rng.randrange(n + 1))))
+    return ("roll", seed, turn if who is None else who)
+
+
+# ===== Przebieg =====
+def case_config(case_seed: int, modes: Sequence[str]) -> Dict[str, Any]:
+    rng = random.Random(case_seed)
+    mode = rng.choice(list(modes))
+    return {
+        "seed": case_seed,
+        "mode": mode,
+        "players": rng.randint(2, 4) if mode in ("hotseat", "mp") else 2,
+        "auto_bots": mode in ("ai", "ai_double") and rng.random() < 0.5,
+    }
+
+
+def _step(engine: Any, state: Any, action: Action) -> Tuple[Any, Dict[str, Any]]:
+    try:
+        state = engine.apply(state, action)
+        return state, engine.observe(state)
+    except Exception as e:  # wyjątek to też wynik (we wzorcu — znalezisko "crash")
+        return None, {"error": type(e).__name__, "detail": str(e)}
+
+
+def _differs(a: Dict[str, Any], b: Dict[str, Any], fields: Sequence[str]) -> List[str]:
+    if "error" in a or "error" in b:
+        return [] if a.get("error") == b.get("error") else ["error"]
+    return [f for f in fields if a.get(f) != b.get(f)]
+
+
+def _finding(obs_a: Dict[str, Any], obs_b: Dict[str, Any], fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+    if "error" in obs_a:
+        return {"kind": "crash", "fields": ["error"],
+                "reference": {f: obs_a[f] for f in ("error", "detail")},
+                "candidate": {f: obs_b[f] for f in ("error", "detail") if f in obs_b}}
+    diff = _differs(obs_a, obs_b, fields)
+    if not diff:
+        return None
+    return {"kind": "divergence", "fields": diff,
+            "reference": {f: obs_a.get(f) for f in diff + ["detail"] if f in obs_a},
+            "candidate": {f: obs_b.get(f) for f in diff + ["detail"] if f in obs_b}}
+
+
+def execute(ref: Any, cand: Any, config: Dict[str, Any], actions: Sequence[Action],
+            fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+    # zadana sekwencja przez oba silniki; pierwszy wyjątek wzorca / pierwsza różnica albo None
+    a = ref.new(config["mode"], config["players"], config["auto_bots"], config["seed"])
+    b = cand.new(config["mode"], config["players"], config["auto_bots"], config["seed"])
+    for i, action in enumerate(actions):
+        a, obs_a = _step(ref, a, action)
+        b, obs_b = _step(cand, b, action)
+        found = _finding(obs_a, obs_b, fields)
+        if found:
+            return dict(found, index=i)
+    return None
+
+
+def fuzz_case(ref: GameEngine, cand: Any, config: Dict[str, Any], length: int,
+              fields: Sequence[str]) -> Tuple[int, Optional[Dict[str, Any]]]:
+    # losowanie z podglądem wzorca i porównanie w jednym przejściu
+    rng = random.Random(config["seed"] ^ 0x5EED)
+    a = ref.new(config["mode"], config["players"], config["auto_bots"], config["seed"])
+    b = cand.new(config["mode"], config["players"], config["auto_bots"], config["seed"])
+    actions: List[Action] = []
+    after = 0
+    while len(actions) < length and after <= AFTER_FINISH:
+        action = next_action(rng, a)
+        actions.append(action)
+        a, obs_a = _step(ref, a, action)
+        b, obs_b = _step(cand, b, action)
+        found = _finding(obs_a, obs_b, fields)
+        if found:
+            return len(actions), {"config": config, "actions": actions, "index": len(actions) - 1,
+                                  "kind": found["kind"], "fields": found["fields"]}
+        if is_finished(a):
+            after += 1
+    return len(actions), None
+
+
+def minimize(test: Callable[[List[Action]], bool], actions: List[Action]) -> List[Action]:
+    # ddmin (Zeller): najkrótsza znaleziona podsekwencja, dla której test dalej pada
+    n = 2
+    while len(actions) >= 2:
+        size = len(actions) // n
+        chunks = [actions[i:i + size] for i in range(0, len(actions), size)]
+        reduced = False
+        for i in range(len(chunks)):
+            rest = [a for j, c in enumerate(chunks) if j != i for a in c]
+            if test(chunks[i]):
+                actions, n, reduced = chunks[i], 2, True
+                break
+            if test(rest):
+                actions, n, reduced = rest, max(n - 1, 2), True
+                break
+        if not reduced:
+            if n >= len(actions):
+                break
+            n = min(len(actions), n * 2)
+    return actions
+
+
+def report(ref: Any, cand: Any, failure: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    config, kind = failure["config"], failure["kind"]
+    actions = failure["actions"][:failure["index"] + 1]
+
+    def fails(acts: List[Action]) -> bool:
+        found = execute(ref, cand, config, acts, fields)
+        return found is not None and found["kind"] == kind
+
+    small = minimize(fails, actions)
+    return {
+        "kind": kind,
+        "candidate": getattr(cand, "name", type(cand).__name__),
+        "config": config,
+        "found_at": failure["index"],
+        "actions": [list(a) for a in small],
+        "divergence": execute(ref, cand, config, small, fields),
+    }
+
+
+def _run_chunk(args: Tuple[str, int, int, int, Tuple[str, ...], Tuple[str, ...]]
+               ) -> Tuple[int, int, Optional[Dict[str, Any]]]:
+    spec, start, count, length, modes, fields = args
+    ref, cand = GameEngine(), load_engine(spec)
+    done = steps = 0
+    for case_seed in range(start, start + count):
+        n, failure = fuzz_case(ref, cand, case_config(case_seed, modes), length, fields)
+        done += 1
+        steps += n
+        if failure:
+            return done, steps, report(ref, cand, failure, fields)
+    return done, steps, None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Różnicowy fuzzer: Game kontra silnik-kandydat")
+    ap.add_argument("--candidate", default="roundtrip", help="roundtrip | policynoise | game | moduł:nazwa")
+    ap.add_argument("--cases", type=int, default=10_000)
+    ap.add_argument("--length", type=int, default=300, help="najwięcej akcji w jednej grze")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    ap.add_argument("--fields", nargs="+", choices=FIELDS, default=None,
+                    help=f"porównywane pola (domyślnie: {' '.join(DEFAULT_FIELDS)})")
+    ap.add_argument("--workers", type=int, default=None, help="procesy (domyślnie liczba CPU, 1 = bez puli)")
+    ap.add_argument("--chunk", type=int, default=500, help="gier na zadanie dla procesu")
+    ap.add_argument("--out", default=None, help="plik JSON z minimalnym reproduktorem")
+    ap.add_argument("--repro", default=None, help="odtwórz reproduktor z pliku zamiast losować")
+    args = ap.parse_args()
+
+    cand = load_engine(args.candidate)
+    fields = tuple(f for f in (args.fields or DEFAULT_FIELDS) if f in getattr(cand, "fields", FIELDS))
+    log = lambda line: sys.stderr.write(line + "\n")  # noqa: E731
+    log(f"kandydat={args.candidate} pola={' '.join(fields)}")
+
+    if args.repro:
+        with open(args.repro, encoding="utf-8") as f:
+            rep = json.load(f)
+        diff = execute(GameEngine(), cand, rep["config"], [tuple(a) for a in rep["actions"]], fields)
+        sys.stdout.write(json.dumps(diff, ensure_ascii=False, indent=2) + "\n")
+        sys.exit(1 if diff else 0)
+
+    workers = args.workers if args.workers is not None else (os.cpu_count() or 1)
+    tasks = [(args.candidate, args.seed * 1_000_003 + s, min(args.chunk, args.cases - s), args.length,
+              tuple(args.modes), fields) for s in range(0, args.cases, args.chunk)]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    t0 = time.perf_counter()
+    games = steps = 0
+    failure: Optional[Dict[str, Any]] = None
+    try:
+        results = pool.map(_run_chunk, tasks) if pool else map(_run_chunk, tasks)
+        for done, n, fail in results:
+            games += done
+            steps += n
+            if fail and failure is None:
+                failure = fail
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    dt = time.perf_counter() - t0
+    log(f"gier={games} akcji={steps} czas={dt:.1f}s ({steps / dt:.0f} akcji/s)")
+
+    if failure is None:
+        log("zgodne")
+        return
+    log("wyjątek we wzorcu (Game)" if failure["kind"] == "crash" else "rozbieżność z kandydatem")
+    text = json.dumps(failure, ensure_ascii=False, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.stdout.write(text + "\n")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import threading
+import time
+from typing import Dict, Optional, Set
+
+# Obecność graczy w pokojach: ostatni sygnał (poll /state albo kanał push)
+# per (pokój, gracz). Tylko pamięć procesu — przy kilku workerach pokój
+# powinien trafiać do jednego (sticky), inaczej obecność się rozjedzie.
+
+
+class RoomPresence:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._seen: Dict[str, Dict[str, float]] = {}
+
+    def seen(self, code: str, pid: Optional[str], now: Optional[float] = None) -> None:
+        if not pid:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._seen.setdefault(code, {})[pid] = now
+
+    def present(self, code: str, timeout: float, now: Optional[float] = None) -> Set[str]:
+        now = time.time() if now is None else now
+        with self._lock:
+            room = self._seen.get(code) or {}
+            return {pid for pid, t in room.items() if now - t <= timeout}
+
+    def last_seen(self, code: str) -> float:
+        with self._lock:
+            room = self._seen.get(code) or {}
+            return max(room.values(), default=0.0)
+
+    def forget(self, code: str) -> None:
+        with self._lock:
+            self._seen.pop(code, None)
+
+    def __len__(self) -> int:
+        return len(self._seen)
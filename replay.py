@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import json
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Zapis powtórki: ziarno + identyfikator planszy + 1 bajt na akcję.
+# Stan nie jest zapisywany — odtwarzamy go, puszczając silnik jeszcze raz,
+# bo przed każdą akcją generator jest zasiewany z (seed, numer akcji).
+# Od wersji 2 numer akcji liczy tylko akcje gry (bez zmian polityki): inaczej
+# gracz mógłby przełączać politykę tam i z powrotem, aż trafi mu się dobry rzut.
+#
+# bajt akcji: rodzaj (3 bity) | gracz (2 bity) | argument (3 bity)
+#   JOIN  — gracz dołącza (kolejność = indeks w room["players"])
+#   ROLL  — rzut; argument = wyrzucone oczko (0 = koniec tury bez rzutu)
+#   SNAKE — decyzja na wężu; argument 0 = zostań (ANTY WĄŻ), 1 = cofnij
+#   CARD  — użycie karty (TELEPORT +3)
+#   SKIP  — tura pominięta po przekroczeniu czasu (gracz nieobecny)
+#   POLICY_SNAKE    — stała decyzja na wężach; argument = indeks w SNAKE_POLICY_STEPS silnika
+#   POLICY_TELEPORT — auto-TELEPORT na drabinę; argument 0/1
+REPLAY_VERSION = 2
+ACT_JOIN = 0
+ACT_ROLL = 1
+ACT_SNAKE = 2
+ACT_CARD = 3
+ACT_SKIP = 4
+ACT_POLICY_SNAKE = 5
+ACT_POLICY_TELEPORT = 6
+POLICY_ACTIONS = (ACT_POLICY_SNAKE, ACT_POLICY_TELEPORT)
+ACT_NAMES = {
+    ACT_JOIN: "join", ACT_ROLL: "roll", ACT_SNAKE: "snake", ACT_CARD: "card", ACT_SKIP: "skip",
+    ACT_POLICY_SNAKE: "policy_snake", ACT_POLICY_TELEPORT: "policy_teleport",
+}
+
+# krok między ziarnami kolejnych akcji; duży i nieparzysty, żeby gry nie dzieliły strumieni
+SEED_STRIDE = 1_000_003
+
+
+def board_id(snake_ladders: Dict[int, int], magic_tiles: Iterable[int], card_pool: Iterable[str]) -> str:
+    # powtórka jest ważna tylko na tej samej planszy (węże/drabiny, pola magiczne, karty)
+    spec = {
+        "sl": sorted((int(a), int(b)) for a, b in snake_ladders.items()),
+        "magic": sorted(int(t) for t in magic_tiles),
+        "cards": list(card_pool),
+    }
+    raw = json.dumps(spec, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:8]
+
+
+def action_rng(seed: int, n_actions: int) -> random.Random:
+    return random.Random(int(seed) * SEED_STRIDE + int(n_actions))
+
+
+def dice_index(actions: Sequence[int], version: int = REPLAY_VERSION) -> int:
+    # numer akcji do zasiania generatora; v1 liczyła też zmiany polityki
+    if version < 2:
+        return len(actions)
+    return sum(1 for b in actions if (b >> 5) & 0x7 not in POLICY_ACTIONS)
+
+
+def encode_action(kind: int, player: int, arg: int = 0) -> int:
+    return ((kind & 0x7) << 5) | ((player & 0x3) << 3) | (arg & 0x7)
+
+
+def decode_action(b: int) -> Tuple[int, int, int]:
+    return (b >> 5) & 0x7, (b >> 3) & 0x3, b & 0x7
+
+
+def pack_actions(actions: Iterable[int]) -> str:
+    return base64.b64encode(bytes(actions)).decode("ascii")
+
+
+def unpack_actions(text: Optional[str]) -> bytearray:
+    return bytearray(base64.b64decode(text)) if text else bytearray()
+
+
+def new_replay(seed: int, board: str) -> Dict[str, Any]:
+    return {"v": REPLAY_VERSION, "seed": int(seed), "board": board, "actions": ""}
+
+
+def append_action(room: Dict[str, Any], kind: int, player: int, arg: int = 0) -> None:
+    # dla akcji poza silnikiem (dołączenie do pokoju)
+    rep = room.get("replay")
+    if not rep:
+        return
+    actions = unpack_actions(rep.get("actions"))
+    actions.append(encode_action(kind, player, arg))
+    rep["actions"] = pack_actions(actions)
+
+
+def decoded(room: Dict[str, Any]) -> List[Tuple[int, int, int]]:
+    rep = room.get("replay") or {}
+    return [decode_action(b) for b in unpack_actions(rep.get("actions"))]
+
+
+def ndjson(frames: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    for frame in frames:
+        yield (json.dumps(frame, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
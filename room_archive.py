@@ -0,0 +1,197 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: jeden proces archiwizuje
+    fcntl = None  # type: ignore[assignment]
+
+# Archiwum zakończonych pokoi: segmenty tylko do dopisywania (seg-000001.bin, ...)
+# z rekordami zlib(JSON pokoju) i mały indeks tekstowy, jedna linia na grę:
+#   kod segment offset długość ruchy gracze bajty_json utworzony
+# Identyfikator gry w archiwum to numer linii indeksu (od 1) — indeks jest tylko
+# dopisywany, więc numer jest ten sam we wszystkich workerach. Kody pokoi wracają
+# do puli, więc jeden kod może mieć w archiwum kilka gier; po kodzie dostajemy
+# najnowszą, po identyfikatorze — dokładnie tę. Tę samą grę (kod + czas
+# utworzenia) zapisujemy raz, nawet gdy dwa workery wygaszają ją naraz.
+# Linie bez pola `utworzony` (starszy format) mają je równe 0.
+# Indeks siedzi w pamięci; inne workery doczytują jego koniec, gdy urośnie.
+# Dopisywanie idzie pod flock (kilka workerów może archiwizować naraz),
+# kolejność: rekord -> fsync segmentu -> linia indeksu -> fsync indeksu,
+# dopiero potem wołający usuwa plik pokoju. Awaria w środku zostawia najwyżej
+# nieindeksowany rekord w segmencie, a pokój zostaje w gorącym magazynie.
+#
+# rekord: "RA" | kod (4 B ascii) | długość u32 | zlib(json)
+
+RECORD_HEADER = struct.Struct("<2s4sI")
+RECORD_MAGIC = b"RA"
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+IndexEntry = Tuple[int, int, int, int, int, int, int]  # segment, offset, długość, ruchy, gracze, bajty json, utworzony
+
+
+class RoomArchive:
+    def __init__(self, directory: Path, segment_bytes: int = SEGMENT_BYTES, level: int = 6):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[str, IndexEntry]] = []   # [id - 1] -> (kod, wpis)
+        self._latest: Dict[str, int] = {}                  # kod -> id najnowszej gry
+        self._games: Dict[Tuple[str, int], int] = {}       # (kod, utworzony) -> id
+        self._index_pos = 0
+        self._segment = 1
+        self.appended = 0
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / "index.txt"
+
+    def segment_path(self, seg: int) -> Path:
+        return self.directory / f"seg-{seg:06d}.bin"
+
+    # ----- indeks -----
+    def _refresh(self) -> None:
+        # doczytanie linii dopisanych od ostatniego razu (też przez inne procesy)
+        try:
+            size = self.index_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size <= self._index_pos:
+            return
+        with self.index_path.open("rb") as f:
+            f.seek(self._index_pos)
+            chunk = f.read(size - self._index_pos)
+        end = chunk.rfind(b"\n") + 1  # niedokończona linia (zapis w toku) poczeka do następnego razu
+        for line in chunk[:end].decode("ascii").splitlines():
+            parts = line.split()
+            if len(parts) == 7:
+                parts.append("0")
+            if len(parts) != 8:
+                continue
+            code, nums = parts[0], tuple(int(x) for x in parts[1:])
+            self._entries.append((code, nums))  # type: ignore[arg-type]
+            aid = len(self._entries)
+            self._latest[code] = aid
+            self._games[(code, nums[6])] = aid
+            self._segment = max(self._segment, nums[0])
+        self._index_pos += end
+
+    def __contains__(self, code: str) -> bool:
+        with self._lock:
+            if code not in self._latest:
+                self._refresh()
+            return code in self._latest
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    # ----- zapis -----
+    def append(self, code: str, room: Dict[str, Any]) -> int:
+        # id gry w archiwum (także gdy już była — inny worker zdążył pierwszy)
+        created = int(room.get("created", 0))
+        raw = json.dumps(room, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blob = zlib.compress(raw, self.level)
+        header = RECORD_HEADER.pack(RECORD_MAGIC, code.encode("ascii"), len(blob))
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            lock_fd = os.open(self.directory / "lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                self._refresh()
+                aid = self._games.get((code, created))
+                if aid is not None:
+                    return aid
+                seg = self._segment
+                seg_path = self.segment_path(seg)
+                if seg_path.exists() and seg_path.stat().st_size >= self.segment_bytes:
+                    seg += 1
+                    seg_path = self.segment_path(seg)
+                with seg_path.open("ab") as f:
+                    offset = f.tell()
+                    f.write(header + blob)
+                    f.flush()
+                    os.fsync(f.fileno())
+                entry = (seg, offset, len(header) + len(blob), int(room.get("move_count", 0)),
+                         len(room.get("players", [])), len(raw), created)
+                with self.index_path.open("ab") as f:
+                    f.write((code + " " + " ".join(str(x) for x in entry) + "\n").encode("ascii"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._refresh()
+                self.appended += 1
+                return self._games[(code, created)]
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                os.close(lock_fd)
+
+    # ----- odczyt -----
+    def latest_id(self, code: str) -> Optional[int]:
+        with self._lock:
+            if code not in self._latest:
+                self._refresh()
+            return self._latest.get(code)
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        # najnowsza zarchiwizowana gra pod tym kodem
+        aid = self.latest_id(code)
+        return self.get_id(aid) if aid is not None else None
+
+    def entry(self, aid: int) -> Optional[Tuple[str, IndexEntry]]:
+        with self._lock:
+            if not 0 < aid <= len(self._entries):
+                self._refresh()
+            return self._entries[aid - 1] if 0 < aid <= len(self._entries) else None
+
+    def get_id(self, aid: int) -> Optional[Dict[str, Any]]:
+        found = self.entry(aid)
+        if found is None:
+            return None
+        code, (seg, offset, length) = found[0], found[1][:3]
+        with self.segment_path(seg).open("rb") as f:
+            f.seek(offset)
+            buf = f.read(length)
+        magic, rec_code, n = RECORD_HEADER.unpack_from(buf)
+        if magic != RECORD_MAGIC or rec_code.decode("ascii") != code:
+            raise ValueError(f"uszkodzony rekord archiwum {aid} ({code}, segment {seg}, offset {offset})")
+        return json.loads(zlib.decompress(buf[RECORD_HEADER.size:RECORD_HEADER.size + n]))
+
+    def rooms(self) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        # pełny przegląd (narzędzia, statystyki offline): (id, kod, pokój), segment po segmencie
+        with self._lock:
+            self._refresh()
+            entries = sorted(enumerate(self._entries, 1), key=lambda it: (it[1][1][0], it[1][1][1]))
+        for aid, (code, _) in entries:
+            room = self.get_id(aid)
+            if room is not None:
+                yield aid, code, room
+
+    def stats(self) -> Dict[str, Any]:
+        # z samego indeksu, bez czytania segmentów
+        with self._lock:
+            self._refresh()
+            entries = [e for _, e in self._entries]
+        stored = sum(e[2] for e in entries)
+        raw = sum(e[5] for e in entries)
+        games = len(entries)
+        by_players: Dict[str, int] = {}
+        for e in entries:
+            by_players[str(e[4])] = by_players.get(str(e[4]), 0) + 1
+        return {
+            "games": games,
+            "segments": len({e[0] for e in entries}),
+            "stored_bytes": stored,
+            "json_bytes": raw,
+            "compression": round(raw / stored, 2) if stored else None,
+            "avg_moves": round(sum(e[3] for e in entries) / games, 1) if games else None,
+            "by_players": by_players,
+        }
@@ -0,0 +1,81 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from assets import compress, negotiate_encoding
+
+
+def room_state_bytes(room: Dict[str, Any]) -> bytes:
+    # log powtórki rośnie z każdą akcją, a klient go nie potrzebuje — jest pod /replay
+    if "replay" in room:
+        room = {k: v for k, v in room.items() if k != "replay"}
+    return json.dumps(room, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class Snapshot:
+    __slots__ = ("version", "stamp", "raw", "etag", "_encoded")
+
+    def __init__(self, code: str, version: int, stamp: Optional[Tuple[int, int]], raw: bytes):
+        self.version = int(version)
+        self.stamp = stamp
+        self.raw = raw
+        self.etag = f"{code}-{self.version}"
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return self.raw, None
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.raw, encoding)
+        return body, encoding
+
+
+class RoomSnapshotCache:
+    # gotowe bajty /state per (kod pokoju, wersja); wszyscy pollerzy danej wersji
+    # dostają ten sam bufor, a zapis (save_room_bumped) podmienia wpis
+    def __init__(self, path_for: Callable[[str], Path], max_rooms: int = 4096):
+        self.path_for = path_for
+        self.max_rooms = max_rooms
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Snapshot]" = OrderedDict()
+
+    def _stamp(self, code: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path_for(code).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _remember(self, code: str, snap: Snapshot) -> Snapshot:
+        with self._lock:
+            self._entries[code] = snap
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_rooms:
+                self._entries.popitem(last=False)
+        return snap
+
+    def put(self, code: str, room: Dict[str, Any]) -> Snapshot:
+        snap = Snapshot(code, int(room.get("version", 0)), self._stamp(code), room_state_bytes(room))
+        return self._remember(code, snap)
+
+    def get(self, code: str, load: Callable[[str], Dict[str, Any]]) -> Optional[Snapshot]:
+        # stat zamiast parsowania: plik mógł zmienić inny worker
+        stamp = self._stamp(code)
+        if stamp is None:
+            self.invalidate(code)
+            return None
+        snap = self._entries.get(code)
+        if snap is not None and snap.stamp == stamp:
+            return snap
+        room = load(code)
+        if not room:
+            return None
+        return self._remember(code, Snapshot(code, int(room.get("version", 0)), stamp, room_state_bytes(room)))
+
+    def invalidate(self, code: str) -> None:
+        with self._lock:
+            self._entries.pop(code, None)
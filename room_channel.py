@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class _Channel:
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.version: int = -1
+        self.payload: bytes = b""
+        self.listeners: int = 0
+        self.checked_at: float = 0.0
+
+
+class RoomHub:
+    # kanał per kod pokoju: zapis publikuje stan RAZ (gotowe bajty),
+    # wszyscy podłączeni klienci tego pokoju dostają ten sam bufor
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._channels: Dict[str, _Channel] = {}
+
+    def _channel(self, code: str) -> _Channel:
+        ch = self._channels.get(code)
+        if ch is None:
+            with self._lock:
+                ch = self._channels.setdefault(code, _Channel())
+        return ch
+
+    def publish(self, code: str, version: int, payload: bytes) -> None:
+        ch = self._channels.get(code)
+        if ch is None:
+            # nikt nie słucha — nie trzymamy pokoju w pamięci
+            return
+        with ch.cond:
+            if version <= ch.version:
+                return
+            ch.version = int(version)
+            ch.payload = payload
+            ch.cond.notify_all()
+
+    def latest(self, code: str) -> Optional[Tuple[int, bytes]]:
+        ch = self._channels.get(code)
+        if ch is None or ch.version < 0:
+            return None
+        return ch.version, ch.payload
+
+    def subscribe(self, code: str) -> None:
+        ch = self._channel(code)
+        with ch.cond:
+            ch.listeners += 1
+
+    def unsubscribe(self, code: str) -> None:
+        ch = self._channels.get(code)
+        if ch is None:
+            return
+        with ch.cond:
+            ch.listeners -= 1
+            if ch.listeners > 0:
+                return
+        with self._lock:
+            if ch.listeners <= 0 and self._channels.get(code) is ch:
+                del self._channels[code]
+
+    def wait(self, code: str, after_version: int, timeout: float) -> Optional[Tuple[int, bytes]]:
+        ch = self._channel(code)
+        with ch.cond:
+            if ch.version <= after_version:
+                ch.cond.wait(timeout)
+            if ch.version > after_version:
+                return ch.version, ch.payload
+        return None
+
+    def claim_recheck(self, code: str, interval: float) -> bool:
+        # tylko jeden słuchacz na pokój sprawdza źródło (np. zapis z innego workera)
+        ch = self._channel(code)
+        with ch.cond:
+            now = time.monotonic()
+            if now - ch.checked_at < interval:
+                return False
+            ch.checked_at = now
+            return True
+
+    def listeners(self, code: str) -> int:
+        ch = self._channels.get(code)
+        return ch.listeners if ch else 0
@@ -0,0 +1,308 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ROOM_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # 32 znaki -> 4 znaki = 2^20 kodów
+ROOM_CODE_LEN = 4
+ROOM_CODE_SPACE = len(ROOM_CODE_ALPHABET) ** ROOM_CODE_LEN
+
+# LCG o pełnym okresie mod 2^20 (c nieparzyste, a ≡ 1 mod 4): kolejne wartości
+# obchodzą całą przestrzeń kodów w pseudolosowej kolejności, bez powtórzeń
+_LCG_A = 1664525
+_LCG_C = 1013904223
+
+LOBBY_MAX_ROOMS = 500  # lobby pokazuje najwyżej tyle najnowszych otwartych pokoi
+
+
+def code_to_int(code: str) -> int:
+    n = 0
+    for ch in code:
+        n = n * 32 + ROOM_CODE_ALPHABET.index(ch)
+    return n
+
+
+def int_to_code(n: int) -> str:
+    out = []
+    for _ in range(ROOM_CODE_LEN):
+        out.append(ROOM_CODE_ALPHABET[n % 32])
+        n //= 32
+    return "".join(reversed(out))
+
+
+def is_room_code(code: str) -> bool:
+    return len(code) == ROOM_CODE_LEN and all(ch in ROOM_CODE_ALPHABET for ch in code)
+
+
+class RoomMeta:
+    __slots__ = ("code", "created", "last_activity", "winner", "size", "players", "max_players")
+
+    def __init__(self, code: str, created: float, last_activity: float, winner: Optional[str],
+                 size: int, players: int, max_players: int):
+        self.code = code
+        self.created = created
+        self.last_activity = last_activity
+        self.winner = winner
+        self.size = size
+        self.players = players
+        self.max_players = max_players
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    def joinable(self) -> bool:
+        return not self.winner and 0 < self.players < self.max_players
+
+
+class RoomIndex:
+    # indeks pokoi w pamięci: kod -> metadane, plus dwie kolejki w kolejności ostatniej
+    # aktywności (najstarsze na początku) — zakończone i trwające, każda z własnym TTL,
+    # więc wygaszanie idzie partiami od najstarszych i staje na pierwszym świeżym wpisie
+    def __init__(
+        self,
+        rooms_dir: Path,
+        ttl_finished: float = 60 * 60,
+        ttl_idle: float = 60 * 60 * 24,
+        files: Optional[Callable[[], Iterable[os.DirEntry]]] = None,
+    ):
+        self.rooms_dir = Path(rooms_dir)
+        # skąd brać pliki pokoi (np. RoomStore.iter_files przy shardach); domyślnie płaski katalog
+        self.files = files or self._flat_files
+        self.ttl_finished = ttl_finished
+        self.ttl_idle = ttl_idle
+        self._lock = threading.RLock()
+        self._rooms: Dict[str, RoomMeta] = {}
+        self._finished: "OrderedDict[str, RoomMeta]" = OrderedDict()   # z zwycięzcą, TTL ttl_finished
+        self._playing: "OrderedDict[str, RoomMeta]" = OrderedDict()    # bez zwycięzcy, TTL ttl_idle
+        self._loaded = False
+        self._cursor = random.randrange(ROOM_CODE_SPACE)
+        self._gc_thread: Optional[threading.Thread] = None
+        self.expired_total = 0
+        # otwarte pokoje (nie pełne, bez zwycięzcy) w kolejności pojawienia się;
+        # utrzymywane przy każdym zapisie, więc lobby nie dotyka dysku
+        self._open: "OrderedDict[str, RoomMeta]" = OrderedDict()
+        self.open_version = 0
+        self._lobby: List[Dict[str, Any]] = []
+        self._lobby_version = -1
+
+    # ----- ładowanie / aktualizacja -----
+    def _meta_from_room(self, code: str, room: Dict[str, Any], size: int, last_activity: float) -> RoomMeta:
+        return RoomMeta(
+            code=code,
+            created=float(room.get("created") or last_activity),
+            last_activity=last_activity,
+            winner=room.get("winner"),
+            size=int(size),
+            players=len(room.get("players", [])),
+            max_players=int(room.get("max_players", 2)),
+        )
+
+    def _flat_files(self) -> List[os.DirEntry]:
+        try:
+            return list(os.scandir(self.rooms_dir))
+        except FileNotFoundError:
+            return []
+
+    def scan(self) -> int:
+        # jednorazowo przy starcie + okresowo w tle: dopisuje pokoje z dysku,
+        # których ten proces jeszcze nie zna (np. utworzone przez inny worker)
+        first = not self._loaded
+        found: List[RoomMeta] = []
+        for entry in self.files():
+            if not entry.name.endswith(".json"):
+                continue
+            code = entry.name[:-5]
+            if code in self._rooms or not is_room_code(code):
+                continue
+            try:
+                st = entry.stat()
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    room = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if room:
+                # przy starcie ufamy mtime; później nowo zauważony pokój liczy się jako świeży,
+                # żeby kolejność wg aktywności się nie rozjechała
+                found.append(self._meta_from_room(code, room, st.st_size, st.st_mtime if first else time.time()))
+        found.sort(key=lambda m: m.last_activity)
+        added = 0
+        with self._lock:
+            for meta in found:
+                if meta.code not in self._rooms:
+                    self._insert(meta)
+                    added += 1
+            self._loaded = True
+        return added
+
+    def ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.scan()
+
+    def _insert(self, meta: RoomMeta) -> None:
+        # utrzymujemy porządek wg last_activity: nowy/odświeżony wpis idzie na koniec swojej kolejki
+        self._rooms[meta.code] = meta
+        self._finished.pop(meta.code, None)
+        self._playing.pop(meta.code, None)
+        (self._finished if meta.winner else self._playing)[meta.code] = meta
+        self._track_open(meta)
+
+    def _track_open(self, meta: RoomMeta) -> None:
+        if meta.joinable():
+            prev = self._open.get(meta.code)
+            if prev is None or prev.players != meta.players or prev.max_players != meta.max_players:
+                self.open_version += 1
+            self._open[meta.code] = meta
+        elif self._open.pop(meta.code, None) is not None:
+            self.open_version += 1
+
+    def update(self, code: str, room: Dict[str, Any], size: int) -> RoomMeta:
+        now = time.time()
+        with self._lock:
+            meta = self._meta_from_room(code, room, size, now)
+            self._insert(meta)
+        return meta
+
+    def observe(self, code: str, room: Dict[str, Any], size: int = 0) -> None:
+        # odczyt pokoju: nowy kod (zapis z innego workera) albo świeższa aktywność/zwycięzca
+        # zapisane przez inny worker (room["updated"])
+        if not room:
+            return
+        meta = self._rooms.get(code)
+        if meta is None:
+            with self._lock:
+                if code not in self._rooms:
+                    self._insert(self._meta_from_room(code, room, size, float(room.get("updated") or time.time())))
+            return
+        updated = float(room.get("updated") or 0)
+        if updated > meta.last_activity or room.get("winner") != meta.winner:
+            self.touch(code, updated, room.get("winner"))
+
+    def touch(self, code: str, last_activity: float, winner: Optional[str]) -> None:
+        # odświeżenie wpisu z aktywności zapisanej na dysku (nigdy wstecz)
+        with self._lock:
+            meta = self._rooms.get(code)
+            if meta is None:
+                return
+            meta.last_activity = max(meta.last_activity, last_activity)
+            meta.winner = winner
+            self._insert(meta)
+
+    def remove(self, code: str) -> None:
+        with self._lock:
+            self._rooms.pop(code, None)
+            self._finished.pop(code, None)
+            self._playing.pop(code, None)
+            if self._open.pop(code, None) is not None:
+                self.open_version += 1
+
+    def get(self, code: str) -> Optional[RoomMeta]:
+        return self._rooms.get(code)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._rooms
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    # ----- lobby -----
+    def open_rooms(self, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+        # najnowsze najpierw; lista przebudowywana tylko po zmianie zbioru otwartych
+        # pokoi i ograniczona do LOBBY_MAX_ROOMS, więc koszt nie zależy od liczby pokoi na dysku
+        self.ensure_loaded()
+        with self._lock:
+            if self._lobby_version != self.open_version:
+                lobby = []
+                for code in reversed(self._open):
+                    meta = self._open[code]
+                    lobby.append({
+                        "code": meta.code,
+                        "players": meta.players,
+                        "max_players": meta.max_players,
+                        "created": int(meta.created),
+                    })
+                    if len(lobby) >= LOBBY_MAX_ROOMS:
+                        break
+                self._lobby = lobby
+                self._lobby_version = self.open_version
+            lobby, version = self._lobby, self._lobby_version
+        per_page = max(1, min(100, per_page))
+        pages = max(1, -(-len(lobby) // per_page))
+        page = max(1, min(pages, page))
+        start = (page - 1) * per_page
+        return {
+            "version": version,
+            "rooms": lobby[start:start + per_page],
+            "page": page,
+            "pages": pages,
+            "total": len(self._open),
+        }
+
+    # ----- przydział kodów -----
+    def allocate_code(self, reserve: Callable[[str], bool]) -> str:
+        # O(1) zamortyzowane: idziemy po permutacji LCG i pomijamy zajęte kody
+        # z indeksu; `reserve` atomowo zajmuje kod na dysku (O_EXCL), więc dwa
+        # workery nie dostaną tego samego kodu
+        self.ensure_loaded()
+        for _ in range(ROOM_CODE_SPACE):
+            with self._lock:
+                self._cursor = (self._cursor * _LCG_A + _LCG_C) % ROOM_CODE_SPACE
+                code = int_to_code(self._cursor)
+                if code in self._rooms:
+                    continue
+            if reserve(code):
+                return code
+        raise RuntimeError("brak wolnych kodów pokoi")
+
+    # ----- wygaszanie -----
+    def expired(self, now: Optional[float] = None, batch: int = 500) -> List[str]:
+        # O(batch): każda kolejka kończy się na pierwszym wpisie młodszym niż jej TTL
+        now = time.time() if now is None else now
+        out: List[str] = []
+        with self._lock:
+            for queue, ttl in ((self._finished, self.ttl_finished), (self._playing, self.ttl_idle)):
+                for meta in queue.values():
+                    if len(out) >= batch or meta.last_activity > now - ttl:
+                        break
+                    out.append(meta.code)
+        return out
+
+    def collect(self, delete: Callable[[str], bool], batch: int = 500) -> int:
+        # `delete` zwraca False, gdy pokoju nie udało się wygasić — zostaje w indeksie
+        # i wraca w następnym przebiegu
+        self.ensure_loaded()
+        removed = 0
+        for code in self.expired(batch=batch):
+            if delete(code):
+                self.remove(code)
+                removed += 1
+        self.expired_total += removed
+        return removed
+
+    def start_background(self, delete: Callable[[str], bool], interval: float = 60.0,
+                         batch: int = 500, rescan_every: int = 10) -> None:
+        if self._gc_thread is not None:
+            return
+
+        def loop() -> None:
+            ticks = 0
+            while True:
+                time.sleep(interval)
+                ticks += 1
+                try:
+                    if ticks % rescan_every == 0:
+                        self.scan()
+                    while self.collect(delete, batch=batch) >= batch:
+                        time.sleep(0.05)  # kolejna partia, bez blokowania requestów na długo
+                except Exception:
+                    pass
+
+        with self._lock:
+            if self._gc_thread is None:
+                self._gc_thread = threading.Thread(target=loop, name="room-gc", daemon=True)
+                self._gc_thread.start()
@@ -0,0 +1,421 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: blokada pokoju tylko w obrębie procesu (jeden worker)
+    fcntl = None  # type: ignore[assignment]
+
+# Tryby trwałości zapisu pokoju (ROOM_DURABILITY):
+#   none   — tmp + rename, bez fsync (dotychczasowe zachowanie)
+#   strict — fsync pliku i katalogu przed powrotem z save()
+#   group  — save() czeka, aż wątek zapisu zapisze partię: wszystko, co przyszło
+#            w trakcie poprzedniego commitu (+ opcjonalne okno group_window),
+#            z jednym wspólnym syncem katalogu dla całej partii
+#   behind — pamięć jest źródłem prawdy, save() wraca od razu, a wątek w tle
+#            zrzuca partie co flush_interval (utrata ostatnich ms przy awarii)
+#
+# coalesce_window (tryb none): zapisy tego samego pokoju w oknie sklejają się
+# w jeden zapis na dysk (seria rzutów po szóstce, decyzja na wężu, tury botów);
+# odczyty w tym procesie od razu widzą najnowszą wersję z pamięci. Przy kilku
+# workerach na wspólnym katalogu okno powinno być 0, bo inne procesy czytają dysk.
+#
+# shards > 0: pokoje rozkładają się po podkatalogach wg crc32(kod) % shards,
+# każdy shard ma własny wątek zapisu z kolejką. Żądanie oddaje zapis i czeka na
+# Future (albo nie czeka: behind / okno sklejania), więc równoległych zapisów na
+# dysk jest najwyżej tyle, ile shardów, a katalogi nie rywalizują o jeden lock.
+# shards = 0 to dawny płaski katalog; pliki z niego są czytane jako zapas
+# i przenoszone do shardów przez migrate_flat().
+# Na zapis, na który nikt nie czeka, błąd trafia tylko do write_errors i logu.
+#
+# lock(kod): odczyt-zmiana-zapis pokoju (ruch, tura bota, timeout) idzie pod
+# blokadą kodu — w procesie paskowe Locki, między workerami lockf na bajcie
+# crc32(kod) wspólnego pliku rooms.lock. Blokady nie są wielokrotne: pod lock()
+# nie wołamy drugiego lock() (lockf zwolniłby bajt zewnętrznej blokady).
+#
+# delete() w trakcie commitu: kod dostaje nagrobek, commit go nie zapisuje, a jeśli
+# plik już leciał na dysk — usuwa go po zapisie, więc usunięty pokój nie wraca.
+DURABILITY_MODES = ("none", "strict", "group", "behind")
+
+log = logging.getLogger(__name__)
+
+TMP_STALE_SECONDS = 60.0
+MAX_SHARDS = 256
+LOCK_STRIPES = 64
+
+
+def _datasync(fd: int) -> None:
+    # fdatasync pomija metadane (mtime), których i tak nie potrzebujemy; macOS/Windows go nie mają
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def shard_of(code: str, shards: int) -> int:
+    # crc32, nie hash(): musi być ten sam we wszystkich workerach i po restarcie
+    return zlib.crc32(code.encode("ascii", "replace")) % shards if shards > 0 else 0
+
+
+def shard_dir_name(index: int) -> str:
+    return f"{index:02x}"
+
+
+class _ShardWriter:
+    # jeden katalog + jeden wątek zapisu; kolejka to słownik kod -> najnowsze bajty,
+    # więc kilka zapisów tego samego pokoju przed commitem daje jeden zapis na dysk
+    def __init__(self, store: "RoomStore", directory: Path, name: str):
+        self.store = store
+        self.directory = directory
+        self.name = name
+        self._cond = threading.Condition()
+        self._commit_lock = threading.Lock()
+        # zapisy czekające na dysk i partia właśnie zapisywana;
+        # odczyty najpierw patrzą tutaj, więc nigdy nie widzą starszej wersji
+        self._dirty: Dict[str, Tuple[bytes, List[Future]]] = {}
+        self._inflight: Dict[str, bytes] = {}
+        self._deleted: Set[str] = set()   # nagrobki: usunięte w trakcie zapisu partii
+        self._thread: Optional[threading.Thread] = None
+
+    def pending(self, code: str) -> Optional[bytes]:
+        with self._cond:
+            item = self._dirty.get(code)
+            if item is not None:
+                return item[0]
+            return self._inflight.get(code)
+
+    def drop(self, code: str) -> None:
+        with self._cond:
+            item = self._dirty.pop(code, None)
+            if self._inflight.pop(code, None) is not None:
+                self._deleted.add(code)
+        if item is not None:
+            for fut in item[1]:
+                fut.set_result(None)
+
+    def deleting(self, code: str) -> bool:
+        with self._cond:
+            return code in self._deleted
+
+    def submit(self, code: str, raw: bytes) -> Future:
+        fut: Future = Future()
+        self._ensure_thread()
+        with self._cond:
+            self._deleted.discard(code)
+            prev = self._dirty.get(code)
+            if prev is not None:
+                self.store.coalesced += 1
+                prev[1].append(fut)
+                self._dirty[code] = (raw, prev[1])
+            else:
+                self._dirty[code] = (raw, [fut])
+            self._cond.notify()
+        return fut
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"room-store-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        delay = self.store.batch_delay()
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+            if delay > 0:
+                time.sleep(delay)  # okno zbierania: kolejne zapisy trafiają do tej samej partii
+            self.commit()
+
+    def commit(self) -> int:
+        with self._commit_lock:
+            with self._cond:
+                if not self._dirty:
+                    return 0
+                batch, self._dirty = self._dirty, {}
+                self._inflight = {code: raw for code, (raw, _) in batch.items()}
+            store = self.store
+            sync = store.durability != "none"
+            error: Optional[BaseException] = None
+            try:
+                for code, (raw, _) in batch.items():
+                    with self._cond:
+                        if code in self._deleted:
+                            continue
+                    store._write_file(code, raw, sync=sync)
+                    with self._cond:
+                        gone = code in self._deleted
+                    if gone:
+                        store.path(code).unlink(missing_ok=True)
+                if sync:
+                    _fsync_dir(self.directory)
+                    store.syncs += 1
+                store.batches += 1
+            except OSError as e:
+                error = OSError(f"zapis partii ({self.name}) nie powiódł się: {e}")
+            with self._cond:
+                self._inflight = {}
+                self._deleted.difference_update(batch)
+            for _, futures in batch.values():
+                for fut in futures:
+                    if error is None:
+                        fut.set_result(None)
+                    else:
+                        fut.set_exception(error)
+            return len(batch)
+
+
+class RoomStore:
+    def __init__(
+        self,
+        rooms_dir: Path,
+        durability: str = "none",
+        group_window: float = 0.0,
+        flush_interval: float = 0.05,
+        coalesce_window: float = 0.0,
+        shards: int = 0,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"nieznany tryb trwałości: {durability}")
+        if not 0 <= shards <= MAX_SHARDS:
+            raise ValueError(f"liczba shardów poza zakresem 0..{MAX_SHARDS}: {shards}")
+        self.rooms_dir = Path(rooms_dir)
+        self.durability = durability
+        self.group_window = group_window
+        self.flush_interval = flush_interval
+        self.coalesce_window = coalesce_window
+        self.shards = shards
+        if shards:
+            self._writers = [_ShardWriter(self, self.rooms_dir / shard_dir_name(i), shard_dir_name(i))
+                             for i in range(shards)]
+        else:
+            self._writers = [_ShardWriter(self, self.rooms_dir, "flat")]
+        self._atexit = False
+        self._room_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._lock_fd = -1
+        self._lock_fd_lock = threading.Lock()
+        self.writes = 0
+        self.syncs = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.write_errors = 0
+        self.last_error: Optional[BaseException] = None
+
+    def shard_dir(self, code: str) -> Path:
+        return self._writer(code).directory
+
+    def _writer(self, code: str) -> _ShardWriter:
+        return self._writers[shard_of(code, self.shards)]
+
+    def path(self, code: str) -> Path:
+        return self.shard_dir(code) / f"{code}.json"
+
+    def flat_path(self, code: str) -> Path:
+        return self.rooms_dir / f"{code}.json"
+
+    def batch_delay(self) -> float:
+        return {"group": self.group_window, "behind": self.flush_interval}.get(self.durability, self.coalesce_window)
+
+    # ----- blokada pokoju -----
+    @contextmanager
+    def lock(self, code: str) -> Iterator[None]:
+        key = zlib.crc32(code.encode("ascii", "replace"))
+        with self._room_locks[key % LOCK_STRIPES]:
+            fd = self._lock_file()
+            if fd >= 0:
+                fcntl.lockf(fd, fcntl.LOCK_EX, 1, key)
+            try:
+                yield
+            finally:
+                if fd >= 0:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, key)
+
+    def _lock_file(self) -> int:
+        if fcntl is None:
+            return -1
+        if self._lock_fd < 0:
+            with self._lock_fd_lock:
+                if self._lock_fd < 0:
+                    self.rooms_dir.mkdir(parents=True, exist_ok=True)
+                    self._lock_fd = os.open(self.rooms_dir / "rooms.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        return self._lock_fd
+
+    # ----- odczyt -----
+    def load(self, code: str) -> Dict[str, Any]:
+        raw = self._writer(code).pending(code)
+        if raw is not None:
+            return json.loads(raw)
+        for p in self._candidates(code):
+            try:
+                with p.open("r", encoding="utf-8") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                continue
+        return {}
+
+    def _candidates(self, code: str) -> Tuple[Path, ...]:
+        # w shardach: najpierw nowe miejsce, potem płaski katalog sprzed migracji
+        if self.shards:
+            return self.path(code), self.flat_path(code)
+        return (self.path(code),)
+
+    def exists(self, code: str) -> bool:
+        return self._writer(code).pending(code) is not None or any(p.exists() for p in self._candidates(code))
+
+    # ----- zapis -----
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def save(self, code: str, data: Dict[str, Any]) -> int:
+        raw = self.encode(data)
+        if not self.shards and self.durability == "strict":
+            self._write_file(code, raw, sync=True)
+            _fsync_dir(self.rooms_dir)
+            self.syncs += 1
+        elif not self.shards and self.durability == "none" and self.coalesce_window <= 0:
+            self._write_file(code, raw, sync=False)
+        else:
+            self._ensure_atexit()
+            fut = self._writer(code).submit(code, raw)
+            if self.durability != "behind" and not (self.durability == "none" and self.coalesce_window > 0):
+                fut.result()
+            else:
+                fut.add_done_callback(self._unawaited_done)
+        return len(raw)
+
+    def _unawaited_done(self, fut: Future) -> None:
+        exc = fut.exception()
+        if exc is not None:
+            self.write_errors += 1
+            self.last_error = exc
+            log.error("%s", exc)
+
+    def _write_file(self, code: str, raw: bytes, sync: bool) -> None:
+        p = self.path(code)
+        # tmp unikalny per wątek: dwa żądania do tego samego pokoju nie nadpiszą sobie pliku tymczasowego
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            f = tmp.open("wb")
+        except FileNotFoundError:
+            # katalog tworzymy leniwie (import aplikacji nie dotyka dysku)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            f = tmp.open("wb")
+        with f:
+            f.write(raw)
+            if sync:
+                f.flush()
+                _datasync(f.fileno())
+        tmp.replace(p)
+        self.writes += 1
+
+    def reserve(self, code: str) -> bool:
+        # atomowa rezerwacja pliku pokoju (O_EXCL); pusty "{}" load traktuje jak brak pokoju
+        if self.shards and self.flat_path(code).exists():
+            return False
+        if self._writer(code).deleting(code):
+            return False  # stary zapis jeszcze leci na dysk i zaraz zostanie usunięty
+        flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY
+        try:
+            fd = os.open(self.path(code), flags, 0o644)
+        except FileExistsError:
+            return False
+        except FileNotFoundError:
+            self.shard_dir(code).mkdir(parents=True, exist_ok=True)
+            return self.reserve(code)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("{}")
+        return True
+
+    def delete(self, code: str) -> None:
+        self._writer(code).drop(code)
+        for p in self._candidates(code):
+            p.unlink(missing_ok=True)
+
+    # ----- wątki zapisu -----
+    def _ensure_atexit(self) -> None:
+        if not self._atexit:
+            self._atexit = True
+            atexit.register(self.flush)
+
+    def flush(self) -> None:
+        # wymuszenie zrzutu (atexit, testy, benchmark)
+        for w in self._writers:
+            while w.commit():
+                pass
+
+    # ----- pliki -----
+    def directories(self) -> List[Path]:
+        dirs = [self.rooms_dir]
+        if self.shards:
+            dirs.extend(w.directory for w in self._writers)
+        return dirs
+
+    def iter_files(self) -> Iterator[os.DirEntry]:
+        # wszystkie pliki pokoi (płaski katalog + shardy), bez zgadywania układu przez wołającego
+        for d in self.directories():
+            try:
+                entries = list(os.scandir(d))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_file():
+                    yield entry
+
+    def migrate_flat(self) -> int:
+        # jednorazowo przy starcie: pokoje z płaskiego katalogu do shardów (rename, bez kopiowania)
+        if not self.shards:
+            return 0
+        moved = 0
+        try:
+            entries = list(os.scandir(self.rooms_dir))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            code = entry.name[:-5]
+            target = self.path(code)
+            if target.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(entry.path, target)
+                moved += 1
+            except FileNotFoundError:
+                pass  # inny worker był szybszy
+        return moved
+
+    def cleanup_tmp(self, older_than: float = TMP_STALE_SECONDS) -> int:
+        # osierocone pliki .tmp po zabitym procesie; świeżych nie ruszamy,
+        # bo może je właśnie pisać inny worker
+        removed = 0
+        cutoff = time.time() - older_than
+        for entry in self.iter_files():
+            if entry.name.endswith(".tmp"):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
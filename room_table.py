@@ -0,0 +1,197 @@
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: blokada rekordu tylko w obrębie procesu
+    fcntl = None  # type: ignore[assignment]
+
+from room_index import ROOM_CODE_SPACE, code_to_int, is_room_code
+
+# Tabela gorącego stanu pokoi: plik mmap z rekordami stałej długości pod indeksem
+# code_to_int(kod), wspólny dla wszystkich workerów. Poll czyta rekord wprost
+# z mapowanej pamięci (struct.unpack_from, bez parsowania JSON-a i bez stat()),
+# zapis nadpisuje rekord w miejscu. Nazwy, historia, ścieżki ruchów itd. zostają
+# w plikach pokoi (RoomStore) — tu tylko to, co zmienia się co ruch.
+#
+# Spójność: seqlock. Pisarz podbija seq na nieparzyste, pisze pola i podbija na
+# parzyste; czytelnik powtarza odczyt, dopóki seq przed i po jest to samo
+# i parzyste. Pisarze tego samego rekordu (też z innych procesów) są
+# serializowani blokadą zakresu pliku (lockf), więc seq rośnie monotonicznie.
+#
+# rekord (little endian, 64 B):
+#   seq u32 | version u32 | flags u8 | turn u8 | rolls_in_turn u8 | players u8
+#   | winner i8 | max_players u8 | last_roll u8 | pos 4×u8 | card 4×u8 | magic 8×u8
+#   | move_count u32 | path_seq u32 | (wypełnienie)
+# card: 0 = brak, 1 + indeks w CARD_POOL; magic: 0 = wolne, 1 = zużyte, 2 + indeks gracza
+
+RECORD = struct.Struct("<IIBBBBbBB4B4B8BII")
+RECORD_SIZE = 64
+SEQ = struct.Struct("<I")
+MAX_PLAYERS = 4
+MAGIC_SLOTS = 8
+
+FLAG_PRESENT = 1
+FLAG_PENDING = 2
+
+READ_RETRIES = 100
+
+
+class RoomTable:
+    def __init__(self, path: Optional[Path], magic_tiles: Sequence[int], cards: Sequence[str],
+                 slots: int = ROOM_CODE_SPACE):
+        # path=None albo plansza z więcej niż MAGIC_SLOTS polami magicznymi -> tabela wyłączona
+        self.path = Path(path) if path else None
+        self.magic_tiles: List[int] = sorted(int(t) for t in magic_tiles)
+        self.cards = list(cards)
+        self.slots = slots
+        self.enabled = self.path is not None and len(self.magic_tiles) <= MAGIC_SLOTS
+        self._lock = threading.Lock()
+        self._mm: Optional[mmap.mmap] = None
+        self._fd = -1
+        self.retries = 0
+
+    # ----- plik -----
+    def _map(self) -> Optional[mmap.mmap]:
+        # leniwie: import aplikacji nie tworzy pliku (rzadki plik, ~64 MB adresów)
+        path = self.path
+        if self._mm is not None or not self.enabled or path is None:
+            return self._mm
+        with self._lock:
+            if self._mm is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                size = self.slots * RECORD_SIZE
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._fd = fd
+                self._mm = mmap.mmap(fd, size)
+        return self._mm
+
+    def _offset(self, code: str) -> Optional[int]:
+        if not is_room_code(code):
+            return None
+        i = code_to_int(code)
+        return i * RECORD_SIZE if i < self.slots else None
+
+    # ----- zapis -----
+    def _encode(self, room: Dict[str, Any]) -> tuple:
+        players = room.get("players", [])[:MAX_PLAYERS]
+        ids = [p.get("id") for p in players]
+        pos = [max(0, min(255, int(p.get("pos", 0)))) for p in players] + [0] * (MAX_PLAYERS - len(players))
+        cards = [self.cards.index(p["card"]) + 1 if p.get("card") in self.cards else 0 for p in players]
+        cards += [0] * (MAX_PLAYERS - len(cards))
+        states = room.get("magic_tiles") or {}
+        magic = []
+        for t in self.magic_tiles:
+            state = states.get(str(t))
+            if state is None:
+                magic.append(0)
+            elif state == "USED":
+                magic.append(1)
+            else:
+                magic.append(2 + ids.index(state) if state in ids else 1)
+        magic += [0] * (MAGIC_SLOTS - len(magic))
+        winner = room.get("winner")
+        flags = FLAG_PRESENT | (FLAG_PENDING if room.get("pending") else 0)
+        return (
+            int(room.get("version", 0)) & 0xFFFFFFFF,
+            flags,
+            int(room.get("turn", 0)),
+            int(room.get("rolls_in_turn", 0)),
+            len(players),
+            ids.index(winner) if winner in ids else -1,
+            int(room.get("max_players", 2)),
+            int(room.get("last_roll") or 0),
+            *pos, *cards, *magic,
+            int(room.get("move_count", 0)) & 0xFFFFFFFF,
+            int(room.get("path_seq", 0)) & 0xFFFFFFFF,
+        )
+
+    def _write(self, code: str, fields: Optional[tuple], only_newer: bool = False) -> bool:
+        mm = self._map()
+        off = self._offset(code)
+        if mm is None or off is None:
+            return False
+        with self._lock:
+            if fcntl:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, RECORD_SIZE, off)
+            try:
+                seq = SEQ.unpack_from(mm, off)[0]
+                if only_newer and fields is not None:
+                    # pod blokadą rekordu: nie cofamy wersji zapisanej przez innego pisarza
+                    # (nieparzyste seq pod blokadą = pisarz zabity w połowie, nadpisujemy)
+                    version, flags = struct.unpack_from("<IB", mm, off + 4)
+                    if seq & 1 == 0 and flags & FLAG_PRESENT and version >= fields[0]:
+                        return False
+                SEQ.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF)           # nieparzyste: w trakcie zapisu
+                if fields is None:
+                    mm[off + 4:off + RECORD_SIZE] = bytes(RECORD_SIZE - 4)
+                else:
+                    RECORD.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF, *fields)
+                SEQ.pack_into(mm, off, (seq + 2) & 0xFFFFFFFF)           # parzyste: gotowe
+                return True
+            finally:
+                if fcntl:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, RECORD_SIZE, off)
+
+    def put(self, code: str, room: Dict[str, Any]) -> None:
+        if self.enabled and room:
+            self._write(code, self._encode(room))
+
+    def fill(self, code: str, room: Dict[str, Any]) -> bool:
+        # uzupełnienie po chybieniu odczytu: tylko gdy rekordu nie ma albo jest starszy
+        if self.enabled and room:
+            return self._write(code, self._encode(room), only_newer=True)
+        return False
+
+    def clear(self, code: str) -> None:
+        if self.enabled:
+            self._write(code, None)
+
+    # ----- odczyt -----
+    def read(self, code: str) -> Optional[tuple]:
+        mm = self._map()
+        off = self._offset(code)
+        if mm is None or off is None:
+            return None
+        for _ in range(READ_RETRIES):
+            rec = RECORD.unpack_from(mm, off)
+            if rec[0] & 1 == 0 and SEQ.unpack_from(mm, off)[0] == rec[0]:
+                return rec if rec[2] & FLAG_PRESENT else None
+            self.retries += 1
+        return None  # pisarz zawiesił się w połowie (zabity proces) — wołający czyta plik pokoju
+
+    def hot(self, code: str) -> Optional[Dict[str, Any]]:
+        rec = self.read(code)
+        if rec is None:
+            return None
+        n = rec[5]
+        magic = rec[17:17 + len(self.magic_tiles)]
+        return {
+            "version": rec[1],
+            "turn": rec[3],
+            "rolls_in_turn": rec[4],
+            "players": n,
+            "max_players": rec[7],
+            "winner": rec[6] if rec[6] >= 0 else None,
+            "pending": bool(rec[2] & FLAG_PENDING),
+            "last_roll": rec[8] or None,
+            "pos": list(rec[9:9 + n]),
+            "cards": [self.cards[c - 1] if c else None for c in rec[13:13 + n]],
+            "magic": {str(t): ("free", "used")[m] if m < 2 else m - 2 for t, m in zip(self.magic_tiles, magic)},
+            "move_count": rec[25],
+            "path_seq": rec[26],
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                os.close(self._fd)
+                self._mm = None
+                self._fd = -1
@@ -0,0 +1,85 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+# Jedno koło czasowe na proces: O(1) dodanie/anulowanie timera, jeden wątek
+# tyka co `tick` sekund i odpala to, co wypadło w bieżącym slocie.
+# Klucz (np. kod pokoju) ma najwyżej jeden timer — ponowne schedule() go zastępuje.
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 0.5, slots: int = 512):
+        self.tick = tick
+        self.slots = slots
+        self._lock = threading.Lock()
+        # slot -> klucz -> (pozostałe obroty, callback)
+        self._wheel: List[Dict[Hashable, Tuple[int, Callable[[], None]]]] = [dict() for _ in range(slots)]
+        self._where: Dict[Hashable, int] = {}
+        self._cursor = 0
+        self._thread: Optional[threading.Thread] = None
+        self.fired = 0
+        self.errors = 0
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], None]) -> None:
+        ticks = max(1, int(math.ceil(delay / self.tick)))
+        with self._lock:
+            self._cancel_locked(key)
+            slot = (self._cursor + ticks) % self.slots
+            self._wheel[slot][key] = ((ticks - 1) // self.slots, callback)
+            self._where[key] = slot
+        self._ensure_thread()
+
+    def cancel(self, key: Hashable) -> None:
+        with self._lock:
+            self._cancel_locked(key)
+
+    def _cancel_locked(self, key: Hashable) -> None:
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self._wheel[slot].pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def advance(self) -> int:
+        # jeden krok koła; wywoływany przez wątek (albo ręcznie w benchmarku)
+        due: List[Callable[[], None]] = []
+        with self._lock:
+            self._cursor = (self._cursor + 1) % self.slots
+            bucket = self._wheel[self._cursor]
+            for key in list(bucket):
+                rounds, callback = bucket[key]
+                if rounds > 0:
+                    bucket[key] = (rounds - 1, callback)
+                    continue
+                del bucket[key]
+                self._where.pop(key, None)
+                due.append(callback)
+        for callback in due:
+            try:
+                callback()
+            except Exception:
+                self.errors += 1
+        self.fired += len(due)
+        return len(due)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        next_tick = time.monotonic() + self.tick
+        while True:
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_tick += self.tick
+            self.advance()
@@ -0,0 +1,140 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+SID_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+
+def gen_sid(n: int = 8) -> str:
+    return "".join(random.choice(SID_ALPHABET) for _ in range(n))
+
+
+class SessionStore(ABC):
+    # sesje hotseat / ai trzymane pod ciasteczkiem `sid`
+    @abstractmethod
+    def load(self, sid: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def save(self, sid: str, game: Any) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, sid: str) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, sid: str) -> bool:
+        ...
+
+    @abstractmethod
+    def cleanup(self, ttl_seconds: int) -> None:
+        ...
+
+    def new_sid(self) -> str:
+        sid = gen_sid(8)
+        while self.exists(sid):
+            sid = gen_sid(8)
+        return sid
+
+
+class MemorySessionStore(SessionStore):
+    # jeden proces: trzymamy obiekty Game bez serializacji (jak dawniej GAMES)
+    def __init__(self) -> None:
+        self.games: Dict[str, Any] = {}
+
+    def load(self, sid: str) -> Optional[Any]:
+        return self.games.get(sid)
+
+    def save(self, sid: str, game: Any) -> None:
+        self.games[sid] = game
+
+    def delete(self, sid: str) -> None:
+        self.games.pop(sid, None)
+
+    def exists(self, sid: str) -> bool:
+        return sid in self.games
+
+    def cleanup(self, ttl_seconds: int) -> None:
+        now = time.time()
+        dead = [sid for sid, g in self.games.items() if getattr(g, "updated_at", now) < now - ttl_seconds]
+        for sid in dead:
+            del self.games[sid]
+
+
+class SqliteSessionStore(SessionStore):
+    # wiele workerów na jednym hoście: wspólny plik SQLite (WAL), stan gry jako JSON
+    def __init__(
+        self,
+        path: Path,
+        encode: Callable[[Any], Dict[str, Any]],
+        decode: Callable[[Dict[str, Any]], Any],
+    ) -> None:
+        self.path = Path(path)
+        self.encode = encode
+        self.decode = decode
+        self._local = threading.local()
+        self._schema_pid: Optional[int] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        # połączenie per wątek i per proces (po fork nie wolno używać cudzego);
+        # plik i schemat powstają przy pierwszym użyciu, nie w konstruktorze
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            if self._schema_pid != os.getpid():
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if self._schema_pid != os.getpid():
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sessions ("
+                    " sid TEXT PRIMARY KEY,"
+                    " updated_at REAL NOT NULL,"
+                    " data TEXT NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated_at)")
+                self._schema_pid = os.getpid()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT data FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        if not row:
+            return None
+        return self.decode(json.loads(row[0]))
+
+    def save(self, sid: str, game: Any) -> None:
+        data = json.dumps(self.encode(game), ensure_ascii=False, separators=(",", ":"))
+        self._conn().execute(
+            "INSERT INTO sessions(sid, updated_at, data) VALUES(?, ?, ?)"
+            " ON CONFLICT(sid) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data",
+            (sid, getattr(game, "updated_at", time.time()), data),
+        )
+
+    def delete(self, sid: str) -> None:
+        self._conn().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def exists(self, sid: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM sessions WHERE sid = ?", (sid,)).fetchone() is not None
+
+    def cleanup(self, ttl_seconds: int) -> None:
+        self._conn().execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - ttl_seconds,))
+
+
+def make_session_store(
+    kind: str,
+    path: Path,
+    encode: Callable[[Any], Dict[str, Any]],
+    decode: Callable[[Dict[str, Any]], Any],
+) -> SessionStore:
+    if kind == "sqlite":
+        return SqliteSessionStore(path, encode=encode, decode=decode)
+    return MemorySessionStore()
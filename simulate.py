@@ -0,0 +1,206 @@
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from engine import BOARD_END, Game, Player
+
+MODES = ("hotseat", "ai", "ai_double", "mp")
+
+
+# ===== Polityki decyzji "człowieka" =====
+class Policy:
+    # decyzje, które w aplikacji podejmuje klikający gracz
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+
+    def dice_swap(self, game: Game) -> bool:
+        return False
+
+    def snake_choice(self, game: Game) -> str:
+        return "stay"
+
+    def card_pawn(self, game: Game) -> Optional[int]:
+        # indeks pionka dla TELEPORT +3 albo None = nie używaj teraz
+        return game.current_index()
+
+
+class RandomPolicy(Policy):
+    def __init__(self, rng: Optional[random.Random] = None, card_chance: float = 0.5):
+        super().__init__(rng)
+        self.card_chance = card_chance
+
+    def dice_swap(self, game: Game) -> bool:
+        return self.rng.random() < 0.5
+
+    def snake_choice(self, game: Game) -> str:
+        return self.rng.choice(("stay", "back"))
+
+    def card_pawn(self, game: Game) -> Optional[int]:
+        if self.rng.random() >= self.card_chance:
+            return None
+        if game.mode == "ai" and game.variant == "double":
+            return self.rng.choice((0, 1))
+        return game.current_index()
+
+
+class GreedyPolicy(Policy):
+    # przypisanie kości jak AI (drabiny/karty), teleport tylko gdy trafia na drabinę
+    def dice_swap(self, game: Game) -> bool:
+        d1, d2 = (game.pending or {}).get("dice", [1, 1])
+        p1, p2 = game.players[0], game.players[1]
+        keep = game._score_runner_ladder(p1, d1) + game._score_runner_ladder(p2, d2)
+        swap = game._score_runner_ladder(p1, d2) + game._score_runner_ladder(p2, d1)
+        return swap > keep
+
+    def card_pawn(self, game: Game) -> Optional[int]:
+        candidates = (0, 1) if (game.mode == "ai" and game.variant == "double") else (game.current_index(),)
+        for idx in candidates:
+            t = int(game.players[idx].pos) + 3
+            if t <= BOARD_END and game._apply_ladder_virtual(t) > t:
+                return idx
+        return None
+
+
+POLICIES = {"default": Policy, "random": RandomPolicy, "greedy": GreedyPolicy}
+
+
+# ===== Gry =====
+def new_game(mode: str, players: int = 2) -> Game:
+    if mode == "hotseat":
+        return Game.new_hotseat(players)
+    if mode == "ai":
+        return Game.new_ai()
+    if mode == "ai_double":
+        return Game.new_ai_double()
+    if mode == "mp":
+        g = Game(mode="mp", variant="classic")
+        n = max(2, min(4, int(players)))
+        colors = ["p-red", "p-blue", "p-green", "p-purple"]
+        g.max_players = n
+        g.players = [Player(pid=f"p{i + 1}", name=f"Gracz {i + 1}", color=colors[i]) for i in range(n)]
+        for pl in g.players:
+            g.team_cards[str(pl.id)] = None
+        return g
+    raise ValueError(f"nieznany tryb: {mode}")
+
+
+def is_finished(game: Game) -> bool:
+    if game.mode == "mp":
+        return bool(game.winner)
+    return game.anyone_won()
+
+
+def winner_of(game: Game) -> Optional[str]:
+    if game.mode == "mp":
+        return game.winner
+    if game.variant == "double":
+        return game.winner_text()
+    for p in game.players:
+        if int(p.pos) == BOARD_END:
+            return "Komputer" if p.is_bot else str(p.id)
+    return None
+
+
+def _team_card(game: Game) -> Optional[str]:
+    return game.team_cards.get(game._team_key_for_player(game.players[game.current_index()]))
+
+
+def step(game: Game, policy: Policy) -> str:
+    # jedna akcja jak jedno kliknięcie/redirect w aplikacji; zwraca rodzaj akcji
+    pend = game.pending
+    if pend and pend.get("type") == "snake_choice":
+        game.snake_decision(pend.get("player_id"), policy.snake_choice(game))
+        return "human"
+    if pend and pend.get("type") == "dice_choice":
+        game.apply_dice_choice_human(policy.dice_swap(game))
+        return "human"
+
+    idx = game.current_index()
+    if game.mode == "ai" and game.players[idx].is_bot:
+        if game.variant == "double":
+            game.ai_pair_move()
+        else:
+            game.ai_move()
+        return "bot"
+
+    if _team_card(game) == "TELEPORT_PLUS3":
+        pawn = policy.card_pawn(game)
+        if pawn is not None:
+            game.use_card(pawn_idx=pawn)
+            if is_finished(game) or game.pending:
+                return "human"
+
+    if game.mode == "mp":
+        game.mp_roll(game.players[idx].id)
+    else:
+        game.roll()
+    return "human"
+
+
+def play(game: Game, policy: Policy, max_actions: int = 10_000) -> Dict[str, Any]:
+    human = bot = 0
+    while not is_finished(game) and human + bot < max_actions:
+        if step(game, policy) == "bot":
+            bot += 1
+        else:
+            human += 1
+    return {
+        "winner": winner_of(game),
+        "finished": is_finished(game),
+        "move_count": int(game.move_count),
+        "actions": human + bot,
+        "human_actions": human,
+        "bot_actions": bot,
+        "positions": [int(p.pos) for p in game.players],
+    }
+
+
+def simulate_games(
+    mode: str,
+    n: int,
+    seed: int = 0,
+    players: int = 2,
+    policy: Union[str, Callable[[random.Random], Policy]] = "random",
+    max_actions: int = 10_000,
+) -> Iterator[Dict[str, Any]]:
+    # generator: jedno podsumowanie na grę, pamięć stała niezależnie od n;
+    # policy = nazwa z POLICIES albo fabryka rng -> Policy
+    if mode not in MODES:
+        raise ValueError(f"nieznany tryb: {mode}")
+    make_policy = POLICIES[policy] if isinstance(policy, str) else policy
+    for i in range(n):
+        game_seed = seed * 1_000_003 + i
+        game = new_game(mode, players)
+        game.rng = random.Random(game_seed)
+        pol = make_policy(random.Random(f"policy:{game_seed}"))
+        summary = play(game, pol, max_actions=max_actions)
+        summary.update({"index": i, "seed": game_seed, "mode": mode, "variant": game.variant})
+        yield summary
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Symulacja pełnych gier na silniku Game")
+    ap.add_argument("--mode", choices=MODES, default="hotseat")
+    ap.add_argument("--n", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--players", type=int, default=2)
+    ap.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    ap.add_argument("--summary", action="store_true", help="tylko zbiorcze podsumowanie na stderr")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    games = moves = 0
+    for s in simulate_games(args.mode, args.n, seed=args.seed, players=args.players, policy=args.policy):
+        games += 1
+        moves += s["move_count"]
+        if not args.summary:
+            sys.stdout.write(json.dumps(s, ensure_ascii=False) + "\n")
+    dt = time.perf_counter() - t0
+    sys.stderr.write(f"gier={games} śr. ruchów={moves / max(1, games):.1f} czas={dt:.2f}s ({games / dt:.0f} gier/s)\n")
+
+
+if __name__ == "__main__":
+    main()
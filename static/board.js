@@ -0,0 +1,40 @@
+let isAnimatingGlobal = false;
+
+const DOM = {
+  cells: {},
+  pawns: {},
+  startZone: document.getElementById('start-zone'),
+  rollBtn: document.getElementById('roll-btn')
+};
+
+function initCache() {
+  document.querySelectorAll('.cell[data-n]').forEach(c => DOM.cells[c.dataset.n] = c);
+  document.querySelectorAll('.pawn[data-player]').forEach(p => DOM.pawns[p.dataset.player] = p);
+}
+
+function handleRoll(btn) {
+  if (btn.classList.contains('disabled') || isAnimatingGlobal) return;
+  btn.classList.add('loading');
+  window.location.href = "/roll";
+}
+
+async function animate() {
+  isAnimatingGlobal = true;
+  await replayPath(DOM, CONFIG.movePath, CONFIG.pathSeq, 'path_seq_game', CONFIG.stepDelay);
+  isAnimatingGlobal = false;
+}
+
+document.addEventListener("DOMContentLoaded", async () => {
+  initCache();
+  if (DOM.rollBtn) DOM.rollBtn.classList.add('disabled');
+  await animate();
+
+  if (DOM.rollBtn && !CONFIG.isBotTurn && !CONFIG.gameWon && !CONFIG.isPending) {
+    DOM.rollBtn.classList.remove('disabled');
+    DOM.rollBtn.classList.remove('loading');
+  }
+
+  if (CONFIG.isBotTurn && !CONFIG.gameWon) {
+    setTimeout(() => window.location.href = "/ai_move", 600);
+  }
+});
@@ -0,0 +1,67 @@
+// Lista otwartych pokoi: /mp/rooms z indeksu w pamięci, odświeżana co kilka sekund
+// (If-None-Match -> 304, gdy nic się nie zmieniło).
+const LOBBY = {
+  list: document.getElementById('room-list'),
+  pageLabel: document.getElementById('rooms-page'),
+  prev: document.getElementById('rooms-prev'),
+  next: document.getElementById('rooms-next'),
+  form: document.getElementById('join-form'),
+  page: 1,
+  pages: 1,
+  etag: null,
+  refreshMs: 5000
+};
+
+function pickRoom(code) {
+  if (!LOBBY.form) return;
+  LOBBY.form.elements.code.value = code;
+  const name = LOBBY.form.elements.name;
+  if (name.value.trim()) LOBBY.form.submit();
+  else name.focus();
+}
+
+function renderRooms(data) {
+  LOBBY.page = data.page;
+  LOBBY.pages = data.pages;
+  LOBBY.pageLabel.textContent = `${data.page} / ${data.pages} • pokoi: ${data.total}`;
+  LOBBY.prev.disabled = data.page <= 1;
+  LOBBY.next.disabled = data.page >= data.pages;
+
+  LOBBY.list.innerHTML = '';
+  if (!data.rooms.length) {
+    LOBBY.list.innerHTML = '<div class="muted">Brak otwartych pokoi — utwórz własny.</div>';
+    return;
+  }
+  data.rooms.forEach(r => {
+    const row = document.createElement('div');
+    row.className = 'info-row';
+    row.style.cssText = 'display:flex; justify-content:space-between; align-items:center; gap:10px;';
+    row.innerHTML = `<span><b>${r.code}</b> <span class="muted">${r.players}/${r.max_players} graczy</span></span>`;
+    const btn = document.createElement('button');
+    btn.type = 'button';
+    btn.className = 'btn';
+    btn.textContent = 'Dołącz';
+    btn.addEventListener('click', () => pickRoom(r.code));
+    row.appendChild(btn);
+    LOBBY.list.appendChild(row);
+  });
+}
+
+async function loadRooms(page) {
+  const headers = {};
+  if (page === LOBBY.page && LOBBY.etag) headers['If-None-Match'] = LOBBY.etag;
+  try {
+    const res = await fetch(`/mp/rooms?page=${page}`, { headers, cache: 'no-store' });
+    if (res.status === 304) return;
+    if (!res.ok) return;
+    LOBBY.etag = res.headers.get('ETag');
+    renderRooms(await res.json());
+  } catch (e) { /* sieć chwilowo niedostępna — spróbujemy przy następnym odświeżeniu */ }
+}
+
+if (LOBBY.list) {
+  LOBBY.prev.addEventListener('click', () => loadRooms(LOBBY.page - 1));
+  LOBBY.next.addEventListener('click', () => loadRooms(LOBBY.page + 1));
+  loadRooms(1);
+  setInterval(() => { if (!document.hidden) loadRooms(LOBBY.page); }, LOBBY.refreshMs);
+}
@@ -0,0 +1,194 @@
+const DOM = {
+  cells: {},
+  pawns: {},
+  startZone: document.getElementById('start-zone'),
+  rollBtn: document.getElementById('roll-btn'),
+  form: document.getElementById('roll-form')
+};
+
+let isLockedForUpdate = false;
+let isAnimating = false;
+let queuedState = null;
+
+function updateCache() {
+  document.querySelectorAll('.cell[data-n]').forEach(c => DOM.cells[c.dataset.n] = c);
+  document.querySelectorAll('.pawn[data-player]').forEach(p => DOM.pawns[p.dataset.player] = p);
+}
+
+function placePawn(pawn, pos) {
+  const target = pos === 0 ? DOM.startZone : DOM.cells[pos];
+  if (target && pawn.parentNode !== target) target.appendChild(pawn);
+}
+
+async function animate(movePath, pathSeq) {
+  updateCache();
+  await replayPath(DOM, movePath, pathSeq, `mp_path_seq_${CONFIG.code}`, CONFIG.stepDelay);
+}
+
+function setRollEnabled(enabled) {
+  if (!DOM.rollBtn) return;
+  DOM.rollBtn.classList.toggle('disabled', !enabled);
+  if (enabled) DOM.rollBtn.removeAttribute('disabled');
+  else DOM.rollBtn.setAttribute('disabled', 'disabled');
+}
+
+// Formularze (karta, decyzja na wężu, koniec gry) renderuje serwer —
+// gdy ich widoczność się zmienia, przeładowujemy; resztę łatamy w miejscu.
+function needsReload(data) {
+  const myPlayer = CONFIG.myIdx !== null ? data.players[CONFIG.myIdx] : null;
+  const isMyTurn = data.turn === CONFIG.myIdx;
+  const started = data.players.length >= 2;
+  const showsCard = !!(myPlayer && myPlayer.card && myPlayer.card !== "ANTY_WAZ" && !data.winner && isMyTurn && started);
+  return data.players.length !== CONFIG.playerCount
+    || !!data.pending !== CONFIG.isPending
+    || (data.winner || null) !== CONFIG.winner
+    || showsCard !== CONFIG.showsCard;
+}
+
+async function applyState(data) {
+  if (!data || !data.players || data.version <= CONFIG.version) return;
+  if (isAnimating) { queuedState = data; return; }
+  if (isLockedForUpdate) return;
+  if (needsReload(data)) { window.location.reload(); return; }
+
+  isAnimating = true;
+  CONFIG.version = data.version;
+
+  const n = data.players.length;
+  const mc = data.move_count || 0;
+  const round = mc > 0 ? Math.floor((mc - 1) / n) + 1 : 1;
+  const turnInfo = document.getElementById('turn-info');
+  turnInfo.innerHTML = '<b>Runda:</b> ' + round + ' | <b>Ruch:</b> ';
+  turnInfo.appendChild(document.createTextNode(data.players[data.turn] ? data.players[data.turn].name : '-'));
+
+  document.getElementById('msg-box').textContent = data.message || '';
+  document.getElementById('msg-wrap').style.display = data.message ? '' : 'none';
+
+  const hist = document.getElementById('history-list');
+  hist.textContent = '';
+  (data.history || []).slice().reverse().forEach(h => {
+    const li = document.createElement('li');
+    li.textContent = h;
+    hist.appendChild(li);
+  });
+
+  document.querySelectorAll('#posList li').forEach((li, i) => li.classList.toggle('active-player', i === data.turn));
+  data.players.forEach((p, i) => {
+    const b = document.querySelector(`b[data-pos="${i}"]`);
+    if (b) b.textContent = p.pos;
+  });
+
+  const magic = data.magic_tiles || {};
+  Object.keys(DOM.cells).forEach(k => {
+    DOM.cells[k].classList.toggle('magic', k in magic && magic[k] !== 'USED');
+  });
+
+  setRollEnabled(false);
+  await animate(data.move_path, data.path_seq);
+  updateCache();
+  data.players.forEach((p, i) => { if (DOM.pawns[i]) placePawn(DOM.pawns[i], p.pos); });
+
+  CONFIG.isMyTurn = data.turn === CONFIG.myIdx;
+  CONFIG.canRoll = !data.winner && CONFIG.isMyTurn && n >= 2 && !data.pending;
+  setRollEnabled(CONFIG.canRoll);
+
+  isAnimating = false;
+  if (queuedState) {
+    const next = queuedState;
+    queuedState = null;
+    await applyState(next);
+  }
+}
+
+// Koniec gry albo brak pokoju (wygasł / porzucony) = nie ma już czego odpytywać.
+let finished = !!CONFIG.winner;
+
+async function checkServer() {
+  if (isLockedForUpdate || finished) return;
+  try {
+    // tani poll z tabeli gorącego stanu; pełny /state tylko po zmianie wersji
+    const hot = await (await fetch(`/mp/room/${CONFIG.code}/hot?t=${Date.now()}`)).json();
+    if (hot.error === 'no_room') { finished = true; return; }
+    if (hot.version <= CONFIG.version) return;
+    const res = await fetch(`/mp/room/${CONFIG.code}/state?t=${Date.now()}`);
+    const data = await res.json();
+    if (data.winner || data.error === 'no_room') finished = true;
+    await applyState(data);
+  } catch (e) {}
+}
+
+// Push: jeden kanał WebSocket na pokój; gdy niedostępny — polling co 2 s,
+// a w ukrytej karcie co 10 s (serwer i tak liczy gracza jako obecnego).
+let pollTimer = null;
+let polling = false;
+
+function pollDelay() {
+  return document.hidden ? 10000 : 2000;
+}
+
+function pollLoop() {
+  pollTimer = setTimeout(async () => {
+    await checkServer();
+    if (polling && !finished) pollLoop();
+    else stopPolling();
+  }, pollDelay());
+}
+
+function startPolling() {
+  if (polling || finished) return;
+  polling = true;
+  pollLoop();
+}
+
+function stopPolling() {
+  polling = false;
+  if (pollTimer) { clearTimeout(pollTimer); pollTimer = null; }
+}
+
+function connectPush() {
+  if (!('WebSocket' in window)) { startPolling(); return; }
+  const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+  let opened = false;
+  const ws = new WebSocket(`${proto}://${location.host}/mp/room/${CONFIG.code}/ws?v=${CONFIG.version}`);
+  ws.onopen = () => {
+    opened = true;
+    stopPolling();
+  };
+  ws.onmessage = ev => {
+    try {
+      const data = JSON.parse(ev.data);
+      if (data.winner) { finished = true; ws.close(); }
+      applyState(data);
+    } catch (e) {}
+  };
+  ws.onclose = () => {
+    if (finished) return;
+    startPolling();
+    if (opened) setTimeout(connectPush, 3000);
+  };
+}
+
+document.addEventListener("DOMContentLoaded", async () => {
+  updateCache();
+  setRollEnabled(false);
+
+  // Rejestracja kliknięć, aby zapobiec przeładowaniu w trakcie akcji
+  document.querySelectorAll('form').forEach(f => {
+    f.addEventListener('submit', () => { isLockedForUpdate = true; });
+  });
+
+  isAnimating = true;
+  await animate(CONFIG.movePath, CONFIG.pathSeq);
+  isAnimating = false;
+
+  if (CONFIG.isMyTurn && CONFIG.gameStarted && !CONFIG.isPending && CONFIG.canRoll) {
+    setRollEnabled(true);
+  }
+
+  if (!finished) connectPush();
+  if (queuedState) {
+    const next = queuedState;
+    queuedState = null;
+    await applyState(next);
+  }
+});
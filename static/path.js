@@ -0,0 +1,58 @@
+// Odtwarzanie ścieżki ruchów z serwera (move_path).
+// Segment: [seq, gracz, skąd, lądowanie, dokąd, rodzaj]; rodzaj: 0 rzut, 1 teleport, 2 skok, 3 bez ruchu.
+
+const PATH_STAY = 3;
+const JUMP_DELAY = 450;
+
+function pathSleep(ms) {
+  return new Promise(r => setTimeout(r, ms));
+}
+
+function pathPlace(dom, pawn, pos) {
+  const target = pos === 0 ? dom.startZone : dom.cells[pos];
+  if (target && pawn.parentNode !== target) target.appendChild(pawn);
+}
+
+function pathPending(path, seq, storageKey) {
+  const stored = sessionStorage.getItem(storageKey);
+  sessionStorage.setItem(storageKey, String(seq));
+  const seen = stored === null ? -1 : parseInt(stored, 10);
+
+  // brak pamięci (nowa karta) albo nowa gra: pokazujemy tylko ostatni ruch
+  const segs = (seen < 0 || seen > seq) ? path.slice(-1) : path.filter(s => s[0] > seen);
+  return segs.filter(s => s[5] !== PATH_STAY);
+}
+
+async function replayPath(dom, path, seq, storageKey, stepDelay) {
+  const segs = pathPending(path || [], seq || 0, storageKey);
+  if (!segs.length) return;
+
+  // każdy pionek wraca tam, skąd zaczął się jego pierwszy segment
+  const seenPlayers = new Set();
+  segs.forEach(([, player, from]) => {
+    const pawn = dom.pawns[player];
+    if (!pawn || seenPlayers.has(player)) return;
+    seenPlayers.add(player);
+    pawn.classList.add('no-transition');
+    pathPlace(dom, pawn, from);
+  });
+  document.body.offsetHeight;
+  await new Promise(r => requestAnimationFrame(() => r()));
+  Object.values(dom.pawns).forEach(p => p.classList.remove('no-transition'));
+
+  for (const [, player, from, land, to] of segs) {
+    const pawn = dom.pawns[player];
+    if (!pawn) continue;
+    pathPlace(dom, pawn, from);
+    for (let i = from + 1; i <= land; i++) {
+      if (dom.cells[i]) {
+        dom.cells[i].appendChild(pawn);
+        await pathSleep(stepDelay);
+      }
+    }
+    if (land !== to) {
+      await pathSleep(JUMP_DELAY);
+      pathPlace(dom, pawn, to);
+    }
+  }
+}
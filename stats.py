@@ -0,0 +1,264 @@
+import atexit
+import json
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: bez blokady pliku (jeden worker)
+    fcntl = None  # type: ignore[assignment]
+
+# Statystyki planszy z prawdziwych gier: liczniki o stałym rozmiarze (array 'q'),
+# inkrementowane w miejscu — gorąca ścieżka silnika nie tworzy obiektów na zdarzenie.
+# Inkrementy idą pod krótką blokadą (bez niej `arr[i] += 1` z kilku wątków gubi
+# zliczenia), pod nią też wątek w tle co flush_interval podmienia bufor — po
+# podmianie nikt już nie pisze do starego — i dopisuje różnicę do pliku JSON
+# (pod flock, więc kilka workerów sumuje się do jednego pliku; plik podmieniany przez rename).
+
+LEN_BUCKET = 5      # histogram długości gier: kubełki po 5 ruchów
+LEN_BUCKETS = 64    # ostatni kubełek = 315+ ruchów
+
+MODES = ("hotseat", "ai", "ai_double", "mp")
+
+
+class _Counters:
+    __slots__ = ("land", "ladder", "snake", "snake_avoided", "card_tile",
+                 "card_gained", "card_used", "dice", "overshoot", "games", "moves", "length")
+
+    def __init__(self, tiles: int, cards: int):
+        self.land = array("q", bytes(8 * tiles))
+        self.ladder = array("q", bytes(8 * tiles))
+        self.snake = array("q", bytes(8 * tiles))
+        self.snake_avoided = array("q", bytes(8 * tiles))
+        self.card_tile = array("q", bytes(8 * tiles))
+        self.card_gained = array("q", bytes(8 * cards))
+        self.card_used = array("q", bytes(8 * cards))
+        self.dice = array("q", bytes(8 * 7))
+        self.overshoot = array("q", bytes(8))
+        self.games = array("q", bytes(8 * len(MODES)))
+        self.moves = array("q", bytes(8 * len(MODES)))
+        self.length = array("q", bytes(8 * LEN_BUCKETS))
+
+    def arrays(self):
+        return ((name, getattr(self, name)) for name in self.__slots__)
+
+    def add(self, other: "_Counters") -> None:
+        for name, arr in self.arrays():
+            src = getattr(other, name)
+            for i in range(len(arr)):
+                arr[i] += src[i]
+
+    def zero(self) -> None:
+        for _, arr in self.arrays():
+            for i in range(len(arr)):
+                arr[i] = 0
+
+    def dirty(self) -> bool:
+        return any(any(arr) for _, arr in self.arrays())
+
+
+class NullStats:
+    # dla powtórek i gier, których nie liczymy
+    def rolled(self, die: int, land: int) -> None:
+        pass
+
+    def overshot(self, die: int) -> None:
+        pass
+
+    def ladder(self, tile: int) -> None:
+        pass
+
+    def snake(self, tile: int) -> None:
+        pass
+
+    def snake_avoided(self, tile: int) -> None:
+        pass
+
+    def card_gained(self, tile: int, card: int) -> None:
+        pass
+
+    def card_used(self, card: int) -> None:
+        pass
+
+    def game_over(self, mode: int, moves: int) -> None:
+        pass
+
+
+class StatsCollector(NullStats):
+    def __init__(self, path: Path, tiles: int, cards: int, flush_interval: float = 30.0):
+        self.path = Path(path)
+        self.tiles = tiles
+        self.cards = cards
+        self.flush_interval = flush_interval
+        self._cur = _Counters(tiles, cards)
+        self._spare = _Counters(tiles, cards)
+        self._lock = threading.Lock()         # inkrementy i podmiana buforów
+        self._flush_lock = threading.Lock()   # jeden zrzut naraz
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+
+    # ----- gorąca ścieżka -----
+    def rolled(self, die: int, land: int) -> None:
+        with self._lock:
+            c = self._cur
+            c.dice[die] += 1
+            c.land[land] += 1
+
+    def overshot(self, die: int) -> None:
+        with self._lock:
+            c = self._cur
+            c.dice[die] += 1
+            c.overshoot[0] += 1
+
+    def ladder(self, tile: int) -> None:
+        with self._lock:
+            self._cur.ladder[tile] += 1
+
+    def snake(self, tile: int) -> None:
+        with self._lock:
+            self._cur.snake[tile] += 1
+
+    def snake_avoided(self, tile: int) -> None:
+        with self._lock:
+            self._cur.snake_avoided[tile] += 1
+
+    def card_gained(self, tile: int, card: int) -> None:
+        with self._lock:
+            c = self._cur
+            c.card_tile[tile] += 1
+            c.card_gained[card] += 1
+
+    def card_used(self, card: int) -> None:
+        with self._lock:
+            self._cur.card_used[card] += 1
+
+    def game_over(self, mode: int, moves: int) -> None:
+        with self._lock:
+            c = self._cur
+            c.games[mode] += 1
+            c.moves[mode] += moves
+            c.length[min(LEN_BUCKETS - 1, moves // LEN_BUCKET)] += 1
+
+    # ----- zrzut -----
+    def _read(self, f) -> Dict[str, Any]:
+        f.seek(0)
+        raw = f.read()
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            data = {}
+        return data if isinstance(data, dict) else {}
+
+    def flush(self) -> bool:
+        with self._flush_lock:
+            with self._lock:
+                if not self._cur.dirty():
+                    return False
+                old, self._cur = self._cur, self._spare
+            try:
+                self._write(old)
+            except BaseException:
+                # zrzut się nie udał: różnica wraca do bieżącego bufora, pójdzie następnym razem
+                with self._lock:
+                    self._cur.add(old)
+                raise
+            finally:
+                old.zero()
+                self._spare = old
+            self.flushes += 1
+            return True
+
+    def _write(self, diff: _Counters) -> None:
+        # flock na osobnym pliku, nowa wersja do pliku tymczasowego + fsync + rename:
+        # zabity w połowie zapis zostawia stary plik, a nie ucięty JSON
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = os.open(self.path.with_name(self.path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    data = self._read(f)
+            except FileNotFoundError:
+                data = {}
+            for name, arr in diff.arrays():
+                prev = data.get(name) or []
+                data[name] = [(prev[i] if i < len(prev) else 0) + arr[i] for i in range(len(arr))]
+            data["updated"] = int(time.time())
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with tmp.open("w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        finally:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def start_background(self) -> None:
+        if self._thread is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=loop, name="stats-flush", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    # ----- odczyt -----
+    def totals(self) -> Dict[str, List[int]]:
+        # plik (wszystkie workery) + niezrzucony bufor tego procesu
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = self._read(f)
+        except FileNotFoundError:
+            data = {}
+        out: Dict[str, List[int]] = {}
+        for name, arr in self._cur.arrays():
+            prev = data.get(name) or []
+            out[name] = [(prev[i] if i < len(prev) else 0) + arr[i] for i in range(len(arr))]
+        return out
+
+
+def heatmap(totals: Dict[str, List[int]], card_names: List[str], jumps: Dict[int, int]) -> Dict[str, Any]:
+    land = totals["land"]
+    landings = sum(land)
+    games = sum(totals["games"])
+    cards = {}
+    for i, name in enumerate(card_names):
+        gained = totals["card_gained"][i]
+        used = totals["card_used"][i]
+        cards[name] = {"gained": gained, "used": used, "use_rate": round(used / gained, 3) if gained else None}
+    return {
+        "landings": landings,
+        "land": land,
+        "land_share": [round(x / max(1, landings), 5) for x in land],
+        "ladders": {str(a): {"to": b, "used": totals["ladder"][a]} for a, b in sorted(jumps.items()) if b > a},
+        "snakes": {str(a): {"to": b, "used": totals["snake"][a], "avoided": totals["snake_avoided"][a]}
+                   for a, b in sorted(jumps.items()) if b < a},
+        "magic": {str(t): n for t, n in enumerate(totals["card_tile"]) if n},
+        "cards": cards,
+        "dice": totals["dice"][1:],
+        "overshoot": totals["overshoot"][0],
+        "games": {m: {"games": totals["games"][i], "avg_moves": round(totals["moves"][i] / totals["games"][i], 1)
+                      if totals["games"][i] else None} for i, m in enumerate(MODES)},
+        "games_total": games,
+        "length_hist": {"bucket": LEN_BUCKET, "counts": totals["length"]},
+    }